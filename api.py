@@ -1,13 +1,31 @@
 """API server to serve scraped data."""
 
-import json
+import asyncio
 import os
-from flask import Flask, jsonify, request
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from flask import Flask, g, jsonify, request
 from flasgger import Swagger
+from columnar import ColumnarDataCache, refresh_snapshot, snapshot_path
+from content_encoding import encode, negotiate
+from data_cache import ScrapedDataCache, read_data_file
+from delta import RECORD_KEYS, ChangeLog, changes_path, parse_since, save_json_changes
+from http_cache import HTTPCache
+from jobs import (MAX_FINISHED_JOBS, MAX_JOB_AGE, JobQueueFull, JobRunner, JobStore,
+                  describe_job)
+from metrics import API_REQUEST_SECONDS, CONTENT_TYPE, DEFAULT_DIRECTORY, configure, render
+from query import QueryError, RecordIndex, is_query
+from retry import RetryPolicy, breaker_stats
+from scrape_profiler import ProfileStore
+from search_index import SEARCH_FIELDS, SearchIndex
+from stats import STATS, compute_all, read_stats, stats_path, write_stats
+from storage import DataFileStore
+from sqlite_store import KEEP_RUNS, SQLiteDataCache, open_default_store
 from manager import MultiSiteScraperManager
-from quote_scraper import QuoteScraper
-from book_scraper import BookScraper
-from scrapethissite_scraper import ScrapesiteScraper
+from registry import default_registry
+from web_scraper_base import WebScraper, logger
 
 app = Flask(__name__)
 swagger = Swagger(app, template={
@@ -21,17 +39,233 @@ swagger = Swagger(app, template={
 
 DATA_FILE = 'scraped_data.json'
 
+# 'json' (single DATA_FILE document), 'sqlite' (SQLITE_DB, seeded from DATA_FILE)
+# or 'columnar' (DATA_FILE, read through its mmap-ed columnar snapshot COLUMNAR_FILE)
+STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND', 'json')
+SQLITE_DB = os.environ.get('SQLITE_DB', 'scraped_data.db')
+# Parser processes per scrape (0: parse in the fetcher threads)
+PARSE_WORKERS = int(os.environ.get('PARSE_WORKERS', 0))
+# Runs of each data type whose records the SQLite backend keeps
+SQLITE_KEEP_RUNS = int(os.environ.get('SQLITE_KEEP_RUNS', KEEP_RUNS))
+COLUMNAR_FILE = os.environ.get('COLUMNAR_FILE', snapshot_path(DATA_FILE))
+
+# Statistics of the current data, shared by all workers (see `stats`)
+STATS_FILE = stats_path(DATA_FILE)
+
+# Atomic, lock-protected writes of DATA_FILE shared by all workers
+data_store = DataFileStore(DATA_FILE)
+sqlite_store = (open_default_store(SQLITE_DB, DATA_FILE, SQLITE_KEEP_RUNS)
+                if STORAGE_BACKEND == 'sqlite' else None)
+
+# Parsed data and serialized bodies, shared by the read endpoints of this worker
+if sqlite_store is not None:
+    data_cache = SQLiteDataCache(sqlite_store)
+elif STORAGE_BACKEND == 'columnar':
+    refresh_snapshot(data_store, COLUMNAR_FILE, force=False)
+    data_cache = ColumnarDataCache(COLUMNAR_FILE)
+else:
+    data_cache = ScrapedDataCache(DATA_FILE)
+
+# Record-level changes of every save, served by /api/data/<type>/changes
+change_log = sqlite_store if sqlite_store is not None else ChangeLog(changes_path(DATA_FILE))
+
+# Upstream pages and their validators, so repeat scrapes only revalidate
+http_cache = HTTPCache(os.environ.get('HTTP_CACHE_DIR', '.http_cache'),
+                       max_bytes=int(os.environ.get('HTTP_CACHE_MAX_BYTES', 50 * 1024 * 1024)))
+
+# Samples of every worker, merged by GET /metrics (gunicorn.conf.py clears them at startup)
+configure(os.environ.get('METRICS_DIR', DEFAULT_DIRECTORY))
+
+# Retries of failed upstream fetches (backoff with jitter, Retry-After on 429/503)
+WebScraper.retry_policy = RetryPolicy(max_retries=int(os.environ.get('FETCH_MAX_RETRIES', 3)))
+
+# Sites scraped by POST /api/scrape: the built-in scrapers plus any declared in SITES_FILE
+scraper_registry = default_registry(os.environ.get('SITES_FILE'))
+
+# Full-text index over quotes and book titles, kept per worker
+search_index = SearchIndex()
+
+# Background scrape jobs; job state lives on disk so any worker can report it
+job_store = JobStore(os.environ.get('JOBS_DIR', '.jobs'))
+job_runner = JobRunner(job_store, max_workers=int(os.environ.get('JOB_WORKERS', 2)),
+                       max_age=float(os.environ.get('JOB_RETENTION_SECONDS', MAX_JOB_AGE)),
+                       max_finished=int(os.environ.get('JOB_RETENTION_COUNT', MAX_FINISHED_JOBS)))
+
+
+@app.before_request
+def start_request_timer():
+    """Remember when the request started, for the latency histogram."""
+    g.request_start = time.perf_counter()
+
+
+@app.after_request
+def record_request_latency(response):
+    """Observe the request's latency under its route pattern."""
+    start = g.pop('request_start', None)
+    if start is not None:
+        route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        API_REQUEST_SECONDS.observe(time.perf_counter() - start, request.method, route,
+                                    response.status_code)
+    return response
+
+
+# Profile reports of ?profile=1 scrapes, readable by any worker
+profile_store = ProfileStore(os.environ.get('PROFILES_DIR', '.profiles'))
+
 
 def load_scraped_data():
-    """Load scraped data from JSON file."""
-    if not os.path.exists(DATA_FILE):
-        return {'error': 'No scraped data available'}, 404
+    """Load a fresh, mutable copy of the scraped data from the JSON file."""
+    return read_data_file(DATA_FILE)
+
+
+def _serialize(payload):
+    """Serialize a payload exactly as `jsonify` would."""
+    return app.json.response(payload).get_data()
+
+
+def _type_payload(data, key):
+    """Build the payload of a single-type endpoint such as /api/quotes."""
+    items = data.get('data', {}).get(key, [])
+    return {
+        'timestamp': data.get('timestamp'),
+        'count': len(items),
+        key: items
+    }
+
+
+def cached_json_response(key, build, snapshot=None):
+    """
+    Serve a JSON body built from the cached data, serializing it once per data generation.
+
+    The response carries a strong ETag (hash of the body) and a Last-Modified
+    header, and conditional requests that still match get an empty 304.
+    Clients accepting gzip (or brotli/zstd) get a body compressed once per
+    data generation, with its own ETag.
 
+    Args:
+        key: Cache key of the response body
+        build: Callable turning the parsed document into the response payload
+        snapshot: Snapshot to serve (default: the current one)
+    """
+    if snapshot is None:
+        snapshot = data_cache.snapshot()
+    if isinstance(snapshot, tuple):  # Error case
+        return jsonify(snapshot[0]), snapshot[1]
+
+    body, etag = snapshot.body(key, lambda data: _serialize(build(data)))
+    encoding = negotiate(request.accept_encodings, len(body))
+    if encoding is not None:
+        raw = body
+        body, etag = snapshot.body(f'{key}#{encoding}', lambda _data: encode(raw, encoding))
+
+    response = app.response_class(body, mimetype=app.json.mimetype)
+    if encoding is not None:
+        response.content_encoding = encoding
+    response.vary.add('Accept-Encoding')
+    response.set_etag(etag)
+    response.last_modified = datetime.fromtimestamp(snapshot.mtime, tz=timezone.utc)
+    response.cache_control.no_cache = True
+    response.vary.add('Accept')
+    return response.make_conditional(request)
+
+
+def query_json_response(data_type, build):
+    """
+    Serve one filtered, sorted page of a data type.
+
+    Uses the type's `RecordIndex`, built once per data generation, so the cost
+    depends on the number of matches and the page size, not the dataset size.
+
+    Args:
+        data_type: Data type to query
+        build: Callable turning (document, QueryPage) into the response payload
+    """
+    snapshot = data_cache.snapshot()
+    if isinstance(snapshot, tuple):  # Error case
+        return jsonify(snapshot[0]), snapshot[1]
+
+    index = snapshot.derived(
+        f'index/{data_type}',
+        lambda data: RecordIndex(data_type, data.get('data', {}).get(data_type, []))
+    )
     try:
-        with open(DATA_FILE, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except (json.JSONDecodeError, IOError) as e:
-        return {'error': f'Error reading data: {str(e)}'}, 500
+        page = index.query(request.args, version=snapshot.mtime)
+    except QueryError as e:
+        return jsonify({'error': str(e)}), 400
+
+    return jsonify({
+        **build(snapshot.data, page),
+        'count': len(page.records),
+        'total': page.total,
+        'limit': page.limit,
+        'offset': page.offset,
+        'next_cursor': page.next_cursor
+    })
+
+
+NDJSON_MIMETYPE = 'application/x-ndjson'
+
+# Records serialized per chunk of a streamed NDJSON response
+NDJSON_CHUNK_RECORDS = 200
+
+
+def _wants_ndjson():
+    """Whether the client prefers NDJSON over JSON (Accept: application/x-ndjson)."""
+    best = request.accept_mimetypes.best_match([app.json.mimetype, NDJSON_MIMETYPE])
+    return best == NDJSON_MIMETYPE
+
+
+def ndjson_response(data_type):
+    """
+    Stream the records of one data type as newline-delimited JSON.
+
+    Records are serialized a chunk at a time while the response is sent, so
+    the response never holds the whole body in memory and the first bytes
+    go out immediately. The SQLite backend also reads the rows incrementally.
+
+    Args:
+        data_type: Data type to stream
+    """
+    snapshot = data_cache.snapshot()
+    if isinstance(snapshot, tuple):  # Error case
+        return jsonify(snapshot[0]), snapshot[1]
+
+    available_data = snapshot.data.get('data', {})
+    if data_type not in available_data:
+        return jsonify({
+            'error': f'Data type "{data_type}" not found',
+            'available_types': list(available_data.keys())
+        }), 404
+
+    if sqlite_store is not None:
+        records = sqlite_store.iter_records(data_type, available_data.run_id(data_type))
+    else:
+        records = iter(available_data[data_type])
+
+    def generate():
+        while True:
+            chunk = [app.json.dumps(record, separators=(',', ':'))
+                     for _, record in zip(range(NDJSON_CHUNK_RECORDS), records)]
+            if not chunk:
+                break
+            yield '\n'.join(chunk) + '\n'
+
+    response = app.response_class(generate(), mimetype=NDJSON_MIMETYPE)
+    response.headers['X-Data-Timestamp'] = str(snapshot.data.get('timestamp'))
+    response.vary.add('Accept')
+    return response
+
+
+def type_response(key):
+    """Serve a single-type endpoint: the cached full list, or a page if queried."""
+    queried = is_query(key, request.args)
+    if not queried and _wants_ndjson():
+        return ndjson_response(key)
+    if queried:
+        return query_json_response(
+            key, lambda data, page: {'timestamp': data.get('timestamp'), key: page.records}
+        )
+    return cached_json_response(key, lambda data: _type_payload(data, key))
 
 
 @app.route('/api/data', methods=['GET'])
@@ -52,10 +286,7 @@ def get_all_data():
       404:
         description: No scraped data available
     """
-    data = load_scraped_data()
-    if isinstance(data, tuple):  # Error case
-        return jsonify(data[0]), data[1]
-    return jsonify(data)
+    return cached_json_response('all', lambda data: {**data, 'data': dict(data.get('data', {}))})
 
 
 @app.route('/api/quotes', methods=['GET'])
@@ -63,6 +294,31 @@ def get_quotes():
     """
     Get scraped quotes
     ---
+    parameters:
+      - name: limit
+        in: query
+        type: integer
+        description: Page size (default 100, max 1000)
+      - name: offset
+        in: query
+        type: integer
+        description: Number of matching records to skip
+      - name: cursor
+        in: query
+        type: string
+        description: next_cursor from the previous page (same filters and sort)
+      - name: sort
+        in: query
+        type: string
+        description: Sort field (author or text; prefix with - for descending)
+      - name: author
+        in: query
+        type: string
+        description: Only quotes by this author
+      - name: tag
+        in: query
+        type: string
+        description: Only quotes with this tag
     responses:
       200:
         description: Quotes data
@@ -75,19 +331,12 @@ def get_quotes():
               type: integer
             quotes:
               type: array
+      400:
+        description: Invalid query parameter
       404:
         description: No data available
     """
-    data = load_scraped_data()
-    if isinstance(data, tuple):  # Error case
-        return jsonify(data[0]), data[1]
-
-    quotes = data.get('data', {}).get('quotes', [])
-    return jsonify({
-        'timestamp': data.get('timestamp'),
-        'count': len(quotes),
-        'quotes': quotes
-    })
+    return type_response('quotes')
 
 
 @app.route('/api/books', methods=['GET'])
@@ -95,6 +344,39 @@ def get_books():
     """
     Get scraped books
     ---
+    parameters:
+      - name: limit
+        in: query
+        type: integer
+        description: Page size (default 100, max 1000)
+      - name: offset
+        in: query
+        type: integer
+        description: Number of matching records to skip
+      - name: cursor
+        in: query
+        type: string
+        description: next_cursor from the previous page (same filters and sort)
+      - name: sort
+        in: query
+        type: string
+        description: Sort field (title, price or rating; prefix with - for descending)
+      - name: rating
+        in: query
+        type: string
+        description: Only books with this rating (e.g. Three)
+      - name: availability
+        in: query
+        type: string
+        description: Only books with this availability
+      - name: min_price
+        in: query
+        type: number
+        description: Minimum price
+      - name: max_price
+        in: query
+        type: number
+        description: Maximum price
     responses:
       200:
         description: Books data
@@ -107,19 +389,27 @@ def get_books():
               type: integer
             books:
               type: array
+              items:
+                type: object
+                properties:
+                  title:
+                    type: string
+                  price:
+                    type: number
+                    description: Price in pounds (formerly a string such as "£51.77")
+                  availability:
+                    type: string
+                  rating:
+                    type: integer
+                    description: Star rating 0-5 (formerly a word such as "Three")
+                  source:
+                    type: string
+      400:
+        description: Invalid query parameter
       404:
         description: No data available
     """
-    data = load_scraped_data()
-    if isinstance(data, tuple):  # Error case
-        return jsonify(data[0]), data[1]
-
-    books = data.get('data', {}).get('books', [])
-    return jsonify({
-        'timestamp': data.get('timestamp'),
-        'count': len(books),
-        'books': books
-    })
+    return type_response('books')
 
 
 @app.route('/api/hockey', methods=['GET'])
@@ -127,6 +417,47 @@ def get_hockey_stats():
     """
     Get scraped hockey team statistics
     ---
+    parameters:
+      - name: limit
+        in: query
+        type: integer
+        description: Page size (default 100, max 1000)
+      - name: offset
+        in: query
+        type: integer
+        description: Number of matching records to skip
+      - name: cursor
+        in: query
+        type: string
+        description: next_cursor from the previous page (same filters and sort)
+      - name: sort
+        in: query
+        type: string
+        description: Sort field (name, year, wins or losses; prefix with - for descending)
+      - name: name
+        in: query
+        type: string
+        description: Only this team
+      - name: year
+        in: query
+        type: string
+        description: Only this season
+      - name: min_wins
+        in: query
+        type: integer
+        description: Minimum wins
+      - name: max_wins
+        in: query
+        type: integer
+        description: Maximum wins
+      - name: min_losses
+        in: query
+        type: integer
+        description: Minimum losses
+      - name: max_losses
+        in: query
+        type: integer
+        description: Maximum losses
     responses:
       200:
         description: Hockey stats
@@ -139,19 +470,26 @@ def get_hockey_stats():
               type: integer
             hockey_teams:
               type: array
+              items:
+                type: object
+                properties:
+                  name:
+                    type: string
+                  year:
+                    type: integer
+                  wins:
+                    type: integer
+                  losses:
+                    type: integer
+                  source:
+                    type: string
+                description: year, wins and losses were strings before the typed record models
+      400:
+        description: Invalid query parameter
       404:
         description: No data available
     """
-    data = load_scraped_data()
-    if isinstance(data, tuple):  # Error case
-        return jsonify(data[0]), data[1]
-
-    hockey_teams = data.get('data', {}).get('hockey_teams', [])
-    return jsonify({
-        'timestamp': data.get('timestamp'),
-        'count': len(hockey_teams),
-        'hockey_teams': hockey_teams
-    })
+    return type_response('hockey_teams')
 
 
 @app.route('/api/data/<data_type>', methods=['GET'])
@@ -166,17 +504,33 @@ def get_data_by_type(data_type):
         required: true
         description: Type of data to retrieve (quotes, books, hockey_teams)
         example: quotes
+      - name: limit
+        in: query
+        type: integer
+        description: Page size (default 100, max 1000)
+      - name: offset
+        in: query
+        type: integer
+      - name: cursor
+        in: query
+        type: string
+      - name: sort
+        in: query
+        type: string
+        description: Sort field (see the type's endpoint), prefix with - for descending
     responses:
       200:
         description: Data of requested type
+      400:
+        description: Invalid query parameter
       404:
         description: Data type not found
     """
-    data = load_scraped_data()
-    if isinstance(data, tuple):  # Error case
-        return jsonify(data[0]), data[1]
+    snapshot = data_cache.snapshot()
+    if isinstance(snapshot, tuple):  # Error case
+        return jsonify(snapshot[0]), snapshot[1]
 
-    available_data = data.get('data', {})
+    available_data = snapshot.data.get('data', {})
 
     if data_type not in available_data:
         return jsonify({
@@ -184,12 +538,126 @@ def get_data_by_type(data_type):
             'available_types': list(available_data.keys())
         }), 404
 
-    items = available_data.get(data_type, [])
+    queried = is_query(data_type, request.args)
+    if not queried and _wants_ndjson():
+        return ndjson_response(data_type)
+
+    if queried:
+        return query_json_response(data_type, lambda data, page: {
+            'timestamp': data.get('timestamp'),
+            'type': data_type,
+            'data': page.records
+        })
+
+    def build(data):
+        items = data.get('data', {}).get(data_type, [])
+        return {
+            'timestamp': data.get('timestamp'),
+            'type': data_type,
+            'count': len(items) if isinstance(items, list) else 1,
+            'data': items
+        }
+
+    return cached_json_response(f'data/{data_type}', build)
+
+
+@app.route('/api/data/<data_type>.ndjson', methods=['GET'])
+def stream_data_by_type(data_type):
+    """
+    Stream a data type as newline-delimited JSON, one record per line
+    ---
+    produces:
+      - application/x-ndjson
+    parameters:
+      - name: data_type
+        in: path
+        type: string
+        required: true
+        description: Type of data to stream (quotes, books, hockey_teams)
+        example: quotes
+    responses:
+      200:
+        description: One JSON record per line
+      400:
+        description: Query parameters are not supported
+      404:
+        description: Data type not found
+    """
+    if is_query(data_type, request.args):
+        return jsonify({'error': 'NDJSON export does not support query parameters'}), 400
+    return ndjson_response(data_type)
+
+
+@app.route('/api/data/<data_type>/changes', methods=['GET'])
+def get_changes(data_type):
+    """
+    Get the record changes of a data type since a sequence number or timestamp
+    ---
+    parameters:
+      - name: data_type
+        in: path
+        type: string
+        required: true
+        description: Type of data (quotes, books, hockey_teams)
+        example: quotes
+      - name: after
+        in: query
+        type: integer
+        description: Sequence number (the previous response's next); only later changes are returned
+        example: 0
+      - name: since
+        in: query
+        type: string
+        description: ISO 8601 timestamp; only changes saved later are returned
+        example: "2024-01-01T00:00:00"
+    responses:
+      200:
+        description: Inserted, updated and deleted records, oldest first, and the next cursor
+      400:
+        description: Invalid after or since parameter
+      404:
+        description: Data type not found
+    """
+    if data_type not in RECORD_KEYS:
+        return jsonify({
+            'error': f'Data type "{data_type}" not found',
+            'available_types': list(RECORD_KEYS)
+        }), 404
+
+    after = request.args.get('after') or None
+    if after is not None:
+        try:
+            after = int(after)
+        except ValueError:
+            after = -1
+        if after < 0:
+            return jsonify({'error': 'after must be a non-negative integer'}), 400
+
+    since = request.args.get('since') or None
+    if since is not None:
+        try:
+            since = parse_since(since)
+        except ValueError:
+            return jsonify({'error': 'since must be an ISO 8601 timestamp'}), 400
+
+    try:
+        # Read the newest sequence number first: changes saved meanwhile are returned next time
+        last_seq = change_log.last_seq()
+        changes = change_log.changes_since(data_type, since, after)
+        # Dropped from a bounded change log before the client caught up
+        truncated = after is not None and after + 1 < change_log.oldest_seq()
+    except (OSError, ValueError, sqlite3.Error) as e:
+        return jsonify({'error': f'Error reading changes: {str(e)}'}), 500
+
     return jsonify({
-        'timestamp': data.get('timestamp'),
         'type': data_type,
-        'count': len(items) if isinstance(items, list) else 1,
-        'data': items
+        'after': after,
+        'since': since,
+        'next': max(last_seq, changes[-1].get('seq', 0) if changes else 0),
+        'truncated': truncated,
+        'until': max((change['timestamp'] for change in changes), default=since),
+        'count': len(changes),
+        'changes': changes
     })
 
 
@@ -217,35 +685,192 @@ def get_status():
       404:
         description: No data available
     """
-    if not os.path.exists(DATA_FILE):
+    if sqlite_store is None and not os.path.exists(DATA_FILE):
         return jsonify({
             'status': 'no_data',
             'message': 'No scraped data available',
             'file': DATA_FILE
         }), 404
 
-    data = load_scraped_data()
-    if isinstance(data, tuple):  # Error case
-        return jsonify(data[0]), data[1]
+    def build(data):
+        system_data = data.get('data', {})
+        return {
+            'status': 'ok',
+            'message': 'API is running',
+            'data_timestamp': data.get('timestamp'),
+            'available_endpoints': {
+                '/api/data': 'Get all scraped data',
+                '/api/quotes': 'Get quotes',
+                '/api/books': 'Get books',
+                '/api/hockey': 'Get hockey stats',
+                '/api/data/<type>': 'Get specific data type',
+                '/api/status': 'Get API status'
+            },
+            'data_summary': {key: len(value) if isinstance(value, list) else 1
+                             for key, value in system_data.items()}
+        }
+
+    return cached_json_response('status', build)
+
+
+@app.route('/api/upstreams', methods=['GET'])
+def get_upstreams():
+    """
+    Get retry counters and circuit breaker state of the scraped hosts
+    ---
+    responses:
+      200:
+        description: Per host, the breaker state (closed, open or half_open) and the
+          requests, failures, retries, Retry-After waits, rejected fetches and breaker
+          openings of this worker
+    """
+    return jsonify({'hosts': breaker_stats()})
+
+
+@app.route('/api/search', methods=['GET'])
+def search():
+    """
+    Full-text search over quotes (text, author, tags) and book titles
+    ---
+    parameters:
+      - name: q
+        in: query
+        type: string
+        required: true
+        description: Search text; every word must match, the last one also as a prefix
+        example: einstein thin
+      - name: type
+        in: query
+        type: string
+        description: Restrict to one data type (quotes or books)
+      - name: limit
+        in: query
+        type: integer
+        default: 20
+        description: Maximum number of results (max 100)
+    responses:
+      200:
+        description: Ranked search results
+      400:
+        description: Missing or invalid parameter
+      404:
+        description: No data available
+    """
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({'error': 'q is required'}), 400
+
+    data_type = request.args.get('type')
+    if data_type and data_type not in SEARCH_FIELDS:
+        return jsonify({
+            'error': f'Data type "{data_type}" is not searchable',
+            'searchable_types': list(SEARCH_FIELDS)
+        }), 400
+
+    limit = request.args.get('limit', 20, type=int)
+    if not 1 <= limit <= 100:
+        return jsonify({'error': 'limit must be between 1 and 100'}), 400
+
+    snapshot = data_cache.snapshot()
+    if isinstance(snapshot, tuple):  # Error case
+        return jsonify(snapshot[0]), snapshot[1]
 
-    system_data = data.get('data', {})
+    started = time.perf_counter()
+    index = snapshot.derived('search', search_index.sync)
+    results = index.search(query, types=[data_type] if data_type else None, limit=limit)
     return jsonify({
-        'status': 'ok',
-        'message': 'API is running',
-        'data_timestamp': data.get('timestamp'),
-        'available_endpoints': {
-            '/api/data': 'Get all scraped data',
-            '/api/quotes': 'Get quotes',
-            '/api/books': 'Get books',
-            '/api/hockey': 'Get hockey stats',
-            '/api/data/<type>': 'Get specific data type',
-            '/api/status': 'Get API status'
-        },
-        'data_summary': {key: len(value) if isinstance(value, list) else 1
-                        for key, value in system_data.items()}
+        'query': query,
+        'count': len(results),
+        'took_ms': round((time.perf_counter() - started) * 1000, 3),
+        'results': results
     })
 
 
+def _stat_payload(name, data, stats):
+    """Build the response payload of one statistic."""
+    return {'timestamp': data.get('timestamp'), **stats[name]}
+
+
+def _snapshot_stats(snapshot):
+    """
+    Return every statistic of a snapshot, computed once across all workers.
+
+    The first worker to need them (normally the one that saved the scrape)
+    computes them and writes `STATS_FILE`, tagged with the data generation:
+    the snapshot's mtime, which is the same in every worker. The other
+    workers load that file instead of computing them again.
+    """
+    def build(data):
+        stats = read_stats(STATS_FILE, snapshot.mtime)
+        if stats is None:
+            stats = compute_all(data.get('data', {}))
+            try:
+                write_stats(STATS_FILE, stats, snapshot.mtime)
+            except OSError as e:
+                logger.warning(f"Error saving statistics: {e}")
+        return stats
+
+    return snapshot.derived('stats', build)
+
+
+def _materialize_stats():
+    """Compute, save and serialize every statistic of the current data, right after a scrape."""
+    snapshot = data_cache.snapshot()
+    if isinstance(snapshot, tuple):  # Error case
+        return
+    stats = _snapshot_stats(snapshot)
+    for name in STATS:
+        snapshot.body(f'stats/{name}',
+                      lambda data, name=name: _serialize(_stat_payload(name, data, stats)))
+
+
+@app.route('/api/stats', methods=['GET'])
+def list_stats():
+    """
+    List the available aggregate statistics
+    ---
+    responses:
+      200:
+        description: Statistic names and the data type each is computed from
+    """
+    return jsonify({
+        'stats': {name: {'type': data_type, 'url': f'/api/stats/{name}'}
+                  for name, (data_type, _aggregate) in STATS.items()}
+    })
+
+
+@app.route('/api/stats/<name>', methods=['GET'])
+def get_stat(name):
+    """
+    Get an aggregate statistic, precomputed once per scrape
+    ---
+    parameters:
+      - name: name
+        in: path
+        type: string
+        required: true
+        description: authors (quotes per author), tags (tag frequencies), ratings (price
+          distribution per book rating) or teams (win/loss percentage per hockey team)
+        example: tags
+    responses:
+      200:
+        description: The aggregate
+      404:
+        description: Unknown statistic or no data available
+    """
+    if name not in STATS:
+        return jsonify({
+            'error': f'Statistic "{name}" not found',
+            'available_stats': list(STATS)
+        }), 404
+    snapshot = data_cache.snapshot()
+    if isinstance(snapshot, tuple):  # Error case
+        return jsonify(snapshot[0]), snapshot[1]
+    stats = _snapshot_stats(snapshot)
+    return cached_json_response(f'stats/{name}', lambda data: _stat_payload(name, data, stats),
+                                snapshot)
+
+
 @app.route('/', methods=['GET'])
 def home():
     """Welcome page with API documentation."""
@@ -260,14 +885,191 @@ def home():
             'GET /api/books': 'Get books data',
             'GET /api/hockey': 'Get hockey stats',
             'GET /api/data/<type>': 'Get specific data type (e.g., /api/data/quotes)',
-            'POST /api/scrape': 'Scrape all data',
+            'GET /api/data/<type>.ndjson': 'Stream a data type as NDJSON (or send '
+                                           'Accept: application/x-ndjson)',
+            'GET /api/data/<type>/changes?after=<seq>': 'Get records changed after a cursor',
+            'GET /api/search?q=<text>': 'Full-text search over quotes and book titles',
+            'GET /api/stats/<name>': 'Aggregates: authors, tags, ratings, teams',
+            'GET /api/upstreams': 'Retry and circuit breaker state per scraped host',
+            'GET /metrics': 'Prometheus metrics (fetch, parse and API latency)',
+            'POST /api/scrape': 'Scrape all data (background job; ?wait=true to block, '
+                                '?delta=true to save only changes)',
             'POST /api/scrape/quotes': 'Scrape quotes only',
             'POST /api/scrape/books': 'Scrape books only',
-            'POST /api/scrape/hockey': 'Scrape hockey stats only'
+            'POST /api/scrape/hockey': 'Scrape hockey stats only',
+            'POST /api/scrape/<site>': 'Scrape one registered site (see /api/sites)',
+            'GET /api/sites': 'List the registered sites',
+            'GET /api/jobs/<id>': 'Get progress of a scrape job',
+            'GET /api/profiles/<id>': 'Get a profile of a POST /api/scrape?profile=1 run'
         }
     })
 
 
+def _wants_wait():
+    """Whether the client asked to block until the scrape finishes (?wait=true)."""
+    return request.args.get('wait', 'false').lower() in ('1', 'true', 'yes')
+
+
+def _wants_delta():
+    """Whether the client asked to save only changed records (?delta=true)."""
+    return request.args.get('delta', 'false').lower() in ('1', 'true', 'yes')
+
+
+def _wants_profile():
+    """Whether the client asked to profile the scrape (?profile=1)."""
+    return request.args.get('profile', 'false').lower() in ('1', 'true', 'yes')
+
+
+# Fetch engines of a full scrape (?engine=...)
+SCRAPE_ENGINES = ('threads', 'async')
+
+
+def _save_scrape(timestamp, data, delta=False):
+    """
+    Save scraped records to the configured backend and log the changed records.
+
+    Args:
+        timestamp: Scrape timestamp (ISO format)
+        data: Records by data type
+        delta: Write only inserts, updates and deletes; nothing if no record changed
+
+    Returns:
+        Change counts by data type
+    """
+    if sqlite_store is not None:
+        deltas = sqlite_store.save_changes(timestamp, data, delta=delta)
+    else:
+        deltas = save_json_changes(data_store, change_log, timestamp, data, delta=delta)
+    if not delta or any(deltas.values()):
+        if STORAGE_BACKEND == 'columnar':
+            refresh_snapshot(data_store, COLUMNAR_FILE)
+        data_cache.invalidate()
+        _materialize_stats()
+    return {key: changes.summary() for key, changes in deltas.items()}
+
+
+def _run_full_scrape(pages, page_callback=None, delta=False, profile=False, engine='threads'):
+    """Scrape all sources, save the results and return a summary."""
+    manager = MultiSiteScraperManager(http_cache=http_cache, page_callback=page_callback,
+                                      registry=scraper_registry)
+    if engine == 'async':
+        results = asyncio.run(manager.run_all_scrapers_async(num_pages=pages,
+                                                             parse_workers=PARSE_WORKERS))
+    else:
+        results = manager.run_all_scrapers(num_pages=pages, parse_workers=PARSE_WORKERS,
+                                           profile=profile)
+    data = results['data']
+    if delta:
+        # A failed source would otherwise look like every one of its records was deleted
+        data = {key: records for key, records in data.items() if key not in manager.failed}
+    changes = _save_scrape(results['timestamp'], data, delta=delta)
+    search_index.sync(results)
+
+    summary = {
+        'timestamp': results.get('timestamp'),
+        'data_summary': {key: len(value) if isinstance(value, list) else 1
+                         for key, value in results.get('data', {}).items()},
+        'changes': changes
+    }
+    if manager.profile is not None:
+        report = profile_store.save(manager.profile, kind='scrape',
+                                    params={'pages': pages, 'delta': delta})
+        summary['profile'] = {'id': report['id'], 'url': f"/api/profiles/{report['id']}",
+                              'stages': report['stages']}
+    return summary
+
+
+def _run_source_scrape(key, pages, page_callback=None, delta=False):
+    """Scrape one source, merge its records into the stored data and return them with the changes."""
+    scraper = scraper_registry.create(key, http_cache=http_cache)
+    scraper.page_callback = page_callback
+    parse_pool = ProcessPoolExecutor(max_workers=PARSE_WORKERS) if PARSE_WORKERS > 0 else None
+    try:
+        records = scraper.scrape(pages, parse_pool)
+    finally:
+        if parse_pool is not None:
+            parse_pool.shutdown()
+
+    # Append a run (SQLite) or merge into the data file under the inter-process lock
+    changes = {}
+    try:
+        changes = _save_scrape(datetime.now().isoformat(), {key: records}, delta=delta)
+    except (IOError, OSError, ValueError, sqlite3.Error) as e:
+        logger.error(f"Error saving {key}: {e}")
+        data_cache.invalidate()
+    search_index.update(key, records)
+
+    return records, changes.get(key)
+
+
+def _start_job(kind, params, pages_total, work):
+    """
+    Queue `work(page_callback)` as a background job and answer 202 Accepted.
+
+    Args:
+        kind: Job type reported by /api/jobs/<id>
+        params: Request parameters recorded with the job: ``pages`` (per
+            site), ``delta``, and for full scrapes ``engine`` and ``profile``
+        pages_total: Expected number of pages over all sites
+        work: Callable running the scrape and returning the job result
+    """
+    pages = params['pages']
+    try:
+        job = job_runner.submit(kind, params, pages_total,
+                                lambda progress: work(progress.page_done))
+    except JobQueueFull as e:
+        return jsonify({
+            'status': 'error',
+            'message': f'Too many scrape jobs pending: {str(e)}'
+        }), 503
+
+    status_url = f"/api/jobs/{job['id']}"
+    response = jsonify({
+        'status': 'accepted',
+        'message': f'Scrape job queued for {pages} page(s)',
+        'job_id': job['id'],
+        'status_url': status_url,
+        'job': describe_job(job)
+    })
+    response.headers['Location'] = status_url
+    return response, 202
+
+
+def _scrape_source(key, noun=None):
+    """Handle POST /api/scrape/<source> for one registered source."""
+    if key not in scraper_registry:
+        return jsonify({
+            'error': f'Site "{key}" not found',
+            'available_sites': scraper_registry.keys()
+        }), 404
+    noun = noun or scraper_registry.label(key)
+    try:
+        pages = request.args.get('pages', 1, type=int)
+        if pages < 1:
+            return jsonify({'error': 'pages must be greater than 0'}), 400
+
+        delta = _wants_delta()
+        if not _wants_wait():
+            def work(page_callback):
+                records, changes = _run_source_scrape(key, pages, page_callback, delta)
+                return {'count': len(records), 'changes': changes}
+            return _start_job(f'scrape/{key}', {'pages': pages, 'delta': delta}, pages, work)
+
+        records, changes = _run_source_scrape(key, pages, delta=delta)
+        return jsonify({
+            'status': 'success',
+            'message': f'Successfully scraped {len(records)} {noun} from {pages} page(s)',
+            'count': len(records),
+            'changes': changes,
+            key: records
+        }), 200
+    except Exception as e:  # pylint: disable=broad-exception-caught
+        return jsonify({
+            'status': 'error',
+            'message': f'Scraping failed: {str(e)}'
+        }), 500
+
+
 @app.route('/api/scrape', methods=['POST'])
 def scrape_all():
     """
@@ -279,9 +1081,31 @@ def scrape_all():
         type: integer
         default: 1
         description: Number of pages to scrape from each site
+      - name: wait
+        in: query
+        type: boolean
+        default: false
+        description: Block until scraping finishes instead of starting a background job
+      - name: delta
+        in: query
+        type: boolean
+        default: false
+        description: Save only inserted, updated and deleted records (nothing if unchanged)
+      - name: profile
+        in: query
+        type: boolean
+        default: false
+        description: Profile the scrapers and save a report under /api/profiles
+      - name: engine
+        in: query
+        type: string
+        enum: [threads, async]
+        default: threads
+        description: Fetch with one thread per site, or all sites on one asyncio event loop
+          (no profiling)
     responses:
       200:
-        description: Scraping completed successfully
+        description: Scraping completed successfully (wait=true)
         schema:
           type: object
           properties:
@@ -291,24 +1115,39 @@ def scrape_all():
               type: string
             data:
               type: object
+      202:
+        description: Scrape job queued; poll status_url for progress
       500:
         description: Error during scraping
+      503:
+        description: Too many scrape jobs pending
     """
     try:
         pages = request.args.get('pages', 1, type=int)
         if pages < 1:
             return jsonify({'error': 'pages must be greater than 0'}), 400
 
-        manager = MultiSiteScraperManager()
-        results = manager.run_all_scrapers(num_pages=pages)
-        manager.save_results(DATA_FILE)
+        engine = request.args.get('engine', 'threads')
+        if engine not in SCRAPE_ENGINES:
+            return jsonify({'error': f"engine must be one of {', '.join(SCRAPE_ENGINES)}"}), 400
 
+        delta = _wants_delta()
+        profile = _wants_profile()
+        if profile and engine != 'threads':
+            return jsonify({'error': 'profile is only supported with engine=threads'}), 400
+        if not _wants_wait():
+            params = {'pages': pages, 'delta': delta, 'engine': engine}
+            if profile:
+                params['profile'] = True
+            return _start_job('scrape', params, pages * len(scraper_registry),
+                              lambda page_callback: _run_full_scrape(pages, page_callback, delta,
+                                                                     profile, engine))
+
+        summary = _run_full_scrape(pages, delta=delta, profile=profile, engine=engine)
         return jsonify({
             'status': 'success',
             'message': f'Successfully scraped {pages} page(s) from all sources',
-            'timestamp': results.get('timestamp'),
-            'data_summary': {key: len(value) if isinstance(value, list) else 1
-                           for key, value in results.get('data', {}).items()}
+            **summary
         }), 200
     except Exception as e:  # pylint: disable=broad-exception-caught
         return jsonify({
@@ -328,41 +1167,25 @@ def scrape_quotes():
         type: integer
         default: 1
         description: Number of pages to scrape
+      - name: wait
+        in: query
+        type: boolean
+        default: false
+        description: Block until scraping finishes instead of starting a background job
+      - name: delta
+        in: query
+        type: boolean
+        default: false
+        description: Save only inserted, updated and deleted records (nothing if unchanged)
     responses:
       200:
-        description: Quotes scraped successfully
+        description: Quotes scraped successfully (wait=true)
+      202:
+        description: Scrape job queued; poll status_url for progress
       500:
         description: Error during scraping
     """
-    try:
-        pages = request.args.get('pages', 1, type=int)
-        if pages < 1:
-            return jsonify({'error': 'pages must be greater than 0'}), 400
-
-        scraper = QuoteScraper()
-        quotes = scraper.scrape_quotes(pages=pages)
-
-        # Load existing data and update
-        data = load_scraped_data()
-        if not isinstance(data, tuple):
-            data['data']['quotes'] = quotes
-            try:
-                with open(DATA_FILE, 'w', encoding='utf-8') as f:
-                    json.dump(data, f, indent=2, ensure_ascii=False)
-            except IOError:
-                pass
-
-        return jsonify({
-            'status': 'success',
-            'message': f'Successfully scraped {len(quotes)} quotes from {pages} page(s)',
-            'count': len(quotes),
-            'quotes': quotes
-        }), 200
-    except Exception as e:  # pylint: disable=broad-exception-caught
-        return jsonify({
-            'status': 'error',
-            'message': f'Scraping failed: {str(e)}'
-        }), 500
+    return _scrape_source('quotes', 'quotes')
 
 
 @app.route('/api/scrape/books', methods=['POST'])
@@ -376,41 +1199,25 @@ def scrape_books():
         type: integer
         default: 1
         description: Number of pages to scrape
+      - name: wait
+        in: query
+        type: boolean
+        default: false
+        description: Block until scraping finishes instead of starting a background job
+      - name: delta
+        in: query
+        type: boolean
+        default: false
+        description: Save only inserted, updated and deleted records (nothing if unchanged)
     responses:
       200:
-        description: Books scraped successfully
+        description: Books scraped successfully (wait=true)
+      202:
+        description: Scrape job queued; poll status_url for progress
       500:
         description: Error during scraping
     """
-    try:
-        pages = request.args.get('pages', 1, type=int)
-        if pages < 1:
-            return jsonify({'error': 'pages must be greater than 0'}), 400
-
-        scraper = BookScraper()
-        books = scraper.scrape_books(pages=pages)
-
-        # Load existing data and update
-        data = load_scraped_data()
-        if not isinstance(data, tuple):
-            data['data']['books'] = books
-            try:
-                with open(DATA_FILE, 'w', encoding='utf-8') as f:
-                    json.dump(data, f, indent=2, ensure_ascii=False)
-            except IOError:
-                pass
-
-        return jsonify({
-            'status': 'success',
-            'message': f'Successfully scraped {len(books)} books from {pages} page(s)',
-            'count': len(books),
-            'books': books
-        }), 200
-    except Exception as e:  # pylint: disable=broad-exception-caught
-        return jsonify({
-            'status': 'error',
-            'message': f'Scraping failed: {str(e)}'
-        }), 500
+    return _scrape_source('books', 'books')
 
 
 @app.route('/api/scrape/hockey', methods=['POST'])
@@ -424,41 +1231,152 @@ def scrape_hockey():
         type: integer
         default: 1
         description: Number of pages to scrape
+      - name: wait
+        in: query
+        type: boolean
+        default: false
+        description: Block until scraping finishes instead of starting a background job
+      - name: delta
+        in: query
+        type: boolean
+        default: false
+        description: Save only inserted, updated and deleted records (nothing if unchanged)
     responses:
       200:
-        description: Hockey stats scraped successfully
+        description: Hockey stats scraped successfully (wait=true)
+      202:
+        description: Scrape job queued; poll status_url for progress
       500:
         description: Error during scraping
     """
-    try:
-        pages = request.args.get('pages', 1, type=int)
-        if pages < 1:
-            return jsonify({'error': 'pages must be greater than 0'}), 400
+    return _scrape_source('hockey_teams', 'records')
 
-        scraper = ScrapesiteScraper()
-        stats = scraper.scrape_hockey_stats(pages=pages)
 
-        # Load existing data and update
-        data = load_scraped_data()
-        if not isinstance(data, tuple):
-            data['data']['hockey_teams'] = stats
-            try:
-                with open(DATA_FILE, 'w', encoding='utf-8') as f:
-                    json.dump(data, f, indent=2, ensure_ascii=False)
-            except IOError:
-                pass
+@app.route('/api/scrape/<site>', methods=['POST'])
+def scrape_site(site):
+    """
+    Scrape one registered site
+    ---
+    parameters:
+      - name: site
+        in: path
+        type: string
+        required: true
+        description: Data type of the site (see /api/sites)
+        example: quotes
+      - name: pages
+        in: query
+        type: integer
+        default: 1
+        description: Number of pages to scrape
+      - name: wait
+        in: query
+        type: boolean
+        default: false
+        description: Block until scraping finishes instead of starting a background job
+      - name: delta
+        in: query
+        type: boolean
+        default: false
+        description: Save only inserted, updated and deleted records (nothing if unchanged)
+    responses:
+      200:
+        description: Site scraped successfully (wait=true)
+      202:
+        description: Scrape job queued; poll status_url for progress
+      404:
+        description: Site not registered
+      500:
+        description: Error during scraping
+    """
+    return _scrape_source(site)
 
-        return jsonify({
-            'status': 'success',
-            'message': f'Successfully scraped {len(stats)} records from {pages} page(s)',
-            'count': len(stats),
-            'hockey_teams': stats
-        }), 200
-    except Exception as e:  # pylint: disable=broad-exception-caught
-        return jsonify({
-            'status': 'error',
-            'message': f'Scraping failed: {str(e)}'
-        }), 500
+
+@app.route('/api/sites', methods=['GET'])
+def get_sites():
+    """
+    List the sites scraped by POST /api/scrape
+    ---
+    responses:
+      200:
+        description: Per site, its data type and scraper; declared sites also give their
+          base URL, record selector, fields, page URL template and delay
+    """
+    return jsonify({'sites': scraper_registry.describe()})
+
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """
+    Get the progress of a background scrape job
+    ---
+    parameters:
+      - name: job_id
+        in: path
+        type: string
+        required: true
+        description: Job ID returned by a POST /api/scrape* request
+    responses:
+      200:
+        description: Job status, progress (pages done, records, errors) and elapsed time
+      404:
+        description: Job not found
+    """
+    job = job_store.load(job_id)
+    if job is None:
+        return jsonify({'error': f'Job "{job_id}" not found'}), 404
+    return jsonify(describe_job(job))
+
+
+@app.route('/api/profiles', methods=['GET'])
+def list_profiles():
+    """
+    List the saved scrape profiles, newest first
+    ---
+    responses:
+      200:
+        description: ID, time, run parameters, duration and seconds per stage of each profile
+    """
+    return jsonify({'profiles': profile_store.summaries()})
+
+
+@app.route('/api/profiles/<profile_id>', methods=['GET'])
+def get_profile(profile_id):
+    """
+    Get a scrape profile
+    ---
+    parameters:
+      - name: profile_id
+        in: path
+        type: string
+        required: true
+    responses:
+      200:
+        description: Seconds per stage (fetch, rate_limit, cache, parse, extract, waiting, other)
+          and top functions, overall and per scraper
+      404:
+        description: Unknown profile
+    """
+    report = profile_store.load(profile_id)
+    if report is None:
+        return jsonify({'error': f'Profile "{profile_id}" not found'}), 404
+    return jsonify(report)
+
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """
+    Get Prometheus metrics of all workers
+    ---
+    produces:
+      - text/plain
+    responses:
+      200:
+        description: Histograms of upstream fetch latency and bytes, rate limit waits,
+          parse and extraction time, HTTP cache hits, retries and circuit breaker state
+          per host, and API request latency per route, in the Prometheus text format
+    """
+    return app.response_class(render(), content_type=CONTENT_TYPE)
 
 
 @app.errorhandler(404)
@@ -0,0 +1,127 @@
+"""
+Asyncio fetch engine used by `WebScraper.scrape_async`.
+
+One `aiohttp` session multiplexes every site and page on a single event
+loop. The connector caps open connections per host and in total. The engine
+only sends requests: rate limiting, retries, the circuit breaker, the HTTP
+cache and the connect and read timeouts are applied by
+`WebScraper.fetch_page_async`, exactly as for threaded fetches.
+"""
+import asyncio
+import time
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlparse
+
+import aiohttp
+
+from metrics import FETCH_BYTES, FETCH_SECONDS
+from web_scraper_base import USER_AGENT, WebScraper
+
+
+def _client_timeout(connect: float, read: float) -> aiohttp.ClientTimeout:
+    """
+    Build the aiohttp counterpart of a ``(connect, read)`` `requests` timeout.
+
+    There is no total limit, so a response that keeps trickling in is bounded
+    by the time between reads, as with `requests`. ``sock_connect`` only times
+    the connection itself, not the wait for a free connection under the
+    per-host limit.
+    """
+    return aiohttp.ClientTimeout(total=None, sock_connect=connect, sock_read=read)
+
+
+class AsyncResponse:
+    """Outcome of one request: the response, or the error that prevented it."""
+
+    def __init__(self, url: str, status: Optional[int] = None, headers: Any = None,
+                 content: bytes = b'', error: Optional[str] = None):
+        """
+        Initialize the response.
+
+        Args:
+            url: Final URL of the response (after redirects)
+            status: HTTP status, or None if no response was received (``status_code``,
+                as on a `requests.Response`)
+            headers: Response headers (case-insensitive mapping)
+            content: Response body
+            error: Description of the connection error, timeout or error status
+        """
+        self.url = url
+        self.status_code = status
+        self.headers = headers if headers is not None else {}
+        self.content = content
+        self.error = error
+        # Set when the HTTP cache revalidated the page and supplied the body
+        self.from_cache = False
+
+    def __bool__(self) -> bool:
+        return self.error is None
+
+
+class AsyncFetchEngine:
+    """Shared aiohttp session with per-host connection limits."""
+
+    def __init__(self, per_host_limit: int = 4, total_limit: int = 100,
+                 connect_timeout: float = WebScraper.connect_timeout,
+                 read_timeout: float = WebScraper.read_timeout):
+        """
+        Initialize the engine.
+
+        Args:
+            per_host_limit: Maximum open connections to a single host
+            total_limit: Maximum open connections overall
+            connect_timeout: Default seconds to wait for a connection
+            read_timeout: Default seconds to wait for each read from the server
+        """
+        self.per_host_limit = per_host_limit
+        self.total_limit = total_limit
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.session: Optional[aiohttp.ClientSession] = None
+
+    async def __aenter__(self) -> 'AsyncFetchEngine':
+        connector = aiohttp.TCPConnector(limit=self.total_limit,
+                                         limit_per_host=self.per_host_limit)
+        self.session = aiohttp.ClientSession(
+            connector=connector,
+            headers={'User-Agent': USER_AGENT},
+            timeout=_client_timeout(self.connect_timeout, self.read_timeout)
+        )
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.session.close()
+        self.session = None
+
+    async def fetch(self, url: str, headers: Optional[Dict[str, str]] = None,
+                    timeout: Optional[Tuple[float, float]] = None) -> AsyncResponse:
+        """
+        Send one GET request, recording its latency and body size.
+
+        Args:
+            url: URL to fetch
+            headers: Extra request headers (e.g. conditional validators)
+            timeout: (connect, read) timeouts in seconds, as for `requests`;
+                defaults to the engine's
+
+        Returns:
+            The response; a connection error, timeout or error status (>= 400)
+            is reported in its ``error`` instead of raised
+        """
+        host = urlparse(url).netloc
+        options = {} if timeout is None else {'timeout': _client_timeout(*timeout)}
+        start = time.perf_counter()
+        try:
+            async with self.session.get(url, headers=headers, **options) as response:
+                if response.status >= 400:
+                    error = f"{response.status} {response.reason} for url: {url}"
+                    return AsyncResponse(str(response.url), response.status, response.headers,
+                                         error=error)
+                body = await response.read()
+                if response.status == 200:
+                    FETCH_BYTES.observe(len(body), host)
+                return AsyncResponse(str(response.url), response.status, response.headers, body)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            return AsyncResponse(url, error=str(e) or type(e).__name__)
+        finally:
+            FETCH_SECONDS.observe(time.perf_counter() - start, host)
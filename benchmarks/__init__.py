@@ -0,0 +1,5 @@
+"""
+Offline benchmarks for the scrapers and the API.
+
+Run from the repository root, e.g. ``python -m benchmarks.parse_benchmark``.
+"""
@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+Load test of the API's read endpoints on synthetic data.
+
+For each data size, writes a synthetic scraped_data.json (the records of
+scraped_data.json repeated with unique text, split evenly across the data
+types) into a temporary directory, starts `api:app` there under gunicorn and
+runs concurrent clients against each endpoint for a fixed time. Reports, per
+endpoint and size, the latency of the first request (which serializes the
+body, and for the first endpoint also loads the data file in its worker),
+then throughput and p50/p90/p99 latency once warm. Save the JSON output to
+compare versions.
+
+Environment variables such as STORAGE_BACKEND are passed to the server.
+
+Usage:
+    python -m benchmarks.api_load_benchmark [--records 1000 100000] [--clients 8]
+        [--duration 10] [--workers 4] [--accept-encoding identity] [--json]
+        [--output results.json]
+"""
+import argparse
+import http.client
+import math
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from benchmarks.report import build_report, write_report
+from benchmarks.scrape_benchmark import percentile
+from benchmarks.snapshot_benchmark import synthetic_document
+from storage import DataFileStore
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ENDPOINTS = ['/api/data', '/api/quotes', '/api/data/quotes', '/api/status']
+
+# Seconds to wait for the server to start and for one request
+STARTUP_TIMEOUT = 60
+REQUEST_TIMEOUT = 300
+
+
+def free_port() -> int:
+    """Return a TCP port that is free on localhost."""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class APIServer:
+    """`api:app` under gunicorn, serving the data file of a directory."""
+
+    def __init__(self, directory: str, workers: int):
+        """
+        Initialize the server (not started).
+
+        Args:
+            directory: Working directory of the server, holding scraped_data.json
+            workers: gunicorn worker processes
+        """
+        self.directory = directory
+        self.workers = workers
+        self.port = free_port()
+        self._process: Optional[subprocess.Popen] = None
+        self._log = None
+
+    def __enter__(self) -> 'APIServer':
+        env = dict(os.environ)
+        env['PYTHONPATH'] = os.pathsep.join(filter(None, [REPO_DIR, env.get('PYTHONPATH')]))
+        # Both are closed in __exit__
+        # pylint: disable=consider-using-with
+        self._log = open(os.path.join(self.directory, 'server.log'), 'wb')
+        self._process = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', '--bind', f'127.0.0.1:{self.port}',
+             '--workers', str(self.workers), '--timeout', str(REQUEST_TIMEOUT),
+             '--config', os.path.join(REPO_DIR, 'gunicorn.conf.py'), 'api:app'],
+            cwd=self.directory, env=env, stdout=self._log, stderr=subprocess.STDOUT)
+
+        deadline = time.monotonic() + STARTUP_TIMEOUT
+        while time.monotonic() < deadline:
+            if self._process.poll() is not None:
+                break
+            conn = self.connect()
+            try:
+                if request(conn, '/api/upstreams', 'identity')[0] == 200:
+                    return self
+            except OSError:
+                pass
+            finally:
+                conn.close()
+            time.sleep(0.1)
+        self.__exit__(None, None, None)
+        raise RuntimeError(f"API server did not start; see {self._log.name}")
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._process is not None:
+            self._process.terminate()
+            try:
+                self._process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                self._process.kill()
+        if self._log is not None:
+            self._log.close()
+
+    def connect(self) -> http.client.HTTPConnection:
+        """Open a client connection to the server."""
+        return http.client.HTTPConnection('127.0.0.1', self.port, timeout=REQUEST_TIMEOUT)
+
+
+def request(conn: http.client.HTTPConnection, path: str,
+            accept_encoding: str) -> Tuple[int, int]:
+    """
+    Send one GET and read the whole body.
+
+    Returns:
+        Status code and body size in bytes (as sent, i.e. compressed)
+    """
+    conn.request('GET', path, headers={'Accept-Encoding': accept_encoding})
+    response = conn.getresponse()
+    return response.status, len(response.read())
+
+
+def load(server: APIServer, path: str, clients: int, duration: float,
+         accept_encoding: str) -> Dict[str, Any]:
+    """Run `clients` threads requesting `path` back to back for `duration` seconds."""
+    latencies: List[float] = []
+    sizes: List[int] = []
+    errors = [0]
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def client():
+        conn = server.connect()
+        own_latencies, own_sizes, own_errors = [], [], 0
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                status, size = request(conn, path, accept_encoding)
+            except (OSError, http.client.HTTPException):
+                own_errors += 1
+                conn.close()
+                continue
+            if status != 200:
+                own_errors += 1
+                continue
+            own_latencies.append(time.perf_counter() - start)
+            own_sizes.append(size)
+        conn.close()
+        with lock:
+            latencies.extend(own_latencies)
+            sizes.extend(own_sizes)
+            errors[0] += own_errors
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    seconds = time.perf_counter() - start
+
+    def ms(value: Optional[float]) -> Optional[float]:
+        return None if value is None else round(value * 1000, 2)
+
+    return {
+        'requests': len(latencies),
+        'errors': errors[0],
+        'seconds': round(seconds, 3),
+        'requests_per_sec': round(len(latencies) / seconds, 1),
+        'mb_per_sec': round(sum(sizes) / seconds / 1e6, 2),
+        'p50_ms': ms(percentile(latencies, 0.50)),
+        'p90_ms': ms(percentile(latencies, 0.90)),
+        'p99_ms': ms(percentile(latencies, 0.99)),
+        'max_ms': ms(max(latencies, default=None)),
+    }
+
+
+def run_size(records: int, endpoints: List[str], clients: int, duration: float,
+             warmup: float, workers: int, accept_encoding: str) -> List[Dict[str, Any]]:
+    """Benchmark every endpoint against one synthetic data file of `records` records."""
+    document = synthetic_document(math.ceil(records / 3))
+    total = sum(len(items) for items in document['data'].values())
+
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        data_file = os.path.join(directory, 'scraped_data.json')
+        DataFileStore(data_file).write(document)
+        file_bytes = os.path.getsize(data_file)
+        del document
+
+        with APIServer(directory, workers) as server:
+            for path in endpoints:
+                # Cold: the worker serializes the body (and loads the data file, if first)
+                conn = server.connect()
+                start = time.perf_counter()
+                status, size = request(conn, path, accept_encoding)
+                first_ms = round((time.perf_counter() - start) * 1000, 2)
+                conn.close()
+
+                # Untimed, to warm up the other workers as well
+                if warmup > 0:
+                    load(server, path, clients, warmup, accept_encoding)
+
+                results.append({
+                    'records': total,
+                    'file_bytes': file_bytes,
+                    'endpoint': path,
+                    'status': status,
+                    'response_bytes': size,
+                    'first_ms': first_ms,
+                    **load(server, path, clients, duration, accept_encoding),
+                })
+    return results
+
+
+def run(sizes: List[int], endpoints: List[str], clients: int, duration: float,
+        warmup: float, workers: int, accept_encoding: str) -> Dict[str, Any]:
+    """Benchmark every data size."""
+    results = []
+    for records in sizes:
+        results.extend(run_size(records, endpoints, clients, duration, warmup, workers,
+                                accept_encoding))
+    return build_report('api_load', {'clients': clients, 'duration': duration, 'warmup': warmup,
+                                     'workers': workers, 'accept_encoding': accept_encoding,
+                                     'storage_backend': os.environ.get('STORAGE_BACKEND', 'json')},
+                        results)
+
+
+def main():
+    """Run the benchmark and print the results."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--records', type=int, nargs='+', default=[1000, 10000, 100000],
+                        help='Total records of each synthetic data file (e.g. 1000 1000000)')
+    parser.add_argument('--endpoint', action='append',
+                        help=f"Endpoint to load (repeatable; default {' '.join(ENDPOINTS)})")
+    parser.add_argument('--clients', type=int, default=8, help='Concurrent clients')
+    parser.add_argument('--duration', type=float, default=10,
+                        help='Seconds of load per endpoint')
+    parser.add_argument('--warmup', type=float, default=2,
+                        help='Untimed seconds of load per endpoint before measuring')
+    parser.add_argument('--workers', type=int, default=4, help='gunicorn worker processes')
+    parser.add_argument('--accept-encoding', default='identity',
+                        help='Accept-Encoding header of the clients (e.g. gzip)')
+    parser.add_argument('--json', action='store_true', help='Print results as JSON')
+    parser.add_argument('--output', help='Also write the JSON results to this file')
+    args = parser.parse_args()
+
+    report = run(args.records, args.endpoint or ENDPOINTS, args.clients, args.duration,
+                 args.warmup, args.workers, args.accept_encoding)
+    if write_report(report, args.output, args.json):
+        return
+
+    print(f"{'records':>8} {'endpoint':<18} {'KB':>9} {'first ms':>9} {'req/s':>8} "
+          f"{'MB/s':>7} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'errors':>6}")
+    for row in report['results']:
+        print(f"{row['records']:>8} {row['endpoint']:<18} {row['response_bytes'] / 1e3:>9.1f} "
+              f"{row['first_ms']:>9} {row['requests_per_sec']:>8} {row['mb_per_sec']:>7} "
+              f"{str(row['p50_ms']):>8} {str(row['p90_ms']):>8} {str(row['p99_ms']):>8} "
+              f"{row['errors']:>6}")
+
+
+if __name__ == '__main__':
+    main()
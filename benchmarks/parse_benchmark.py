@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Parse benchmark over the saved fixture pages of each site.
+
+Measures parse + extraction throughput (pages/sec) of every scraper with
+each available BeautifulSoup backend, with and without the scraper's
+`SoupStrainer`, and checks that all variants extract the same records.
+
+Usage:
+    python -m benchmarks.parse_benchmark [--seconds 2] [--json]
+"""
+import argparse
+import json
+import os
+import time
+from typing import Any, Dict, List
+
+from book_scraper import BookScraper
+from quote_scraper import QuoteScraper
+from scrapethissite_scraper import ScrapesiteScraper
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+# (site name, scraper class, fixture file)
+SITES = [
+    ('quotes', QuoteScraper, 'quotes.html'),
+    ('books', BookScraper, 'books.html'),
+    ('hockey', ScrapesiteScraper, 'hockey.html'),
+]
+
+
+def available_parsers() -> List[str]:
+    """Return the BeautifulSoup backends that can be used here."""
+    parsers = ['html.parser']
+    try:
+        import lxml  # noqa: F401  pylint: disable=unused-import,import-outside-toplevel
+        parsers.append('lxml')
+    except ImportError:
+        pass
+    return parsers
+
+
+def load_fixture(name: str) -> bytes:
+    """Read a saved fixture page."""
+    with open(os.path.join(FIXTURES_DIR, name), 'rb') as f:
+        return f.read()
+
+
+def bench(scraper, content: bytes, seconds: float) -> Dict[str, Any]:
+    """Parse and extract `content` repeatedly for about `seconds` seconds."""
+    pages = 0
+    records = []
+    start = time.perf_counter()
+    elapsed = 0.0
+    while elapsed < seconds:
+        records = scraper.extract_records(scraper.parse_html(content))
+        pages += 1
+        elapsed = time.perf_counter() - start
+    return {'pages_per_sec': pages / elapsed, 'records': records}
+
+
+def run(seconds: float) -> List[Dict[str, Any]]:
+    """Benchmark every site, backend and strainer combination."""
+    results = []
+    for site, scraper_cls, fixture in SITES:
+        content = load_fixture(fixture)
+        baseline = None
+        for parser in available_parsers():
+            for partial in (False, True):
+                scraper = scraper_cls()
+                scraper.parser = parser
+                if not partial:
+                    scraper.parse_only = None
+                outcome = bench(scraper, content, seconds)
+                if baseline is None:
+                    baseline = outcome['records']
+                results.append({
+                    'site': site,
+                    'parser': parser,
+                    'partial': partial,
+                    'pages_per_sec': round(outcome['pages_per_sec'], 1),
+                    'records_per_page': len(outcome['records']),
+                    'matches_baseline': outcome['records'] == baseline
+                })
+    return results
+
+
+def main():
+    """Run the benchmark and print the results."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--seconds', type=float, default=2.0,
+                        help='Time spent on each combination')
+    parser.add_argument('--json', action='store_true', help='Print results as JSON')
+    args = parser.parse_args()
+
+    results = run(args.seconds)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'site':<8} {'parser':<12} {'partial':<8} {'pages/sec':>10} {'records':>8}  same")
+    for row in results:
+        print(f"{row['site']:<8} {row['parser']:<12} {str(row['partial']):<8} "
+              f"{row['pages_per_sec']:>10} {row['records_per_page']:>8}  {row['matches_baseline']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Memory benchmark of the record representations.
+
+Builds N records per data type from the records in scraped_data.json and
+measures the memory held per record (with `tracemalloc`) as:
+
+- ``string_dicts``: dicts of strings, as loaded from JSON before the typed
+  models (price "£51.77", rating "Three", year "1990", one ``source``
+  string per record)
+- ``typed_dicts``: the dicts the scrapers now produce via `models`
+  (numbers parsed, repeated strings interned)
+- ``models``: the `__slots__` record objects themselves
+
+Usage:
+    python -m benchmarks.record_memory_benchmark [--records 100000] [--json]
+"""
+import argparse
+import gc
+import json
+import tracemalloc
+from typing import Any, Callable, Dict, List
+
+from models import MODELS, RATING_WORDS
+
+SAMPLE_FILE = 'scraped_data.json'
+
+# Field made unique per synthetic record, by data type
+UNIQUE_FIELDS = {'quotes': 'text', 'books': 'title', 'hockey_teams': 'name'}
+
+RATING_NAMES = {number: word for word, number in RATING_WORDS.items()}
+
+
+def _as_strings(data_type: str, record: Dict[str, Any]) -> Dict[str, Any]:
+    """Render a record the way the scrapers stored it before the typed models."""
+    record = dict(record)
+    if data_type == 'books':
+        if not isinstance(record['price'], str):
+            record['price'] = f"£{record['price']:.2f}"
+        if not isinstance(record['rating'], str):
+            record['rating'] = RATING_NAMES[record['rating']]
+    elif data_type == 'hockey_teams':
+        for field in ('year', 'wins', 'losses'):
+            record[field] = str(record[field])
+    return record
+
+
+def string_records(records_per_type: int) -> Dict[str, str]:
+    """Serialize N string records per data type, one JSON document per type."""
+    with open(SAMPLE_FILE, 'r', encoding='utf-8') as f:
+        sample = json.load(f)['data']
+
+    documents = {}
+    for data_type, records in sample.items():
+        field = UNIQUE_FIELDS[data_type]
+        synthetic = []
+        for i in range(records_per_type):
+            record = _as_strings(data_type, records[i % len(records)])
+            record[field] = f"{record[field]} #{i}"
+            synthetic.append(record)
+        documents[data_type] = json.dumps(synthetic, ensure_ascii=False)
+    return documents
+
+
+def measure(build: Callable[[], Any]) -> int:
+    """Return the bytes still allocated by the object `build` returns."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        kept = build()
+        gc.collect()
+        size = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+    del kept
+    return size
+
+
+def run(records_per_type: int) -> List[Dict[str, Any]]:
+    """Measure every representation of every data type."""
+    documents = string_records(records_per_type)
+    results = []
+    for data_type, document in documents.items():
+        model = MODELS[data_type]
+        variants = {
+            'string_dicts': lambda document=document: json.loads(document),
+            'typed_dicts': lambda document=document, model=model: [
+                model.from_dict(record).to_dict() for record in json.loads(document)],
+            'models': lambda document=document, model=model: [
+                model.from_dict(record) for record in json.loads(document)],
+        }
+        baseline = None
+        for name, build in variants.items():
+            size = measure(build)
+            baseline = baseline or size
+            results.append({
+                'type': data_type,
+                'representation': name,
+                'records': records_per_type,
+                'bytes_per_record': round(size / records_per_type, 1),
+                'total_mb': round(size / 1e6, 2),
+                'saving': f"{(1 - size / baseline) * 100:.0f}%"
+            })
+    return results
+
+
+def main():
+    """Run the benchmark and print the results."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--records', type=int, default=100000,
+                        help='Records per data type')
+    parser.add_argument('--json', action='store_true', help='Print results as JSON')
+    args = parser.parse_args()
+
+    results = run(args.records)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'type':<13} {'representation':<14} {'bytes/record':>12} {'MB':>8} {'saving':>7}")
+    for row in results:
+        print(f"{row['type']:<13} {row['representation']:<14} {row['bytes_per_record']:>12} "
+              f"{row['total_mb']:>8} {row['saving']:>7}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""
+JSON reports shared by the end-to-end benchmarks.
+
+Every report is labelled with the benchmark, the commit of the working tree
+and the Python version, so the saved results of two versions can be compared.
+"""
+import json
+import os
+import platform
+import subprocess
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+
+def git_revision() -> Optional[str]:
+    """Commit of the working tree, to label the results."""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def build_report(benchmark: str, params: Dict[str, Any],
+                 results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Label the results of one benchmark run.
+
+    Args:
+        benchmark: Benchmark name
+        params: Parameters of the run
+        results: One measurement per scenario
+
+    Returns:
+        The report
+    """
+    return {
+        'benchmark': benchmark,
+        'created_at': datetime.now().isoformat(),
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'params': params,
+        'results': results,
+    }
+
+
+def write_report(report: Dict[str, Any], output: Optional[str] = None,
+                 as_json: bool = False) -> bool:
+    """
+    Save a report and print it as JSON if asked.
+
+    Args:
+        report: Report from `build_report`
+        output: File to also write the JSON report to
+        as_json: Print the report as JSON
+
+    Returns:
+        True if the report was printed, so the caller skips its table
+    """
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    if as_json:
+        print(json.dumps(report, indent=2))
+    return as_json
@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+End-to-end scrape benchmark against a local fixture server.
+
+Serves the saved fixture page of each site from a local HTTP server (one
+port per site, with a configurable response latency) and runs
+`QuoteScraper`, `BookScraper`, `ScrapesiteScraper` and
+`MultiSiteScraperManager` against it, so results do not depend on the
+network or the live sites. Each scenario runs in a fresh process and reports
+pages/sec, records/sec, p50/p99 page latency (one `fetch_page` call,
+including retries) and the process's peak RSS. Save the JSON output of two
+versions and compare them.
+
+Usage:
+    python -m benchmarks.scrape_benchmark [--pages 20] [--latency 0.05] [--delay 0]
+        [--parse-workers 0] [--repeat 3] [--json] [--output results.json]
+"""
+import argparse
+import logging
+import math
+import multiprocessing
+import platform
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlparse
+
+from benchmarks.parse_benchmark import load_fixture
+from benchmarks.report import build_report, write_report
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Data type -> fixture page served for every path of the site
+FIXTURES = {
+    'quotes': 'quotes.html',
+    'books': 'books.html',
+    'hockey_teams': 'hockey.html',
+}
+
+SCENARIOS = ['quotes', 'books', 'hockey_teams', 'manager']
+
+
+class _FixtureHTTPServer(ThreadingHTTPServer):
+    """Threaded server whose listen backlog fits a burst of concurrent connections."""
+
+    # The default of 5 drops connection attempts beyond it, which clients only
+    # retry after a one-second SYN timeout
+    request_queue_size = 128
+    daemon_threads = True
+
+
+class FixtureServer:
+    """Local HTTP servers answering every request with a site's fixture page."""
+
+    def __init__(self, latency: float = 0.0):
+        """
+        Initialize the servers (not started).
+
+        Args:
+            latency: Seconds each response is delayed by
+        """
+        self.latency = latency
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._servers: Dict[str, _FixtureHTTPServer] = {}
+
+    def _handler(self, body: bytes):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            """Serves `body` after the configured latency."""
+
+            protocol_version = 'HTTP/1.1'
+            # Headers and body are written separately; avoid delayed-ACK stalls
+            disable_nagle_algorithm = True
+
+            def do_GET(self):  # pylint: disable=invalid-name
+                with server._lock:  # pylint: disable=protected-access
+                    server.requests += 1
+                if server.latency > 0:
+                    time.sleep(server.latency)
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def __enter__(self) -> 'FixtureServer':
+        for data_type, fixture in FIXTURES.items():
+            httpd = _FixtureHTTPServer(('127.0.0.1', 0), self._handler(load_fixture(fixture)))
+            threading.Thread(target=httpd.serve_forever, daemon=True).start()
+            self._servers[data_type] = httpd
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        for httpd in self._servers.values():
+            httpd.shutdown()
+            httpd.server_close()
+
+    @property
+    def base_urls(self) -> Dict[str, str]:
+        """Site root by data type."""
+        return {data_type: f"http://127.0.0.1:{httpd.server_address[1]}"
+                for data_type, httpd in self._servers.items()}
+
+
+def percentile(values: List[float], fraction: float) -> Optional[float]:
+    """Nearest-rank percentile of `values` (None if empty)."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process in MB (None where unsupported)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if platform.system() == 'Darwin' else 1024), 1)
+
+
+def run_scenario(scenario: str, base_urls: Dict[str, str], pages: int, delay: float,
+                 parse_workers: int) -> Dict[str, Any]:
+    """
+    Run one scenario; called in a fresh worker process.
+
+    Args:
+        scenario: Data type scraped by its scraper alone, or ``manager`` for all
+        base_urls: Fixture server root by data type
+        pages: Pages per site
+        delay: Seconds between requests to one site (0 disables rate limiting)
+        parse_workers: Parser processes (``manager`` scenario only)
+
+    Returns:
+        Measurements of the run
+    """
+    # pylint: disable=import-outside-toplevel
+    from book_scraper import BookScraper
+    from manager import MultiSiteScraperManager
+    from quote_scraper import QuoteScraper
+    from rate_limit import get_host_bucket
+    from scrapethissite_scraper import ScrapesiteScraper
+    from web_scraper_base import WebScraper
+
+    logging.getLogger('web_scraper_base').setLevel(logging.WARNING)
+
+    # Register each host's bucket first, so every scraper of the host uses this rate
+    for url in base_urls.values():
+        get_host_bucket(urlparse(url).netloc, rate=1.0 / delay if delay > 0 else 0)
+
+    latencies: List[float] = []
+    fetch_page = WebScraper.fetch_page
+
+    def timed_fetch_page(self, url, timeout=None):
+        start = time.perf_counter()
+        try:
+            return fetch_page(self, url, timeout)
+        finally:
+            latencies.append(time.perf_counter() - start)
+
+    WebScraper.fetch_page = timed_fetch_page
+
+    counts = {'pages': 0, 'failed_pages': 0, 'records': 0}
+    counts_lock = threading.Lock()
+
+    def page_done(_url: str, records: int, ok: bool):
+        with counts_lock:
+            counts['pages' if ok else 'failed_pages'] += 1
+            counts['records'] += records
+
+    start = time.perf_counter()
+    if scenario == 'manager':
+        manager = MultiSiteScraperManager(page_callback=page_done, base_urls=base_urls)
+        manager.run_all_scrapers(num_pages=pages, parse_workers=parse_workers)
+    else:
+        scraper_cls = {'quotes': QuoteScraper, 'books': BookScraper,
+                       'hockey_teams': ScrapesiteScraper}[scenario]
+        scraper = scraper_cls(delay=delay, base_url=base_urls[scenario])
+        scraper.page_callback = page_done
+        scraper.scrape(pages)
+    seconds = time.perf_counter() - start
+
+    return {
+        'scenario': scenario,
+        'pages': counts['pages'],
+        'failed_pages': counts['failed_pages'],
+        'records': counts['records'],
+        'seconds': round(seconds, 4),
+        'pages_per_sec': round(counts['pages'] / seconds, 2),
+        'records_per_sec': round(counts['records'] / seconds, 1),
+        'p50_page_latency_ms': round(percentile(latencies, 0.50) * 1000, 2) if latencies else None,
+        'p99_page_latency_ms': round(percentile(latencies, 0.99) * 1000, 2) if latencies else None,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def run(pages: int, latency: float, delay: float, parse_workers: int, repeat: int,
+        scenarios: List[str]) -> Dict[str, Any]:
+    """Run every scenario `repeat` times against one fixture server, keeping the fastest run."""
+    results = []
+    context = multiprocessing.get_context('spawn')
+    with FixtureServer(latency) as server:
+        for scenario in scenarios:
+            runs = []
+            for _ in range(repeat):
+                # A fresh process per run, so peak RSS covers only this scenario
+                with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                    runs.append(pool.submit(run_scenario, scenario, server.base_urls, pages,
+                                            delay, parse_workers).result())
+            results.append(min(runs, key=lambda outcome: outcome['seconds']))
+
+    return build_report('scrape', {'pages': pages, 'latency': latency, 'delay': delay,
+                                   'parse_workers': parse_workers, 'repeat': repeat}, results)
+
+
+def main():
+    """Run the benchmark and print the results."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--pages', type=int, default=20, help='Pages per site')
+    parser.add_argument('--latency', type=float, default=0.05,
+                        help='Seconds the fixture server delays each response')
+    parser.add_argument('--delay', type=float, default=0.0,
+                        help='Seconds between requests to one site (0: no rate limit)')
+    parser.add_argument('--parse-workers', type=int, default=0,
+                        help='Parser processes of the manager scenario')
+    parser.add_argument('--repeat', type=int, default=1,
+                        help='Runs per scenario (the fastest is reported)')
+    parser.add_argument('--scenario', action='append', choices=SCENARIOS,
+                        help='Scenario to run (repeatable; default all)')
+    parser.add_argument('--json', action='store_true', help='Print results as JSON')
+    parser.add_argument('--output', help='Also write the JSON results to this file')
+    args = parser.parse_args()
+
+    report = run(args.pages, args.latency, args.delay, args.parse_workers, max(1, args.repeat),
+                 args.scenario or SCENARIOS)
+    if write_report(report, args.output, args.json):
+        return
+
+    print(f"{'scenario':<13} {'pages':>6} {'records':>8} {'pages/s':>8} {'records/s':>10} "
+          f"{'p50 ms':>8} {'p99 ms':>8} {'RSS MB':>7}")
+    for row in report['results']:
+        print(f"{row['scenario']:<13} {row['pages']:>6} {row['records']:>8} "
+              f"{row['pages_per_sec']:>8} {row['records_per_sec']:>10} "
+              f"{str(row['p50_page_latency_ms']):>8} {str(row['p99_page_latency_ms']):>8} "
+              f"{str(row['peak_rss_mb']):>7}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Snapshot format benchmark: scraped_data.json vs the columnar snapshot.
+
+Builds a synthetic document from the records in scraped_data.json (repeated
+with unique text, so repeated values such as ``source`` and ``rating`` stay
+repeated, as in a real multi-page scrape) and compares file size, write time
+and load time of both formats. For the columnar snapshot, load time is
+reported for opening the file, decoding one data type and decoding all of
+them.
+
+Usage:
+    python -m benchmarks.snapshot_benchmark [--records 100000] [--repeat 3] [--json]
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from typing import Any, Callable, Dict, List
+
+from columnar import load_document, write_snapshot
+from storage import DataFileStore
+
+SAMPLE_FILE = 'scraped_data.json'
+
+# Field made unique per synthetic record, by data type
+UNIQUE_FIELDS = {'quotes': 'text', 'books': 'title', 'hockey_teams': 'name'}
+
+
+def synthetic_document(records_per_type: int) -> Dict[str, Any]:
+    """Repeat the sample records up to `records_per_type` per data type."""
+    with open(SAMPLE_FILE, 'r', encoding='utf-8') as f:
+        sample = json.load(f)
+
+    data = {}
+    for data_type, records in sample['data'].items():
+        field = UNIQUE_FIELDS.get(data_type)
+        data[data_type] = []
+        for i in range(records_per_type):
+            record = dict(records[i % len(records)])
+            if field:
+                record[field] = f"{record[field]} #{i}"
+            data[data_type].append(record)
+    return {'timestamp': sample.get('timestamp'), 'data': data}
+
+
+def best_of(repeat: int, action: Callable[[], Any]) -> float:
+    """Return the fastest of `repeat` runs of `action`, in milliseconds."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        action()
+        timings.append((time.perf_counter() - start) * 1000)
+    return round(min(timings), 2)
+
+
+def load_json(path: str) -> Dict[str, Any]:
+    """Load the JSON data file the way the API does."""
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def decode_all(path: str):
+    """Open a columnar snapshot and decode every data type."""
+    document = load_document(path)
+    for data_type in document['data']:
+        _ = document['data'][data_type]
+
+
+def run(records_per_type: int, repeat: int) -> List[Dict[str, Any]]:
+    """Benchmark both formats on a synthetic document."""
+    document = synthetic_document(records_per_type)
+    first_type = next(iter(document['data']))
+    total = sum(len(records) for records in document['data'].values())
+
+    with tempfile.TemporaryDirectory() as directory:
+        json_path = os.path.join(directory, 'scraped_data.json')
+        columnar_path = os.path.join(directory, 'scraped_data.sdcs')
+
+        results = [{
+            'format': 'json',
+            'records': total,
+            'bytes': 0,
+            'write_ms': best_of(repeat, lambda: DataFileStore(json_path).write(document)),
+            'open_ms': None,
+            'load_one_type_ms': None,
+            'load_all_ms': best_of(repeat, lambda: load_json(json_path)),
+        }, {
+            'format': 'columnar',
+            'records': total,
+            'bytes': 0,
+            'write_ms': best_of(repeat, lambda: write_snapshot(columnar_path, document)),
+            'open_ms': best_of(repeat, lambda: load_document(columnar_path)),
+            'load_one_type_ms': best_of(
+                repeat, lambda: load_document(columnar_path)['data'][first_type]),
+            'load_all_ms': best_of(repeat, lambda: decode_all(columnar_path)),
+        }]
+        results[0]['bytes'] = os.path.getsize(json_path)
+        results[1]['bytes'] = os.path.getsize(columnar_path)
+
+        decoded = load_document(columnar_path)
+        same = dict(decoded['data']) == load_json(json_path)['data']
+        for row in results:
+            row['matches_json'] = same
+    return results
+
+
+def main():
+    """Run the benchmark and print the results."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--records', type=int, default=100000,
+                        help='Records per data type')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='Runs per measurement (the fastest is reported)')
+    parser.add_argument('--json', action='store_true', help='Print results as JSON')
+    args = parser.parse_args()
+
+    results = run(args.records, args.repeat)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'format':<9} {'records':>8} {'MB':>8} {'write ms':>9} {'open ms':>8} "
+          f"{'1 type ms':>10} {'all ms':>8}  same")
+    for row in results:
+        print(f"{row['format']:<9} {row['records']:>8} {row['bytes'] / 1e6:>8.2f} "
+              f"{row['write_ms']:>9} {str(row['open_ms'] or '-'):>8} "
+              f"{str(row['load_one_type_ms'] or '-'):>10} {row['load_all_ms']:>8}  "
+              f"{row['matches_json']}")
+
+
+if __name__ == '__main__':
+    main()
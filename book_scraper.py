@@ -1,61 +1,80 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator, Optional
+from bs4 import BeautifulSoup, SoupStrainer
+from http_cache import HTTPCache
+from models import Book
 from web_scraper_base import WebScraper, logger
 
 
 class BookScraper(WebScraper):
     """Scraper for books.toscrape.com"""
 
-    def __init__(self):
-        """Initialize Book scraper."""
-        super().__init__('http://books.toscrape.com', delay=1.0)
+    record_label = 'books'
+    record_model = Book
+    parse_only = SoupStrainer(['article', 'li'], class_=['product_pod', 'next'])
 
-    def scrape_books(self, pages: int = 1) -> List[Dict[str, Any]]:
+    def __init__(self, delay: float = 1.0, max_concurrency: int = 4, burst: int = 1,
+                 http_cache: Optional[HTTPCache] = None, base_url: Optional[str] = None):
         """
-        Scrape books from the website.
+        Initialize Book scraper.
 
         Args:
-            pages: Number of pages to scrape
-
-        Returns:
-            List of book dictionaries
+            delay: Average delay between requests to the site in seconds
+            max_concurrency: Maximum number of pages fetched at once
+            burst: Number of requests allowed back to back
+            http_cache: Optional on-disk cache for conditional re-fetches
+            base_url: Root of a mirror of the site (e.g. a local fixture server)
+                to scrape instead of books.toscrape.com
         """
+        super().__init__(base_url or 'http://books.toscrape.com', delay=delay,
+                         max_concurrency=max_concurrency, burst=burst,
+                         http_cache=http_cache)
+
+    def page_urls(self, pages: int) -> List[str]:
+        """Build the listing page URLs (`/catalogue/page-{n}.html` after the first)."""
+        return [self.base_url if page == 1 else f"{self.base_url}/catalogue/page-{page}.html"
+                for page in range(1, pages + 1)]
+
+    def extract_records(self, soup: BeautifulSoup) -> List[Dict[str, Any]]:
+        """Extract book dictionaries from one parsed page."""
         books = []
 
-        for page in range(1, pages + 1):
-            if page == 1:
-                url = self.base_url
-            else:
-                url = f"{self.base_url}/catalogue/page-{page}.html"
+        # Find all book articles
+        book_articles = soup.find_all('article', class_='product_pod')
 
-            logger.info(f"Scraping {url}")
-            response = self.fetch_page(url)
+        for book in book_articles:
+            try:
+                title = book.find('h3').find('a')['title']
+                price = book.find('p', class_='price_color').get_text()
+                availability = book.find('p', class_='instock availability').get_text().strip()
+                rating = book.find('p', class_='star-rating')['class'][1]  # e.g., "Three"
 
-            if not response:
-                continue
+                # Price and rating are parsed to numbers (51.77, 3)
+                books.append(Book(title, price, availability, rating, self.base_url).to_dict())
+            except (AttributeError, KeyError, TypeError) as e:
+                logger.warning(f"Error parsing book: {e}")
 
-            soup = self.parse_html(response.content)
+        return books
+
+    def scrape_books(self, pages: int = 1) -> List[Dict[str, Any]]:
+        """
+        Scrape books from the website.
 
-            # Find all book articles
-            book_articles = soup.find_all('article', class_='product_pod')
+        Args:
+            pages: Number of pages to scrape
 
-            for book in book_articles:
-                try:
-                    title = book.find('h3').find('a')['title']
-                    price = book.find('p', class_='price_color').get_text()
-                    availability = book.find('p', class_='instock availability').get_text().strip()
-                    rating = book.find('p', class_='star-rating')['class'][1]  # e.g., "Three"
+        Returns:
+            List of book dictionaries
+        """
+        return self.scrape(pages)
 
-                    books.append({
-                        'title': title,
-                        'price': price,
-                        'availability': availability,
-                        'rating': rating,
-                        'source': self.base_url
-                    })
-                except (AttributeError, KeyError, TypeError) as e:
-                    logger.warning(f"Error parsing book: {e}")
+    def iter_books(self, max_pages: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Yield books one at a time, following the catalogue's "next" links.
 
-            self.respect_rate_limit()
+        Args:
+            max_pages: Stop after this many pages (None scrapes to the end)
 
-        logger.info(f"Successfully scraped {len(books)} books")
-        return books
+        Yields:
+            Book dictionaries
+        """
+        return self.iter_records(max_pages)
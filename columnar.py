@@ -0,0 +1,371 @@
+"""
+Compact columnar snapshot of the scraped data, read through `mmap`.
+
+An alternative to the pretty-printed scraped_data.json. Each data type is
+stored as one column of 32-bit value IDs per field, and every distinct value
+of the type (``source`` URLs, ratings, availability, tags, ...) is stored
+once in the type's value table. Loading maps the file and parses only a
+small JSON header; the columns are zero-copy views into the mapping, and the
+records of a data type are built on first access, sharing one string object
+per distinct value.
+
+Layout (integers unsigned 32-bit, in the byte order recorded in the header):
+
+    magic b'SDCS' | header length (little-endian) | header (JSON) | padding | sections
+
+Per data type the header locates the value table (a kind byte per value and
+the NUL-separated UTF-8 values, decoded in one pass) and, per field, the ID
+column and, for list fields, the list offsets and markers.
+"""
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from collections.abc import Mapping
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+from data_cache import ScrapedDataCache
+from models import is_normalized, normalize_records
+from storage import DataFileStore, atomic_write_bytes
+
+MAGIC = b'SDCS'
+FORMAT_VERSION = 1
+
+# Reserved value IDs; stored values are numbered from FIRST_VALUE_ID
+NONE_ID = 0
+MISSING_ID = 1
+FIRST_VALUE_ID = 2
+
+# List column marker of a record holding a list
+LIST_PRESENT = 2
+
+# Value kinds: string, or any other JSON value (also strings containing NUL)
+KIND_STR = 0
+KIND_JSON = 1
+
+# In-memory marker of an absent field
+_MISSING = object()
+
+
+class _ValueTable:
+    """Interns the values of one data type while writing a snapshot."""
+
+    def __init__(self):
+        self.ids: Dict[Tuple[int, str], int] = {}
+        self.kinds = bytearray()
+        self.values: List[str] = []
+
+    def intern(self, value: Any) -> int:
+        if value is None:
+            return NONE_ID
+        if isinstance(value, str) and '\x00' not in value:
+            key = (KIND_STR, value)
+        else:
+            key = (KIND_JSON, json.dumps(value, ensure_ascii=True, sort_keys=True))
+        value_id = self.ids.get(key)
+        if value_id is None:
+            value_id = len(self.values) + FIRST_VALUE_ID
+            self.ids[key] = value_id
+            self.kinds.append(key[0])
+            self.values.append(key[1])
+        return value_id
+
+
+def _field_names(records: List[Dict[str, Any]]) -> List[str]:
+    """Return every field used by `records`, in first-seen order."""
+    names: Dict[str, None] = {}
+    for record in records:
+        for name in record:
+            names.setdefault(name, None)
+    return list(names)
+
+
+def encode_snapshot(document: Dict[str, Any]) -> bytes:
+    """
+    Encode a scraped data document (``{'timestamp': ..., 'data': {...}}``).
+
+    Args:
+        document: Document to encode
+
+    Returns:
+        The snapshot file contents
+    """
+    sections: List[bytes] = []
+    size = 0
+
+    def add_section(data: Union[bytes, array]) -> List[int]:
+        nonlocal size
+        content = data.tobytes() if isinstance(data, array) else bytes(data)
+        location = [size, len(data)]
+        sections.append(content + bytes(-len(content) % 8))
+        size += len(sections[-1])
+        return location
+
+    types = {}
+    for data_type, records in document.get('data', {}).items():
+        records = list(records)
+        values = _ValueTable()
+        columns = {}
+        for name in _field_names(records):
+            raw = [record.get(name, _MISSING) for record in records]
+            present = [value for value in raw if value is not _MISSING and value is not None]
+            if present and all(isinstance(value, list) for value in present):
+                # List column: one offset per record into a flat ID column;
+                # a missing or None entry is an empty slice flagged in `markers`
+                offsets = array('I', [0])
+                ids = array('I')
+                markers = array('I')
+                for value in raw:
+                    if isinstance(value, list):
+                        ids.extend(values.intern(item) for item in value)
+                        markers.append(LIST_PRESENT)
+                    else:
+                        markers.append(MISSING_ID if value is _MISSING else NONE_ID)
+                    offsets.append(len(ids))
+                columns[name] = {'kind': 'list', 'ids': add_section(ids),
+                                 'offsets': add_section(offsets), 'markers': add_section(markers)}
+            else:
+                ids = array('I', (MISSING_ID if value is _MISSING else values.intern(value)
+                                  for value in raw))
+                columns[name] = {'kind': 'scalar', 'ids': add_section(ids)}
+            columns[name]['sparse'] = len(present) + raw.count(None) < len(raw)
+
+        types[data_type] = {
+            'count': len(records),
+            'values': {
+                'count': len(values.values),
+                'kinds': add_section(values.kinds),
+                'blob': add_section('\x00'.join(values.values).encode('utf-8'))
+            },
+            'columns': columns
+        }
+
+    header = {
+        'version': FORMAT_VERSION,
+        'byteorder': sys.byteorder,
+        'timestamp': document.get('timestamp'),
+        'types': types
+    }
+    header_bytes = json.dumps(header, separators=(',', ':')).encode('utf-8')
+    prefix = MAGIC + struct.pack('<I', len(header_bytes)) + header_bytes
+    prefix += bytes(-len(prefix) % 8)
+    return b''.join([prefix] + sections)
+
+
+def write_snapshot(path: str, document: Dict[str, Any]):
+    """
+    Write a columnar snapshot atomically.
+
+    Args:
+        path: Destination file
+        document: Scraped data document
+    """
+    atomic_write_bytes(path, encode_snapshot(document))
+
+
+class ColumnarSnapshot:
+    """Read-only view of a snapshot file, mapped into memory."""
+
+    def __init__(self, path: str):
+        """
+        Map a snapshot file and parse its header.
+
+        Args:
+            path: Snapshot file
+
+        Raises:
+            ValueError: If the file is not a snapshot of a supported version
+        """
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._map)
+        if bytes(self._view[:4]) != MAGIC:
+            raise ValueError(f"{path} is not a columnar snapshot")
+        header_length = struct.unpack('<I', self._view[4:8])[0]
+        self.header = json.loads(bytes(self._view[8:8 + header_length]))
+        if self.header.get('version') != FORMAT_VERSION:
+            raise ValueError(f"Unsupported snapshot version {self.header.get('version')}")
+        self._base = 8 + header_length + (-(8 + header_length) % 8)
+        self._native = self.header['byteorder'] == sys.byteorder
+
+    @property
+    def timestamp(self) -> str:
+        """Timestamp of the scrape the snapshot was written from."""
+        return self.header.get('timestamp')
+
+    @property
+    def data_types(self) -> List[str]:
+        """Data types in the snapshot."""
+        return list(self.header['types'])
+
+    def _bytes(self, location: List[int]) -> memoryview:
+        start = self._base + location[0]
+        return self._view[start:start + location[1]]
+
+    def _ints(self, location: List[int]) -> Union[memoryview, array]:
+        """Return a zero-copy view of a 32-bit integer section."""
+        start = self._base + location[0]
+        ints = self._view[start:start + location[1] * 4].cast('I')
+        if self._native:
+            return ints
+        swapped = array('I', ints)  # Written on a machine of the other byte order
+        swapped.byteswap()
+        return swapped
+
+    def count(self, data_type: str) -> int:
+        """Return the number of records of a data type."""
+        return self.header['types'][data_type]['count']
+
+    def values(self, data_type: str) -> List[Any]:
+        """
+        Decode the value table of a data type.
+
+        Returns:
+            Decoded values indexed by value ID (absent fields as a marker)
+        """
+        spec = self.header['types'][data_type]['values']
+        table: List[Any] = [None, _MISSING]
+        if spec['count']:
+            table += str(self._bytes(spec['blob']), 'utf-8').split('\x00')
+        kinds = bytes(self._bytes(spec['kinds']))
+        index = kinds.find(KIND_JSON)
+        while index != -1:
+            table[index + FIRST_VALUE_ID] = json.loads(table[index + FIRST_VALUE_ID])
+            index = kinds.find(KIND_JSON, index + 1)
+        return table
+
+    def column(self, data_type: str, field: str,
+               values: Optional[List[Any]] = None) -> List[Any]:
+        """
+        Decode one column.
+
+        Args:
+            data_type: Data type
+            field: Field name
+            values: The type's decoded value table, if already at hand
+
+        Returns:
+            One value per record (an internal marker where the field is absent)
+        """
+        spec = self.header['types'][data_type]['columns'][field]
+        lookup = (values or self.values(data_type)).__getitem__
+        cells = list(map(lookup, self._ints(spec['ids'])))
+        if spec['kind'] == 'scalar':
+            return cells
+
+        offsets = self._ints(spec['offsets']).tolist()
+        column = []
+        for i, marker in enumerate(self._ints(spec['markers'])):
+            if marker == LIST_PRESENT:
+                column.append(cells[offsets[i]:offsets[i + 1]])
+            else:
+                column.append(_MISSING if marker == MISSING_ID else None)
+        return column
+
+    def records(self, data_type: str) -> List[Dict[str, Any]]:
+        """
+        Build the records of one data type.
+
+        Args:
+            data_type: Data type
+
+        Returns:
+            Records in their original order and field order
+        """
+        spec = self.header['types'][data_type]
+        fields = list(spec['columns'])
+        if not fields:
+            return [{} for _ in range(spec['count'])]
+
+        values = self.values(data_type)
+        rows = zip(*(self.column(data_type, field, values) for field in fields))
+        if not any(column['sparse'] for column in spec['columns'].values()):
+            return [dict(zip(fields, row)) for row in rows]
+        return [{field: cell for field, cell in zip(fields, row) if cell is not _MISSING}
+                for row in rows]
+
+
+class ColumnarRecords(Mapping):
+    """Read-only mapping of data type -> records, decoding each type on first access."""
+
+    def __init__(self, snapshot: ColumnarSnapshot):
+        """
+        Initialize the mapping.
+
+        Args:
+            snapshot: Snapshot to decode records from
+        """
+        self._snapshot = snapshot
+        self._loaded: Dict[str, List[Dict[str, Any]]] = {}
+
+    def __getitem__(self, data_type: str) -> List[Dict[str, Any]]:
+        if data_type not in self._snapshot.header['types']:
+            raise KeyError(data_type)
+        if data_type not in self._loaded:
+            records = self._snapshot.records(data_type)
+            # Snapshots of files written before the typed models hold numbers as text
+            if not is_normalized(data_type, records):
+                records = normalize_records(data_type, records)
+            self._loaded[data_type] = records
+        return self._loaded[data_type]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._snapshot.header['types'])
+
+    def __len__(self) -> int:
+        return len(self._snapshot.header['types'])
+
+
+def load_document(path: str) -> Dict[str, Any]:
+    """
+    Map a snapshot as a scraped data document with lazily decoded records.
+
+    Args:
+        path: Snapshot file
+
+    Returns:
+        ``{'timestamp': ..., 'data': ColumnarRecords}``
+    """
+    snapshot = ColumnarSnapshot(path)
+    return {'timestamp': snapshot.timestamp, 'data': ColumnarRecords(snapshot)}
+
+
+class ColumnarDataCache(ScrapedDataCache):
+    """`ScrapedDataCache` over a columnar snapshot file instead of the JSON file."""
+
+    def _read(self) -> Union[Dict[str, Any], Tuple[Dict[str, Any], int]]:
+        try:
+            return load_document(self.path)
+        except (OSError, ValueError) as e:
+            return {'error': f'Error reading data: {str(e)}'}, 500
+
+
+def refresh_snapshot(store: DataFileStore, path: str, force: bool = True) -> bool:
+    """
+    Rewrite the snapshot from the JSON data file of `store`.
+
+    Args:
+        store: Store of the JSON data file
+        path: Snapshot file
+        force: Rewrite even if the snapshot is newer than the JSON file
+
+    Returns:
+        True if the snapshot was written
+    """
+    with store.lock():
+        if not force and os.path.exists(path) and (
+                not os.path.exists(store.path)
+                or os.path.getmtime(path) >= os.path.getmtime(store.path)):
+            return False
+        document = store.read()
+        if document is None:
+            return False
+        write_snapshot(path, document)
+        return True
+
+
+def snapshot_path(data_path: str) -> str:
+    """Return the columnar snapshot path belonging to a JSON data file."""
+    return f"{os.path.splitext(data_path)[0]}.sdcs"
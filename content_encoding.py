@@ -0,0 +1,56 @@
+"""
+HTTP response compression (gzip, and brotli/zstd when available).
+
+The API's JSON bodies are highly repetitive, so they compress well. Bodies
+are compressed once per data generation and cached next to the
+uncompressed body; this module only negotiates and encodes.
+"""
+import gzip
+from typing import Callable, Dict, Optional
+
+try:
+    import brotli
+except ImportError:  # Optional dependency
+    brotli = None
+
+try:
+    from compression import zstd  # Python 3.14+
+except ImportError:
+    try:
+        import zstandard as zstd
+    except ImportError:  # Optional dependency
+        zstd = None
+
+# Bodies smaller than this are sent uncompressed
+MIN_COMPRESS_BYTES = 1024
+
+
+# Content-Encoding -> compressor, in order of preference
+ENCODERS: Dict[str, Callable[[bytes], bytes]] = {}
+if brotli is not None:
+    ENCODERS['br'] = lambda body: brotli.compress(body, quality=9)
+if zstd is not None:
+    ENCODERS['zstd'] = lambda body: zstd.compress(body, 10)
+ENCODERS['gzip'] = lambda body: gzip.compress(body, compresslevel=9, mtime=0)
+
+
+def negotiate(accept_encodings, size: int) -> Optional[str]:
+    """
+    Pick the encoding for a response body.
+
+    Args:
+        accept_encodings: The request's parsed Accept-Encoding header
+            (``request.accept_encodings``)
+        size: Size of the uncompressed body in bytes
+
+    Returns:
+        A key of `ENCODERS`, or None to send the body uncompressed
+    """
+    if size < MIN_COMPRESS_BYTES:
+        return None
+    return accept_encodings.best_match(list(ENCODERS))
+
+
+def encode(body: bytes, encoding: str) -> bytes:
+    """Compress `body` with the given Content-Encoding."""
+    return ENCODERS[encoding](body)
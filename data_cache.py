@@ -0,0 +1,152 @@
+"""
+Per-process cache of the parsed scraped data file.
+
+Each gunicorn worker keeps one parsed copy of the data file together with the
+response bodies already serialized from it. The cache is validated with a
+cheap `os.stat` on every access and rebuilt only when the file changes.
+Records of files written before the typed models (numbers stored as text)
+are converted on load, so every response has the same shape.
+"""
+import hashlib
+import json
+import os
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+
+from models import normalize_document
+
+
+def read_data_file(path: str) -> Union[Dict[str, Any], Tuple[Dict[str, Any], int]]:
+    """
+    Read and parse the data file from disk.
+
+    Args:
+        path: Path of the JSON data file
+
+    Returns:
+        Parsed document, or an ``(error, status_code)`` tuple on failure
+    """
+    if not os.path.exists(path):
+        return {'error': 'No scraped data available'}, 404
+
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (json.JSONDecodeError, IOError) as e:
+        return {'error': f'Error reading data: {str(e)}'}, 500
+
+
+class DataSnapshot:
+    """One parsed generation of the data file and its serialized bodies."""
+
+    def __init__(self, data: Dict[str, Any], generation: int, mtime: float):
+        """
+        Initialize the snapshot.
+
+        Args:
+            data: Parsed data document (treat as read-only)
+            generation: Cache generation this snapshot belongs to
+            mtime: Modification time of the file the data was read from
+        """
+        self.data = data
+        self.generation = generation
+        self.mtime = mtime
+        self._bodies: Dict[str, Tuple[bytes, str]] = {}
+        self._derived: Dict[str, Any] = {}
+
+    def body(self, key: str, build: Callable[[Dict[str, Any]], bytes]) -> Tuple[bytes, str]:
+        """
+        Return the serialized body stored under `key`, building it once.
+
+        Args:
+            key: Cache key of the response body
+            build: Callable turning the parsed document into body bytes
+
+        Returns:
+            Tuple of the serialized body and its strong ETag (content hash)
+        """
+        entry = self._bodies.get(key)
+        if entry is None:
+            body = build(self.data)
+            entry = (body, hashlib.sha256(body).hexdigest()[:32])
+            self._bodies[key] = entry
+        return entry
+
+    def derived(self, key: str, build: Callable[[Dict[str, Any]], Any]) -> Any:
+        """
+        Return a structure derived from the data (e.g. an index), building it once.
+
+        Args:
+            key: Cache key of the derived structure
+            build: Callable turning the parsed document into the structure
+
+        Returns:
+            The derived structure
+        """
+        value = self._derived.get(key)
+        if value is None:
+            value = build(self.data)
+            self._derived[key] = value
+        return value
+
+
+class ScrapedDataCache:
+    """Caches the parsed data file, invalidated by file identity, mtime and size."""
+
+    def __init__(self, path: str):
+        """
+        Initialize the cache.
+
+        Args:
+            path: Path of the JSON data file
+        """
+        self.path = path
+        self.generation = 0
+        self._lock = threading.Lock()
+        self._signature: Optional[Tuple[int, int, int]] = None
+        self._snapshot: Optional[DataSnapshot] = None
+
+    def _stat(self) -> Optional[os.stat_result]:
+        """Stat the data file, returning None if it does not exist."""
+        try:
+            return os.stat(self.path)
+        except OSError:
+            return None
+
+    def _read(self) -> Union[Dict[str, Any], Tuple[Dict[str, Any], int]]:
+        """Load the file; subclasses reading other formats override this."""
+        data = read_data_file(self.path)
+        if isinstance(data, tuple):  # Error case
+            return data
+        return normalize_document(data)
+
+    def snapshot(self) -> Union[DataSnapshot, Tuple[Dict[str, Any], int]]:
+        """
+        Return the current snapshot, re-reading the file only if it changed.
+
+        Returns:
+            DataSnapshot, or an ``(error, status_code)`` tuple on failure
+        """
+        st = self._stat()
+        if st is None:
+            return {'error': 'No scraped data available'}, 404
+
+        signature = (st.st_ino, st.st_mtime_ns, st.st_size)
+        with self._lock:
+            if self._snapshot is not None and signature == self._signature:
+                return self._snapshot
+
+            data = self._read()
+            if isinstance(data, tuple):  # Error case
+                return data
+
+            self.generation += 1
+            self._signature = signature
+            self._snapshot = DataSnapshot(data, self.generation, st.st_mtime)
+            return self._snapshot
+
+    def invalidate(self):
+        """Drop the cached snapshot so the next access re-reads the file."""
+        with self._lock:
+            self._signature = None
+            self._snapshot = None
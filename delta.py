@@ -0,0 +1,366 @@
+"""
+Record identity, change detection and the change log behind delta scraping.
+
+Each record gets a stable identity key hashed from the fields that name it
+(quote text and author, book title and source page, team name and season)
+and a content hash over all of its fields. Comparing a fresh scrape with the
+stored records by key yields inserts, updates and deletes; unchanged records
+are skipped. Saved changes are appended to a change log so consumers can
+pull ``GET /api/data/<type>/changes?after=<seq>`` instead of full snapshots.
+"""
+import hashlib
+import json
+import os
+from datetime import datetime
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+from models import normalize_document
+from storage import DataFileStore, atomic_write_bytes
+
+# Data type -> fields identifying a record
+RECORD_KEYS = {
+    'quotes': ('text', 'author'),
+    'books': ('title', 'source'),
+    'hockey_teams': ('name', 'year'),
+}
+
+# Size of the change log above which its oldest entries are dropped
+MAX_LOG_BYTES = 64 * 1024 * 1024
+
+
+def _hash(parts: List[str]) -> str:
+    digest = hashlib.blake2b(digest_size=12)
+    for part in parts:
+        digest.update(part.encode('utf-8'))
+        digest.update(b'\x1f')
+    return digest.hexdigest()
+
+
+def content_hash(record: Dict[str, Any]) -> str:
+    """Hash every field of a record."""
+    return _hash([json.dumps(record, sort_keys=True, ensure_ascii=False)])
+
+
+def record_keys(data_type: str, records: List[Dict[str, Any]]) -> List[str]:
+    """
+    Compute the identity key of each record.
+
+    Records sharing identity fields are told apart by occurrence, so
+    duplicates on a page don't collapse into one key.
+
+    Args:
+        data_type: ``quotes``, ``books`` or ``hockey_teams``
+        records: Records in scrape order
+
+    Returns:
+        One key per record, in the same order
+    """
+    fields = RECORD_KEYS.get(data_type)
+    seen: Dict[str, int] = {}
+    keys = []
+    for record in records:
+        if fields is None:
+            base = content_hash(record)
+        else:
+            base = _hash([str(record.get(field) or '').strip() for field in fields])
+        occurrence = seen.get(base, 0)
+        seen[base] = occurrence + 1
+        keys.append(base if occurrence == 0 else f"{base}-{occurrence}")
+    return keys
+
+
+class RecordDelta:
+    """Changes between two versions of the records of one data type."""
+
+    def __init__(self):
+        """Initialize an empty delta."""
+        self.inserted: List[Tuple[str, Dict[str, Any]]] = []
+        self.updated: List[Tuple[str, Dict[str, Any]]] = []
+        self.deleted: List[Tuple[str, Dict[str, Any]]] = []
+        self.unchanged = 0
+
+    def __bool__(self) -> bool:
+        return bool(self.inserted or self.updated or self.deleted)
+
+    def entries(self) -> Iterator[Tuple[str, str, Dict[str, Any]]]:
+        """Yield ``(op, key, record)`` for every change; deletes carry the old record."""
+        for op, changes in (('insert', self.inserted), ('update', self.updated),
+                            ('delete', self.deleted)):
+            for key, record in changes:
+                yield op, key, record
+
+    def summary(self) -> Dict[str, int]:
+        """Return the number of records per kind of change."""
+        return {
+            'inserted': len(self.inserted),
+            'updated': len(self.updated),
+            'deleted': len(self.deleted),
+            'unchanged': self.unchanged
+        }
+
+
+def diff_records(data_type: str, previous: List[Dict[str, Any]],
+                 current: List[Dict[str, Any]]) -> RecordDelta:
+    """
+    Compare stored records with freshly scraped ones.
+
+    Args:
+        data_type: ``quotes``, ``books`` or ``hockey_teams``
+        previous: Stored records
+        current: Scraped records
+
+    Returns:
+        The inserts, updates and deletes turning `previous` into `current`
+    """
+    old = {key: (content_hash(record), record)
+           for key, record in zip(record_keys(data_type, previous), previous)}
+    delta = RecordDelta()
+    for key, record in zip(record_keys(data_type, current), current):
+        stored = old.pop(key, None)
+        if stored is None:
+            delta.inserted.append((key, record))
+        elif stored[0] != content_hash(record):
+            delta.updated.append((key, record))
+        else:
+            delta.unchanged += 1
+    delta.deleted = [(key, record) for key, (_digest, record) in old.items()]
+    return delta
+
+
+def compute_deltas(previous: Dict[str, List[Dict[str, Any]]],
+                   current: Dict[str, List[Dict[str, Any]]]) -> Dict[str, RecordDelta]:
+    """Diff every data type in `current` against the same type in `previous`."""
+    return {data_type: diff_records(data_type, list(previous.get(data_type, [])), records)
+            for data_type, records in current.items()}
+
+
+def parse_since(value: str) -> str:
+    """
+    Normalize a ``since`` timestamp to the ISO format scrape timestamps use.
+
+    Timezone-aware values are converted to local time, like the timestamps
+    written by `datetime.now()`.
+
+    Raises:
+        ValueError: If `value` is not an ISO 8601 timestamp
+    """
+    parsed = datetime.fromisoformat(value.strip().replace('Z', '+00:00'))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone().replace(tzinfo=None)
+    return parsed.isoformat()
+
+
+class ChangeLog:
+    """
+    Append-only JSON Lines log of record changes, one line per change.
+
+    Every entry carries a sequence number, assigned under the log's lock and
+    increasing across all data types, and the time it was saved. Readers
+    resume from the last sequence number they saw (``after``): the log is
+    ordered by it, so the first new entry is found by bisecting the file
+    instead of reading it from the start. Once the log outgrows `max_bytes`
+    its oldest entries are dropped.
+    """
+
+    def __init__(self, path: str, max_bytes: int = MAX_LOG_BYTES):
+        """
+        Initialize the log.
+
+        Args:
+            path: Path of the log file
+            max_bytes: Size above which the oldest half of the log is dropped
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self._store = DataFileStore(path)
+
+    def append(self, deltas: Dict[str, RecordDelta]):
+        """
+        Append the changes of one save, stamped with the current time.
+
+        Sequence numbers and timestamps are assigned while holding the lock,
+        so both increase in the order entries are written, whichever scrape
+        started first.
+
+        Args:
+            deltas: Changes by data type
+        """
+        changes = [(data_type, op, key, record)
+                   for data_type, delta in deltas.items()
+                   for op, key, record in delta.entries()]
+        if not changes:
+            return
+        with self._store.lock():
+            seq = self.last_seq()
+            timestamp = datetime.now().isoformat()
+            lines = [
+                json.dumps({'seq': seq + number, 'timestamp': timestamp, 'data_type': data_type,
+                            'op': op, 'key': key, 'record': record}, ensure_ascii=False)
+                for number, (data_type, op, key, record) in enumerate(changes, 1)
+            ]
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write('\n'.join(lines) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+                size = f.tell()
+            if size > self.max_bytes:
+                self._truncate()
+
+    def _truncate(self):
+        """Keep the newest entries filling half of `max_bytes`; caller holds the lock."""
+        with open(self.path, 'rb') as f:
+            lines = f.readlines()
+        kept, size = [], 0
+        for line in reversed(lines):
+            size += len(line)
+            if size > self.max_bytes // 2 and kept:
+                break
+            kept.append(line)
+        atomic_write_bytes(self.path, b''.join(reversed(kept)))
+
+    def last_seq(self) -> int:
+        """Return the sequence number of the newest entry (0 if the log is empty)."""
+        try:
+            with open(self.path, 'rb') as f:
+                end = f.seek(0, os.SEEK_END)
+                chunk = 4096
+                while True:
+                    start = max(end - chunk, 0)
+                    f.seek(start)
+                    lines = f.read(end - start).rstrip(b'\n').split(b'\n')
+                    if len(lines) > 1 or start == 0:
+                        break
+                    chunk *= 2
+        except FileNotFoundError:
+            return 0
+        if not lines[-1].strip():
+            return 0
+        entry = json.loads(lines[-1])
+        if 'seq' in entry:
+            return entry['seq']
+        # Logs written before sequence numbers: number the old entries by line
+        with open(self.path, 'rb') as f:
+            return sum(1 for line in f if line.strip())
+
+    def oldest_seq(self) -> int:
+        """Return the sequence number of the oldest entry kept (0 if unknown or empty)."""
+        try:
+            with open(self.path, 'rb') as f:
+                return _line_at(f, 0)[1]
+        except FileNotFoundError:
+            return 0
+
+    def changes_since(self, data_type: str, since: Optional[str] = None,
+                      after: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Read the changes of one data type, oldest first.
+
+        Args:
+            data_type: Data type to read
+            since: Only return changes saved after this timestamp (ISO format)
+            after: Only return changes with a higher sequence number
+
+        Returns:
+            Change entries with seq, timestamp, op, key and record
+        """
+        changes = []
+        try:
+            with open(self.path, 'rb') as f:
+                if after is not None:
+                    f.seek(self._find(f, after))
+                for line in f:
+                    if not line.strip():
+                        continue
+                    entry = json.loads(line)
+                    if entry['data_type'] != data_type:
+                        continue
+                    if since is not None and entry['timestamp'] <= since:
+                        continue
+                    del entry['data_type']
+                    changes.append(entry)
+        except FileNotFoundError:
+            pass
+        return changes
+
+    @staticmethod
+    def _find(f: BinaryIO, after: int) -> int:
+        """Return the offset of the first entry numbered above `after`, by bisection."""
+        low, high = 0, f.seek(0, os.SEEK_END)
+        while low < high:
+            middle = (low + high) // 2
+            offset, seq = _line_at(f, middle)
+            if offset is None or seq > after:
+                high = middle
+            else:
+                low = middle + 1
+        offset = _line_at(f, low)[0]
+        return f.seek(0, os.SEEK_END) if offset is None else offset
+
+
+def _line_at(f: BinaryIO, position: int) -> Tuple[Optional[int], int]:
+    """
+    Find the first entry starting at or after a byte position.
+
+    Returns:
+        Its offset (None past the last entry) and sequence number (0 for
+        entries logged before sequence numbers)
+    """
+    f.seek(max(position - 1, 0))
+    if position > 0:
+        f.readline()  # Rest of the line containing position - 1
+    while True:
+        offset = f.tell()
+        line = f.readline()
+        if not line:
+            return None, 0
+        if line.strip():
+            return offset, json.loads(line).get('seq', 0)
+
+
+def changes_path(data_path: str) -> str:
+    """Return the change log path belonging to a JSON data file."""
+    return f"{os.path.splitext(data_path)[0]}.changes.jsonl"
+
+
+def save_json_changes(store: DataFileStore, change_log: ChangeLog, timestamp: str,
+                      data: Dict[str, List[Dict[str, Any]]],
+                      delta: bool = False) -> Dict[str, RecordDelta]:
+    """
+    Merge scraped records into a JSON data file and log what changed.
+
+    The changes are logged while the data file's lock is held, just before
+    the file is replaced, so sequence numbers follow the order in which
+    saves reach the file. Logging first means a crash in between leaves
+    entries the next save logs again, which replay to the same records,
+    rather than a saved file whose changes are missing from the log.
+
+    Args:
+        store: Data file store
+        change_log: Log receiving the changes
+        timestamp: Scrape timestamp (ISO format)
+        data: Scraped records by data type
+        delta: Leave the file untouched when no record changed, instead of
+            rewriting it with a new timestamp
+
+    Returns:
+        Changes by data type
+
+    Raises:
+        ValueError: If the existing file is not valid JSON
+    """
+    deltas: Dict[str, RecordDelta] = {}
+
+    def merge(document):
+        # Files written before the typed models hold numbers as text: convert
+        # them, so they aren't all reported as updated and the file gets one shape
+        normalize_document(document)
+        deltas.update(compute_deltas(document['data'], data))
+        if delta and not any(deltas.values()):
+            return False
+        change_log.append(deltas)
+        document['timestamp'] = timestamp
+        document['data'].update(data)
+        return True
+
+    store.update(merge)
+    return deltas
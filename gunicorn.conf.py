@@ -0,0 +1,12 @@
+"""
+gunicorn settings, read from the working directory in addition to the
+command-line options of the Dockerfile and Procfile.
+"""
+import os
+
+from metrics import DEFAULT_DIRECTORY, clear_directory
+
+
+def on_starting(_server):
+    """Start the metrics of a new server from zero (see `metrics`)."""
+    clear_directory(os.environ.get('METRICS_DIR', DEFAULT_DIRECTORY))
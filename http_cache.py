@@ -0,0 +1,285 @@
+"""
+On-disk HTTP response cache for `WebScraper.fetch_page`.
+
+Each cached URL is stored as three files named after a hash of the URL:
+``<key>.meta.json`` (validators), ``<key>.body`` (raw response body) and,
+once a scraper has processed the page, ``<key>.records.json`` (extracted
+records and next-page link). Re-fetches send ``If-None-Match`` /
+``If-Modified-Since``, and a 304 lets the scraper reuse the stored records
+without parsing. The total size on disk is capped with LRU eviction. The
+directory may be shared by several processes (e.g. gunicorn workers): sizes
+and last uses are read from the files themselves, and evictions hold a
+file lock in the directory.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import requests
+
+from storage import DataFileStore
+from web_scraper_base import logger
+
+META_SUFFIX = '.meta.json'
+BODY_SUFFIX = '.body'
+RECORDS_SUFFIX = '.records.json'
+
+# Longest time between two scans of the directory by one process while it stores pages
+SCAN_INTERVAL = 60.0
+
+
+class HTTPCache:
+    """Size-capped, LRU-evicted store of response bodies and their validators."""
+
+    def __init__(self, directory: str = '.http_cache', max_bytes: int = 50 * 1024 * 1024):
+        """
+        Initialize the cache, evicting entries if the directory is over `max_bytes`.
+
+        Args:
+            directory: Directory holding the cache files
+            max_bytes: Maximum total size of cached files before eviction
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        # Serializes eviction across the processes sharing the directory
+        self._dir_lock = DataFileStore(os.path.join(directory, 'cache'))
+        # Size of the directory at the last scan plus what this process wrote since
+        self._estimated_bytes = 0
+        self._scanned_at = 0.0
+        self._evict()
+
+    def _path(self, key: str, suffix: str) -> str:
+        return os.path.join(self.directory, key + suffix)
+
+    @staticmethod
+    def _key(url: str) -> str:
+        return hashlib.sha256(url.encode('utf-8')).hexdigest()[:40]
+
+    def _entry_size(self, key: str) -> int:
+        size = 0
+        for suffix in (META_SUFFIX, BODY_SUFFIX, RECORDS_SUFFIX):
+            try:
+                size += os.path.getsize(self._path(key, suffix))
+            except OSError:
+                pass
+        return size
+
+    def _scan(self) -> List[Tuple[float, str, int]]:
+        """
+        Read every entry's last use and size from the directory.
+
+        An entry's last use is the mtime of its metadata file, touched on
+        every hit. Files left without metadata (e.g. by an interrupted
+        write) sort as least recently used.
+
+        Returns:
+            ``(last_use, key, bytes)`` of every entry, least recently used first
+        """
+        entries: Dict[str, List[float]] = {}
+        for entry in os.scandir(self.directory):
+            for suffix in (META_SUFFIX, BODY_SUFFIX, RECORDS_SUFFIX):
+                if entry.name.endswith(suffix):
+                    try:
+                        st = entry.stat()
+                    except OSError:
+                        break
+                    used_size = entries.setdefault(entry.name[:-len(suffix)], [0.0, 0])
+                    used_size[1] += st.st_size
+                    if suffix == META_SUFFIX:
+                        used_size[0] = st.st_mtime
+                    break
+        return sorted((used, key, size) for key, (used, size) in entries.items())
+
+    def _read_json(self, key: str, suffix: str) -> Optional[Any]:
+        try:
+            with open(self._path(key, suffix), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write(self, key: str, suffix: str, content: bytes):
+        """Write a cache file atomically so readers never see a partial file."""
+        path = self._path(key, suffix)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+
+    def _evict(self):
+        """
+        Drop least recently used entries until the directory fits in `max_bytes`.
+
+        Sizes and last uses are read from the directory under its file lock,
+        so every process sharing the cache evicts against the same totals.
+        """
+        evicted = 0
+        with self._dir_lock.lock():
+            entries = self._scan()
+            total = sum(size for _used, _key, size in entries)
+            for _used, key, size in entries:
+                if total <= self.max_bytes:
+                    break
+                for suffix in (META_SUFFIX, BODY_SUFFIX, RECORDS_SUFFIX):
+                    try:
+                        os.remove(self._path(key, suffix))
+                    except OSError:
+                        pass
+                total -= size
+                evicted += 1
+        with self._lock:
+            self.evictions += evicted
+            self._estimated_bytes = total
+            self._scanned_at = time.monotonic()
+
+    def _wrote(self, size: int):
+        """
+        Account for `size` bytes written, evicting if the cache may be full.
+
+        Scanning the directory on every write would cost a stat of every
+        file, so a process only rescans once its estimate (the size at its
+        last scan plus its own writes) exceeds `max_bytes`, or after
+        `SCAN_INTERVAL` seconds to pick up the writes of other processes.
+        """
+        with self._lock:
+            self._estimated_bytes += size
+            due = (self._estimated_bytes > self.max_bytes
+                   or time.monotonic() - self._scanned_at > SCAN_INTERVAL)
+        if due:
+            self._evict()
+
+    def conditional_headers(self, url: str) -> Dict[str, str]:
+        """
+        Build the validator headers for re-fetching `url`.
+
+        Args:
+            url: URL about to be fetched
+
+        Returns:
+            ``If-None-Match`` / ``If-Modified-Since`` headers, empty if not cached
+        """
+        meta = self._read_json(self._key(url), META_SUFFIX)
+        if not meta:
+            return {}
+        headers = {}
+        if meta.get('etag'):
+            headers['If-None-Match'] = meta['etag']
+        if meta.get('last_modified'):
+            headers['If-Modified-Since'] = meta['last_modified']
+        return headers
+
+    def load_body(self, url: str) -> Optional[bytes]:
+        """
+        Return the cached body of `url` and mark it as recently used.
+
+        Args:
+            url: Cached URL
+
+        Returns:
+            Body bytes, or None if the entry is missing
+        """
+        key = self._key(url)
+        try:
+            with open(self._path(key, BODY_SUFFIX), 'rb') as f:
+                body = f.read()
+        except OSError:
+            return None
+        # The metadata's mtime is the entry's last use, shared by every process
+        try:
+            os.utime(self._path(key, META_SUFFIX))
+        except OSError:
+            pass
+        return body
+
+    def store(self, url: str, response: requests.Response):
+        """
+        Store a full (200) response if it carries any validator.
+
+        Args:
+            url: Requested URL
+            response: Response to cache
+        """
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        if not etag and not last_modified:
+            return
+
+        key = self._key(url)
+        meta = {'url': url, 'etag': etag, 'last_modified': last_modified}
+        try:
+            self._write(key, BODY_SUFFIX, response.content)
+            self._write(key, META_SUFFIX, json.dumps(meta).encode('utf-8'))
+            try:
+                os.remove(self._path(key, RECORDS_SUFFIX))
+            except OSError:
+                pass
+        except OSError as e:
+            logger.warning(f"Error caching {url}: {e}")
+            return
+
+        self._wrote(self._entry_size(key))
+
+    def load_records(self, url: str) -> Optional[Dict[str, Any]]:
+        """
+        Return the records a scraper previously extracted from `url`.
+
+        Args:
+            url: Cached URL
+
+        Returns:
+            ``{'records': [...], 'next': url_or_None}``, or None if not stored
+        """
+        return self._read_json(self._key(url), RECORDS_SUFFIX)
+
+    def store_records(self, url: str, records: Any, next_url: Optional[str] = None):
+        """
+        Store the records extracted from the cached body of `url`.
+
+        Args:
+            url: Cached URL
+            records: JSON-serializable records extracted from the page
+            next_url: Next-page link found on the page, if any
+        """
+        key = self._key(url)
+        if not os.path.exists(self._path(key, META_SUFFIX)):
+            return  # Not cached, or evicted since
+        try:
+            content = json.dumps({'records': records, 'next': next_url},
+                                 ensure_ascii=False).encode('utf-8')
+            self._write(key, RECORDS_SUFFIX, content)
+        except (OSError, TypeError, ValueError) as e:
+            logger.warning(f"Error caching records for {url}: {e}")
+            return
+        self._wrote(len(content))
+
+    def record_hit(self):
+        """Count a revalidated (304) fetch."""
+        with self._lock:
+            self.hits += 1
+
+    def record_miss(self):
+        """Count a full (200) fetch."""
+        with self._lock:
+            self.misses += 1
+
+    def stats(self) -> Dict[str, int]:
+        """Return this process's hit/miss/eviction counters and the size of the directory."""
+        try:
+            entries = self._scan()
+        except OSError:
+            entries = []
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(entries),
+                'bytes': sum(size for _used, _key, size in entries)
+            }
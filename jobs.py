@@ -0,0 +1,324 @@
+"""
+Background scrape jobs for the API.
+
+Jobs run on a bounded in-process thread pool of the gunicorn worker that
+accepted them. Their state is written to one JSON file per job, so any
+worker can answer ``GET /api/jobs/<id>``. Each job records the process that
+owns it: a worker starting up fails the queued and running jobs of
+processes that no longer exist, since they will never finish. Finished jobs
+are deleted once they are older than the retention period, or when there
+are more of them than the retention count.
+"""
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from storage import pid_alive
+from web_scraper_base import logger
+
+# Finished jobs are kept this many seconds, and at most this many of them
+MAX_JOB_AGE = 7 * 24 * 3600
+MAX_FINISHED_JOBS = 500
+
+FINISHED_STATUSES = ('succeeded', 'failed')
+
+# Minimum seconds between two prunes triggered by new jobs
+PRUNE_INTERVAL = 60.0
+
+
+class JobQueueFull(Exception):
+    """Raised when too many jobs are already waiting to run."""
+
+
+class JobProgress:
+    """Thread-safe progress of one job, persisted after every update."""
+
+    def __init__(self, job: Dict[str, Any], store: 'JobStore'):
+        """
+        Initialize the progress tracker.
+
+        Args:
+            job: Job state dictionary (updated in place)
+            store: Store the state is persisted to
+        """
+        self.job = job
+        self.store = store
+        self._lock = threading.Lock()
+
+    def update(self, **fields):
+        """Set job fields and persist the job."""
+        with self._lock:
+            self.job.update(fields)
+            self.store.save(self.job)
+
+    def page_done(self, url: str, records: int, ok: bool):
+        """
+        Record one processed page.
+
+        Args:
+            url: Page URL
+            records: Number of records extracted from the page
+            ok: False if the page could not be fetched
+        """
+        with self._lock:
+            self.job['pages_done'] += 1
+            self.job['records'] += records
+            if not ok:
+                self.job['errors'].append(f"Error fetching {url}")
+            self.store.save(self.job)
+
+
+class JobStore:
+    """Stores job state as one JSON file per job."""
+
+    def __init__(self, directory: str = '.jobs'):
+        """
+        Initialize the store.
+
+        Args:
+            directory: Directory holding the job files
+        """
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, job_id: str) -> str:
+        return os.path.join(self.directory, f"{job_id}.json")
+
+    def save(self, job: Dict[str, Any]):
+        """Write a job's state atomically."""
+        path = self._path(job['id'])
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(job, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def load(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Read a job's state.
+
+        Args:
+            job_id: Job ID
+
+        Returns:
+            Job state, or None if the job is unknown
+        """
+        # Job IDs are hex UUIDs; reject anything that could escape the directory
+        if not job_id.isalnum():
+            return None
+        try:
+            with open(self._path(job_id), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def jobs(self) -> Iterator[Tuple[str, float]]:
+        """Yield the ID and modification time of every stored job."""
+        try:
+            entries = list(os.scandir(self.directory))
+        except OSError:
+            return
+        for entry in entries:
+            if entry.name.endswith('.json'):
+                try:
+                    yield entry.name[:-len('.json')], entry.stat().st_mtime
+                except OSError:
+                    pass
+
+    def _remove(self, job_id: str):
+        try:
+            os.remove(self._path(job_id))
+        except OSError:
+            pass
+
+    def recover(self) -> int:
+        """
+        Fail the queued and running jobs whose owning process on this host has exited.
+
+        Returns:
+            Number of jobs marked as failed
+        """
+        host = socket.gethostname()
+        recovered = 0
+        for job_id, _mtime in self.jobs():
+            job = self.load(job_id)
+            if (job is None or job.get('status') in FINISHED_STATUSES
+                    or job.get('host') != host or not job.get('pid')
+                    or pid_alive(job['pid'])):
+                continue
+            logger.warning(f"Job {job_id} was {job['status']} in exited process {job['pid']}")
+            job.update(status='failed', finished_at=datetime.now().isoformat(),
+                       finished=time.time(),
+                       errors=job.get('errors', []) + [
+                           f"Worker process {job['pid']} exited before the job finished"])
+            self.save(job)
+            recovered += 1
+        return recovered
+
+    def prune(self, max_age: float = MAX_JOB_AGE, max_count: int = MAX_FINISHED_JOBS) -> int:
+        """
+        Delete finished jobs older than `max_age`, then all but the newest `max_count`.
+
+        Queued and running jobs are never deleted.
+
+        Args:
+            max_age: Seconds a finished job is kept
+            max_count: Maximum number of finished jobs kept
+
+        Returns:
+            Number of jobs deleted
+        """
+        cutoff = time.time() - max_age
+        kept = 0
+        deleted = 0
+        # Newest first: the last save of a finished job is its completion
+        for job_id, mtime in sorted(self.jobs(), key=lambda item: item[1], reverse=True):
+            if mtime >= cutoff and kept < max_count:
+                # Only finished jobs count towards the limit
+                job = self.load(job_id)
+                if job is not None and job.get('status') in FINISHED_STATUSES:
+                    kept += 1
+                continue
+            job = self.load(job_id)
+            if job is None or job.get('status') in FINISHED_STATUSES:
+                self._remove(job_id)
+                deleted += 1
+        return deleted
+
+
+class JobRunner:
+    """Runs scrape jobs on a bounded thread pool."""
+
+    def __init__(self, store: JobStore, max_workers: int = 2, max_pending: int = 20,
+                 max_age: float = MAX_JOB_AGE, max_finished: int = MAX_FINISHED_JOBS):
+        """
+        Initialize the runner, failing jobs orphaned by exited processes.
+
+        Args:
+            store: Store for job state
+            max_workers: Number of jobs running at once
+            max_pending: Maximum number of queued or running jobs in this process
+            max_age: Seconds a finished job is kept
+            max_finished: Maximum number of finished jobs kept
+        """
+        self.store = store
+        self.max_pending = max_pending
+        self.max_age = max_age
+        self.max_finished = max_finished
+        self.store.recover()
+        self.store.prune(max_age, max_finished)
+        self._pruned_at = time.monotonic()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                            thread_name_prefix='scrape-job')
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def submit(self, kind: str, params: Dict[str, Any], pages_total: int,
+               target: Callable[[JobProgress], Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Queue a job.
+
+        Finished jobs are pruned at most every `PRUNE_INTERVAL` seconds, since
+        pruning reads every job file.
+
+        Args:
+            kind: Job type, e.g. ``scrape`` or ``scrape/quotes``
+            params: Request parameters, stored with the job
+            pages_total: Expected number of pages, for progress reporting
+            target: Callable doing the work; receives the job's progress
+                tracker and returns a JSON-serializable result
+
+        Returns:
+            Initial job state
+
+        Raises:
+            JobQueueFull: If `max_pending` jobs are already queued or running
+        """
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise JobQueueFull(f"{self._pending} jobs already pending")
+            self._pending += 1
+
+        job = {
+            'id': uuid.uuid4().hex,
+            'kind': kind,
+            'host': socket.gethostname(),
+            'pid': os.getpid(),
+            'params': params,
+            'status': 'queued',
+            'created_at': datetime.now().isoformat(),
+            'started_at': None,
+            'finished_at': None,
+            'started': None,
+            'finished': None,
+            'pages_total': pages_total,
+            'pages_done': 0,
+            'records': 0,
+            'errors': [],
+            'result': None
+        }
+        try:
+            self.store.save(job)
+            initial = dict(job)
+            self._executor.submit(self._run, JobProgress(job, self.store), target)
+        except BaseException:
+            # The job never reaches _run, which would release its slot
+            with self._lock:
+                self._pending -= 1
+            raise
+        self._prune_if_due()
+        return initial
+
+    def _prune_if_due(self):
+        """Prune finished jobs if `PRUNE_INTERVAL` has passed since the last prune."""
+        with self._lock:
+            due = time.monotonic() - self._pruned_at >= PRUNE_INTERVAL
+            if due:
+                self._pruned_at = time.monotonic()
+        if due:
+            self.store.prune(self.max_age, self.max_finished)
+
+    def _run(self, progress: JobProgress, target: Callable[[JobProgress], Dict[str, Any]]):
+        """Run one job, recording its outcome."""
+        progress.update(status='running', started_at=datetime.now().isoformat(),
+                        started=time.time())
+        try:
+            result = target(progress)
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            logger.error(f"Job {progress.job['id']} failed: {e}")
+            errors: List[str] = progress.job['errors'] + [str(e)]
+            progress.update(status='failed', errors=errors,
+                            finished_at=datetime.now().isoformat(), finished=time.time())
+        else:
+            progress.update(status='succeeded', result=result,
+                            finished_at=datetime.now().isoformat(), finished=time.time())
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+
+def describe_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Build the public view of a job, including its elapsed time.
+
+    Args:
+        job: Stored job state
+
+    Returns:
+        Job state without internal fields, plus ``elapsed_seconds``
+    """
+    started = job.get('started')
+    finished = job.get('finished')
+    elapsed = None
+    if started is not None:
+        elapsed = round((finished or time.time()) - started, 3)
+
+    view = {key: value for key, value in job.items()
+            if key not in ('started', 'finished', 'host', 'pid')}
+    view['elapsed_seconds'] = elapsed
+    return view
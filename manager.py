@@ -1,30 +1,75 @@
+import asyncio
 from datetime import datetime
-import json
-from typing import Dict, Any
-from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Any, Optional
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 
 from web_scraper_base import logger
-from quote_scraper import QuoteScraper
-from book_scraper import BookScraper
-from scrapethissite_scraper import ScrapesiteScraper
+from async_engine import AsyncFetchEngine
+from columnar import write_snapshot
+from http_cache import HTTPCache
+from scrape_profiler import SamplingProfiler
+from delta import ChangeLog, changes_path, save_json_changes
+from stats import compute_all, write_stats
+from storage import DataFileStore
+from registry import ScraperRegistry, default_registry
+
+# Most sites scraped at once by `run_all_scrapers` (each fetches its pages concurrently)
+MAX_SITE_WORKERS = 32
 
 
 class MultiSiteScraperManager:
     """Manages scraping from multiple test sites."""
 
-    def __init__(self):
-        """Initialize the manager."""
+    def __init__(self, http_cache: Optional[HTTPCache] = None,
+                 page_callback: Optional[Callable[[str, int, bool], None]] = None,
+                 base_urls: Optional[Dict[str, str]] = None,
+                 registry: Optional[ScraperRegistry] = None):
+        """
+        Initialize the manager.
+
+        Args:
+            http_cache: Optional on-disk HTTP cache shared by the scrapers
+            page_callback: Optional progress hook, called as
+                page_callback(url, records_extracted, ok) after every page
+            base_urls: Site roots by data type to scrape instead of the public
+                sites (e.g. a local fixture server)
+            registry: Sites to scrape (default: the built-in scrapers)
+        """
+        self.http_cache = http_cache
+        self.page_callback = page_callback
+        self.base_urls = base_urls or {}
+        self.registry = registry if registry is not None else default_registry()
         self.results = {
             'timestamp': datetime.now().isoformat(),
             'data': {}
         }
+        # Sources whose scraper raised; their (empty) results are not saved in delta mode
+        self.failed = set()
+        # Report of the last profiled run (see `scrape_profiler`)
+        self.profile: Optional[Dict[str, Any]] = None
+
+    def _create_scrapers(self, **kwargs: Any) -> Dict[str, Any]:
+        """Build the scraper of every registered site, by data type."""
+        scrapers = {}
+        for key in self.registry.keys():
+            scraper = self.registry.create(key, base_url=self.base_urls.get(key), **kwargs)
+            scraper.page_callback = self.page_callback
+            scrapers[key] = scraper
+        return scrapers
 
-    def run_all_scrapers(self, num_pages: int = 1) -> Dict[str, Any]:
+    def run_all_scrapers(self, num_pages: int = 1, parse_workers: int = 0,
+                         profile: bool = False) -> Dict[str, Any]:
         """
-        Run all configured scrapers.
+        Run the scrapers of every registered site.
+
+        Up to `MAX_SITE_WORKERS` sites are scraped at once, one thread per
+        site, each fetching its pages concurrently within its own rate limit.
 
         Args:
             num_pages: Number of pages to scrape from each site
+            parse_workers: Number of parser processes; when > 0, fetcher threads
+                only download pages and HTML parsing runs in a process pool
+            profile: Sample the scrapers' threads and leave a report in `profile`
 
         Returns:
             Dictionary containing all scraped data
@@ -33,28 +78,92 @@ class MultiSiteScraperManager:
         logger.info("Starting multi-site web scraping session")
         logger.info("=" * 50)
 
-        # Initialize scrapers
-        quote_scraper = QuoteScraper()
-        book_scraper = BookScraper()
-        hockey_scraper = ScrapesiteScraper()
+        scrapers = self._create_scrapers(http_cache=self.http_cache)
+
+        parse_pool = ProcessPoolExecutor(max_workers=parse_workers) if parse_workers > 0 else None
+        profiler = SamplingProfiler(scrapers) if profile else None
 
         # Run scrapers in parallel using threads (I/O-bound)
-        logger.info("\nLaunching scrapers in parallel...")
-        with ThreadPoolExecutor(max_workers=3) as ex:
-            future_to_key = {
-                ex.submit(quote_scraper.scrape_quotes, num_pages): 'quotes',
-                ex.submit(book_scraper.scrape_books, num_pages): 'books',
-                ex.submit(hockey_scraper.scrape_hockey_stats, num_pages): 'hockey_teams'
-            }
-
-            for fut, key in future_to_key.items():
-                try:
-                    result = fut.result()
-                except Exception as e:
-                    logger.error(f"Error running scraper for {key}: {e}")
-                    self.results['data'][key] = []
-                else:
-                    self.results['data'][key] = result
+        site_workers = max(1, min(len(scrapers), MAX_SITE_WORKERS))
+        logger.info(f"\nLaunching {len(scrapers)} scrapers in parallel...")
+        if profiler is not None:
+            profiler.start()
+        try:
+            with ThreadPoolExecutor(max_workers=site_workers) as ex:
+                future_to_key = {ex.submit(scraper.scrape, num_pages, parse_pool): key
+                                 for key, scraper in scrapers.items()}
+
+                for fut, key in future_to_key.items():
+                    try:
+                        result = fut.result()
+                    except Exception as e:
+                        logger.error(f"Error running scraper for {key}: {e}")
+                        self.results['data'][key] = []
+                        self.failed.add(key)
+                    else:
+                        self.results['data'][key] = result
+        finally:
+            if parse_pool is not None:
+                parse_pool.shutdown()
+            if profiler is not None:
+                profiler.stop()
+                self.profile = profiler.report()
+                logger.info(f"Profile: {self.profile['stages']}")
+
+        if self.http_cache is not None:
+            logger.info(f"HTTP cache: {self.http_cache.stats()}")
+
+        logger.info("\n" + "=" * 50)
+        logger.info("Scraping session completed")
+        logger.info("=" * 50)
+
+        return self.results
+
+    async def run_all_scrapers_async(self, num_pages: int = 1, per_host_limit: int = 4,
+                                     parse_workers: int = 0) -> Dict[str, Any]:
+        """
+        Run the scrapers of every registered site on one asyncio event loop.
+
+        Every site and page is multiplexed over a single `AsyncFetchEngine`
+        instead of one thread per site. Fetches go through the HTTP cache,
+        retry policy and circuit breakers like threaded runs, and pages are
+        parsed off the event loop. Use `asyncio.run(...)` from sync code.
+
+        Args:
+            num_pages: Number of pages to scrape from each site
+            per_host_limit: Maximum open connections to each site
+            parse_workers: Number of parser processes; when 0, pages are
+                parsed in the event loop's default thread pool
+
+        Returns:
+            Dictionary containing all scraped data
+        """
+        logger.info("=" * 50)
+        logger.info("Starting multi-site web scraping session (asyncio)")
+        logger.info("=" * 50)
+
+        scrapers = self._create_scrapers(http_cache=self.http_cache,
+                                         max_concurrency=per_host_limit)
+
+        parse_pool = ProcessPoolExecutor(max_workers=parse_workers) if parse_workers > 0 else None
+        try:
+            async with AsyncFetchEngine(per_host_limit=per_host_limit) as engine:
+                outcomes = await asyncio.gather(
+                    *(scraper.scrape_async(num_pages, engine, parse_pool)
+                      for scraper in scrapers.values()),
+                    return_exceptions=True
+                )
+        finally:
+            if parse_pool is not None:
+                parse_pool.shutdown()
+
+        for key, outcome in zip(scrapers, outcomes):
+            if isinstance(outcome, Exception):
+                logger.error(f"Error running scraper for {key}: {outcome}")
+                self.results['data'][key] = []
+                self.failed.add(key)
+            else:
+                self.results['data'][key] = outcome
 
         logger.info("\n" + "=" * 50)
         logger.info("Scraping session completed")
@@ -62,19 +171,78 @@ class MultiSiteScraperManager:
 
         return self.results
 
-    def save_results(self, filename: str = 'scraped_data.json'):
+    def save_results(self, filename: str = 'scraped_data.json',
+                     delta: bool = False) -> Dict[str, Any]:
         """
-        Save results to a JSON file.
+        Save results to a JSON file and log the changed records.
+
+        The file is replaced atomically under the store's lock, so readers
+        never see a partially written document. Inserted, updated and deleted
+        records are appended to the change log next to it.
 
         Args:
             filename: Output filename
+            delta: Skip sources whose scraper failed, and leave the file
+                untouched when no record changed
+
+        Returns:
+            Change counts by data type
         """
+        data = self.results['data']
+        if delta:
+            data = {key: records for key, records in data.items() if key not in self.failed}
         try:
-            with open(filename, 'w', encoding='utf-8') as f:
-                json.dump(self.results, f, indent=2, ensure_ascii=False)
-            logger.info(f"Results saved to {filename}")
-        except IOError as e:
+            deltas = save_json_changes(DataFileStore(filename), ChangeLog(changes_path(filename)),
+                                       self.results['timestamp'], data, delta=delta)
+        except ValueError as e:
+            if delta:
+                logger.error(f"Error saving results: {e}")
+                return {}
+            # Unreadable previous file: nothing to diff against, overwrite it
+            logger.warning(f"Replacing unreadable {filename}: {e}")
+            deltas = {}
+            try:
+                DataFileStore(filename).write(self.results)
+            except (IOError, OSError) as write_error:
+                logger.error(f"Error saving results: {write_error}")
+                return {}
+        except (IOError, OSError) as e:
             logger.error(f"Error saving results: {e}")
+            return {}
+
+        summary = {key: changes.summary() for key, changes in deltas.items()}
+        if delta and not any(deltas.values()):
+            logger.info(f"No changes; {filename} left as is")
+        else:
+            logger.info(f"Results saved to {filename}")
+        logger.info(f"Changes: {summary}")
+        return summary
+
+    def save_snapshot(self, filename: str = 'scraped_data.sdcs'):
+        """
+        Save results as a compact columnar snapshot (see `columnar`).
+
+        Args:
+            filename: Output filename
+        """
+        try:
+            write_snapshot(filename, self.results)
+            logger.info(f"Snapshot saved to {filename}")
+        except (IOError, OSError) as e:
+            logger.error(f"Error saving snapshot: {e}")
+
+    def save_stats(self, filename: str = 'scraped_data.stats.json'):
+        """
+        Save the aggregate statistics of the results (see `stats`).
+
+        Args:
+            filename: Output filename
+        """
+        try:
+            write_stats(filename, compute_all(self.results['data']))
+            logger.info(f"Statistics saved to {filename}")
+        except (IOError, OSError) as e:
+            logger.error(f"Error saving statistics: {e}")
 
     def print_summary(self):
         """Print a summary of scraped data."""
@@ -97,4 +265,8 @@ class MultiSiteScraperManager:
             if self.results['data']['hockey_teams']:
                 print(f"  Example: {self.results['data']['hockey_teams'][0]['name']}")
 
+        for key, records in self.results['data'].items():
+            if key not in ('quotes', 'books', 'hockey_teams'):
+                print(f"\n{key}: {len(records)} records scraped")
+
         print("\n" + "=" * 60 + "\n")
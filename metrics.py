@@ -0,0 +1,401 @@
+"""
+Prometheus-style metrics of the scrapers and the API.
+
+Counters, gauges and histograms are kept in memory by every process. When a
+metrics directory is configured (the API uses ``METRICS_DIR``, default
+``.metrics``), each process also writes its samples to its own file there,
+from a background thread every `FLUSH_INTERVAL` seconds, and `render()`
+merges the files of all processes. This lets any gunicorn worker (or the
+parser processes it starts) answer ``GET /metrics`` for the whole server.
+Files of exited processes are folded into one archive file, so counters keep
+their totals when a worker is replaced. `clear_directory()` resets
+everything and is called by gunicorn.conf.py when the server starts.
+"""
+import atexit
+import copy
+import json
+import logging
+import math
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from storage import DataFileStore, atomic_write_bytes, pid_alive
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DIRECTORY = '.metrics'
+
+# Seconds between writes of a process's samples to the metrics directory
+FLUSH_INTERVAL = 2.0
+
+# Content type of the Prometheus text exposition format
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+BYTES_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+ARCHIVE_FILE = 'archive.json'
+
+_lock = threading.Lock()
+_registry: Dict[str, 'Metric'] = {}
+
+
+class Metric:
+    """A named metric with label dimensions; samples are keyed by label values."""
+
+    kind = ''
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        """
+        Create and register the metric.
+
+        Args:
+            name: Metric name (counters end in ``_total``)
+            documentation: HELP text
+            labels: Label names; observations pass one value per label
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.samples: Dict[Tuple[str, ...], Any] = {}
+        _registry[name] = self
+
+    def _key(self, labels: Sequence[Any]) -> Tuple[str, ...]:
+        if len(labels) != len(self.labels):
+            raise ValueError(f"{self.name} takes labels {self.labels}, got {tuple(labels)}")
+        return tuple(str(label) for label in labels)
+
+    def describe(self) -> Dict[str, Any]:
+        """Return the metric's definition, as stored in the process files."""
+        return {'kind': self.kind, 'help': self.documentation, 'labels': list(self.labels)}
+
+
+class Counter(Metric):
+    """Monotonically increasing count."""
+
+    kind = 'counter'
+
+    def inc(self, *labels: Any, amount: float = 1.0):
+        """Add `amount` to the sample of `labels`."""
+        key = self._key(labels)
+        with _lock:
+            self.samples[key] = self.samples.get(key, 0.0) + amount
+        _changed()
+
+
+class Gauge(Metric):
+    """Current value; the largest value over all live processes is reported."""
+
+    kind = 'gauge'
+
+    def set(self, value: float, *labels: Any):
+        """Set the sample of `labels`."""
+        key = self._key(labels)
+        with _lock:
+            self.samples[key] = float(value)
+        _changed()
+
+
+class Histogram(Metric):
+    """Distribution of observed values over fixed buckets, with their sum and count."""
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        """
+        Create and register the histogram.
+
+        Args:
+            name: Metric name
+            documentation: HELP text
+            labels: Label names
+            buckets: Upper bounds of the buckets, ascending (+Inf is implied)
+        """
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(float(bound) for bound in buckets)
+
+    def describe(self) -> Dict[str, Any]:
+        return {**super().describe(), 'buckets': list(self.buckets)}
+
+    def observe(self, value: float, *labels: Any):
+        """Record one observation for `labels`."""
+        key = self._key(labels)
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = i
+                break
+        with _lock:
+            sample = self.samples.get(key)
+            if sample is None:
+                # Per-bucket (not cumulative) counts including +Inf, sum, count
+                sample = self.samples[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            sample[0][index] += 1
+            sample[1] += value
+            sample[2] += 1
+        _changed()
+
+    @contextmanager
+    def time(self, *labels: Any) -> Iterator[None]:
+        """Observe the wall-clock seconds spent in the ``with`` block."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labels)
+
+
+# Scrapers
+FETCH_SECONDS = Histogram('scraper_fetch_seconds',
+                          'Latency of upstream HTTP requests (one per attempt)', ['host'])
+FETCH_BYTES = Histogram('scraper_fetch_bytes', 'Size of downloaded page bodies',
+                        ['host'], buckets=BYTES_BUCKETS)
+RATE_LIMIT_WAIT_SECONDS = Histogram('scraper_rate_limit_wait_seconds',
+                                    'Time spent waiting for a rate limit token', ['host'])
+PARSE_SECONDS = Histogram('scraper_parse_seconds', 'HTML parse time per page', ['type'])
+EXTRACT_SECONDS = Histogram('scraper_extract_seconds',
+                            'Record extraction time per page', ['type'])
+HTTP_CACHE_TOTAL = Counter('scraper_http_cache_total',
+                           'Fetches answered from the HTTP cache (hit, 304) or in full (miss)',
+                           ['host', 'result'])
+FETCH_RETRIES_TOTAL = Counter('scraper_fetch_retries_total', 'Retried upstream requests',
+                              ['host'])
+FETCH_FAILURES_TOTAL = Counter('scraper_fetch_failures_total',
+                               'Upstream requests failing with a connection error, '
+                               'timeout, 429 or 5xx', ['host'])
+CIRCUIT_REJECTED_TOTAL = Counter('scraper_circuit_rejected_total',
+                                 'Fetches failed fast by an open circuit breaker', ['host'])
+CIRCUIT_OPEN = Gauge('scraper_circuit_open', '1 while the host circuit breaker is open',
+                     ['host'])
+
+# API
+API_REQUEST_SECONDS = Histogram('api_request_seconds', 'API request latency per route',
+                                ['method', 'route', 'status'])
+
+
+class _ProcessFile:
+    """Where and when this process writes its samples."""
+
+    def __init__(self):
+        self.directory: Optional[str] = os.environ.get('METRICS_DIR')
+        self.path: Optional[str] = None
+        self.dirty = False
+        self.thread: Optional[threading.Thread] = None
+
+    def reset(self):
+        """Forget the samples, lock and file inherited from the parent process."""
+        global _lock  # pylint: disable=global-statement
+        _lock = threading.Lock()  # May have been held by another thread at fork time
+        self.path = None
+        self.dirty = False
+        self.thread = None
+        for metric in _registry.values():
+            metric.samples = {}
+
+
+_process = _ProcessFile()
+if hasattr(os, 'register_at_fork'):  # Not on Windows, which has no fork
+    os.register_at_fork(after_in_child=_process.reset)
+
+
+def configure(directory: str):
+    """
+    Share this process's samples through `directory`.
+
+    The directory is also exported as ``METRICS_DIR`` so processes started
+    later (e.g. parser workers) report to it too.
+
+    Args:
+        directory: Metrics directory (created if missing)
+    """
+    os.makedirs(directory, exist_ok=True)
+    os.environ['METRICS_DIR'] = directory
+    _process.directory = directory
+
+
+def clear_directory(directory: str):
+    """Delete the sample files in `directory`, starting every metric from zero."""
+    if not os.path.isdir(directory):
+        return
+    for name in os.listdir(directory):
+        if name.endswith('.json'):
+            try:
+                os.remove(os.path.join(directory, name))
+            except OSError:
+                pass
+
+
+def _changed():
+    """Mark the samples for the next flush, starting the flush thread on first use."""
+    if _process.directory is None:
+        return
+    _process.dirty = True
+    if _process.thread is None:
+        with _lock:
+            if _process.thread is None:
+                _process.thread = threading.Thread(target=_flush_loop, name='metrics-flush',
+                                                   daemon=True)
+                _process.thread.start()
+
+
+def _flush_loop():
+    while True:
+        time.sleep(FLUSH_INTERVAL)
+        if _process.dirty:
+            flush()
+
+
+def _snapshot() -> Dict[str, Any]:
+    """Copy the samples of every metric."""
+    with _lock:
+        return {name: {**metric.describe(),
+                       'samples': [[list(key), copy.deepcopy(value)]
+                                   for key, value in metric.samples.items()]}
+                for name, metric in _registry.items()}
+
+
+def flush():
+    """Write this process's samples to its file in the metrics directory."""
+    if _process.directory is None:
+        return
+    if _process.path is None:
+        _process.path = os.path.join(_process.directory,
+                                     f"metrics-{os.getpid()}-{uuid.uuid4().hex[:8]}.json")
+    _process.dirty = False
+    content = json.dumps({'pid': os.getpid(), 'metrics': _snapshot()}, separators=(',', ':'))
+    try:
+        atomic_write_bytes(_process.path, content.encode('utf-8'))
+    except OSError as e:
+        logger.warning(f"Error writing metrics to {_process.path}: {e}")
+
+
+atexit.register(flush)
+
+
+def _merge(into: Dict[str, Any], metrics: Dict[str, Any], live: bool = True):
+    """
+    Add the samples of one process file (or of the archive) to `into`.
+
+    Args:
+        into: Merged metrics, with samples keyed by label value tuples
+        metrics: Metrics as stored, with samples as [label values, value] pairs
+        live: False for an exited process, whose gauges are dropped
+    """
+    for name, metric in metrics.items():
+        if metric['kind'] == 'gauge' and not live:
+            continue  # The gauges of an exited process are no longer current
+        merged = into.setdefault(name, {**metric, 'samples': {}})
+        if merged['kind'] != metric['kind'] or merged.get('buckets') != metric.get('buckets'):
+            continue  # Definition changed between versions; keep the first one seen
+        samples = merged['samples']
+        for key, value in metric['samples']:
+            key = tuple(key)
+            current = samples.get(key)
+            if current is None:
+                samples[key] = copy.deepcopy(value)
+            elif metric['kind'] == 'counter':
+                samples[key] = current + value
+            elif metric['kind'] == 'gauge':
+                samples[key] = max(current, value)
+            else:
+                current[0] = [a + b for a, b in zip(current[0], value[0])]
+                current[1] += value[1]
+                current[2] += value[2]
+
+
+def _stored(merged: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert merged metrics back to the stored form."""
+    return {name: {**metric, 'samples': [[list(key), value]
+                                         for key, value in metric['samples'].items()]}
+            for name, metric in merged.items()}
+
+
+def collect() -> Dict[str, Any]:
+    """
+    Merge the samples of every process sharing the metrics directory.
+
+    Returns:
+        Metric name -> definition with ``samples`` keyed by label value tuples
+    """
+    merged: Dict[str, Any] = {}
+    if _process.directory is None:
+        _merge(merged, _snapshot())
+        return merged
+
+    flush()
+    archive = DataFileStore(os.path.join(_process.directory, ARCHIVE_FILE))
+    with archive.lock():
+        archived: Dict[str, Any] = {}
+        try:
+            _merge(archived, archive.read() or {}, live=False)
+        except ValueError:
+            logger.warning(f"Ignoring unreadable {archive.path}")
+        _merge(merged, _stored(archived), live=False)
+
+        exited: List[str] = []
+        for name in sorted(os.listdir(_process.directory)):
+            if not (name.startswith('metrics-') and name.endswith('.json')):
+                continue
+            path = os.path.join(_process.directory, name)
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    process = json.load(f)
+            except (OSError, ValueError):
+                continue  # Removed by another worker, or not yet written
+            live = pid_alive(process['pid'])
+            _merge(merged, process['metrics'], live=live)
+            if not live:
+                _merge(archived, process['metrics'], live=False)
+                exited.append(path)
+
+        # Fold exited processes into the archive so the number of files stays bounded
+        if exited:
+            content = json.dumps(_stored(archived), separators=(',', ':'))
+            atomic_write_bytes(archive.path, content.encode('utf-8'))
+            for path in exited:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+    return merged
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ''
+    escaped = (value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+               for value in values)
+    return '{' + ','.join(f'{name}="{value}"' for name, value in zip(names, escaped)) + '}'
+
+
+def render() -> str:
+    """Render every metric of every process in the Prometheus text format."""
+    lines = []
+    for name, metric in sorted(collect().items()):
+        lines.append(f"# HELP {name} {metric['help']}")
+        lines.append(f"# TYPE {name} {metric['kind']}")
+        names = metric['labels']
+        for key, value in sorted(metric['samples'].items()):
+            if metric['kind'] != 'histogram':
+                lines.append(f"{name}{_format_labels(names, key)} {_format_value(value)}")
+                continue
+            cumulative = 0
+            bounds = [_format_value(bound) for bound in metric['buckets']] + ['+Inf']
+            for bound, count in zip(bounds, value[0]):
+                cumulative += count
+                labels = _format_labels(list(names) + ['le'], list(key) + [bound])
+                lines.append(f"{name}_bucket{labels} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(names, key)} {_format_value(value[1])}")
+            lines.append(f"{name}_count{_format_labels(names, key)} {value[2]}")
+    return '\n'.join(lines) + '\n'
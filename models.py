@@ -0,0 +1,170 @@
+"""
+Compact, typed record models for the scraped data.
+
+The scrapers build a `Quote`, `Book` or `HockeyTeam` for every record,
+parsing numbers once at scrape time (book price and star rating, team year,
+wins and losses) instead of leaving every consumer to re-parse strings.
+Values repeated across records (``source``, authors, tags, availability,
+team names) are interned so all records share one string object. The
+classes use ``__slots__``; `to_dict()` produces the JSON records that are
+stored and served, and `from_dict()` also accepts the older all-string records.
+"""
+import re
+import sys
+from typing import Any, Dict, List, Optional
+
+RATING_WORDS = {'Zero': 0, 'One': 1, 'Two': 2, 'Three': 3, 'Four': 4, 'Five': 5}
+
+NUMBER_RE = re.compile(r'-?\d+(?:\.\d+)?')
+
+
+def intern(value: Any) -> Any:
+    """Intern strings so equal values share one object; other values pass through."""
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+def parse_price(value: Any) -> Optional[float]:
+    """Parse a price such as "£51.77" into 51.77 (None if there is no number)."""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    match = NUMBER_RE.search(str(value or '').replace(',', ''))
+    return float(match.group()) if match else None
+
+
+def parse_int(value: Any) -> Optional[int]:
+    """Parse an integer such as " 44 " (None if there is no number)."""
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value
+    match = NUMBER_RE.search(str(value or '').replace(',', ''))
+    return int(float(match.group())) if match else None
+
+
+def parse_rating(value: Any) -> Optional[int]:
+    """Parse a star rating given as a word ("Three") or a number."""
+    if isinstance(value, str) and value.strip() in RATING_WORDS:
+        return RATING_WORDS[value.strip()]
+    return parse_int(value)
+
+
+class Record:
+    """Base class of the record models; fields are the subclass's ``__slots__``."""
+
+    __slots__ = ()
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the record as the JSON-serializable dictionary stored by the scrapers."""
+        return {field: getattr(self, field) for field in self.__slots__}
+
+    def __eq__(self, other: object) -> bool:
+        return type(self) is type(other) and all(
+            getattr(self, field) == getattr(other, field) for field in self.__slots__)
+
+    def __repr__(self) -> str:
+        fields = ', '.join(f"{field}={getattr(self, field)!r}" for field in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+
+class Quote(Record):
+    """One quote from quotes.toscrape.com."""
+
+    __slots__ = ('text', 'author', 'tags', 'source')
+
+    def __init__(self, text: str, author: str, tags: List[str], source: str):
+        self.text = text
+        self.author = intern(author)
+        self.tags = [intern(tag) for tag in tags]
+        self.source = intern(source)
+
+    @classmethod
+    def from_dict(cls, record: Dict[str, Any]) -> 'Quote':
+        """Build a quote from a stored record."""
+        return cls(record.get('text'), record.get('author'), record.get('tags') or [],
+                   record.get('source'))
+
+
+class Book(Record):
+    """One book from books.toscrape.com; `price` is in pounds, `rating` is 0-5 stars."""
+
+    __slots__ = ('title', 'price', 'availability', 'rating', 'source')
+
+    def __init__(self, title: str, price: Any, availability: str, rating: Any, source: str):
+        self.title = title
+        self.price = parse_price(price)
+        self.availability = intern(availability)
+        self.rating = parse_rating(rating)
+        self.source = intern(source)
+
+    @classmethod
+    def from_dict(cls, record: Dict[str, Any]) -> 'Book':
+        """Build a book from a stored record (numeric or "£51.77"/"Three" strings)."""
+        return cls(record.get('title'), record.get('price'), record.get('availability'),
+                   record.get('rating'), record.get('source'))
+
+
+class HockeyTeam(Record):
+    """One team season from scrapethissite.com."""
+
+    __slots__ = ('name', 'year', 'wins', 'losses', 'source')
+
+    def __init__(self, name: str, year: Any, wins: Any, losses: Any, source: str):
+        self.name = intern(name)
+        self.year = parse_int(year)
+        self.wins = parse_int(wins)
+        self.losses = parse_int(losses)
+        self.source = intern(source)
+
+    @classmethod
+    def from_dict(cls, record: Dict[str, Any]) -> 'HockeyTeam':
+        """Build a team season from a stored record (numeric or string fields)."""
+        return cls(record.get('name'), record.get('year'), record.get('wins'),
+                   record.get('losses'), record.get('source'))
+
+
+# Data type -> record model
+MODELS = {
+    'quotes': Quote,
+    'books': Book,
+    'hockey_teams': HockeyTeam,
+}
+
+
+# Data type -> fields stored as numbers (files written before the typed models hold text)
+NUMERIC_FIELDS = {
+    'books': ('price', 'rating'),
+    'hockey_teams': ('year', 'wins', 'losses'),
+}
+
+
+def normalize_records(data_type: str, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Convert stored records of a data type to the current typed form."""
+    model = MODELS.get(data_type)
+    if model is None:
+        return records
+    return [model.from_dict(record).to_dict() for record in records]
+
+
+def is_normalized(data_type: str, records: List[Dict[str, Any]]) -> bool:
+    """Whether no record of a data type holds a numeric field as text."""
+    fields = NUMERIC_FIELDS.get(data_type, ())
+    return not any(isinstance(record.get(field), str) for record in records for field in fields)
+
+
+def normalize_document(document: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Convert the records of a data document to the current typed form, in place.
+
+    Data types already in that form are left as they are, so a file written
+    by the current scrapers is not copied.
+
+    Args:
+        document: ``{'timestamp': ..., 'data': {data_type: records}}``
+
+    Returns:
+        The same document
+    """
+    data = document.get('data')
+    if isinstance(data, dict):
+        for data_type, records in data.items():
+            if isinstance(records, list) and not is_normalized(data_type, records):
+                data[data_type] = normalize_records(data_type, records)
+    return document
@@ -0,0 +1,296 @@
+"""
+Server-side filtering, sorting and pagination of scraped records.
+
+A `RecordIndex` is built once per data generation for each data type. It
+maps every filterable value to the positions of the matching records and
+precomputes the sort order of every sortable field, so a query costs
+roughly O(matches + page size) instead of a scan of the whole list.
+"""
+import base64
+import binascii
+import bisect
+import hashlib
+import json
+from typing import Any, Callable, Dict, List, Mapping, Optional
+
+from models import parse_price, parse_rating
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+
+
+def _to_number(value: Any) -> float:
+    """Sort key of numbers, also parsed out of older strings such as "£51.77" or " 44 "."""
+    number = parse_price(value)
+    return float('-inf') if number is None else number
+
+
+def _to_rating(value: Any) -> float:
+    """Turn a star rating (3, or "Three" in older records) into a number."""
+    rating = parse_rating(value)
+    return float('-inf') if rating is None else rating
+
+
+def _to_text(value: Any) -> str:
+    return str(value if value is not None else '').casefold()
+
+
+def _rating_key(value: Any) -> str:
+    """Equality key of a rating, so ``rating=Three`` and ``rating=3`` both match."""
+    rating = parse_rating(value)
+    return _to_text(value) if rating is None else str(rating)
+
+
+# Query parameter -> record field, compared by exact (case-insensitive) value
+EQUALITY_FILTERS = {
+    'quotes': {'author': 'author', 'tag': 'tags'},
+    'books': {'rating': 'rating', 'availability': 'availability'},
+    'hockey_teams': {'name': 'name', 'year': 'year'},
+}
+
+# Record field -> equality key of its values (default: case-insensitive text)
+EQUALITY_KEYS: Dict[str, Callable[[Any], str]] = {'rating': _rating_key}
+
+# Query parameter -> (record field, lower bound?) compared numerically
+RANGE_FILTERS = {
+    'quotes': {},
+    'books': {'min_price': ('price', True), 'max_price': ('price', False)},
+    'hockey_teams': {'min_wins': ('wins', True), 'max_wins': ('wins', False),
+                     'min_losses': ('losses', True), 'max_losses': ('losses', False)},
+}
+
+# Sortable field -> key function
+SORT_KEYS: Dict[str, Dict[str, Callable[[Any], Any]]] = {
+    'quotes': {'author': _to_text, 'text': _to_text},
+    'books': {'title': _to_text, 'price': _to_number, 'rating': _to_rating},
+    'hockey_teams': {'name': _to_text, 'year': _to_number,
+                     'wins': _to_number, 'losses': _to_number},
+}
+
+PAGINATION_PARAMS = ('limit', 'offset', 'cursor', 'sort')
+
+# Parameters that only pick a page; the rest (filters and sort) select the results
+PAGE_PARAMS = ('limit', 'offset', 'cursor')
+
+
+def query_params(data_type: str) -> List[str]:
+    """Return every query parameter a data type accepts."""
+    return (list(PAGINATION_PARAMS) + list(EQUALITY_FILTERS.get(data_type, {}))
+            + list(RANGE_FILTERS.get(data_type, {})))
+
+
+def is_query(data_type: str, args: Mapping[str, str]) -> bool:
+    """
+    Whether a request asks for filtering, sorting or pagination.
+
+    Other parameters (e.g. a cache-buster ``?_=123``) are ignored, so they
+    leave the endpoint serving the full list.
+    """
+    return any(name in args for name in query_params(data_type))
+
+
+class QueryError(ValueError):
+    """Raised for invalid query parameters (reported as HTTP 400)."""
+
+
+class QueryPage:
+    """One page of query results."""
+
+    def __init__(self, records: List[Dict[str, Any]], total: int, limit: int,
+                 offset: int, next_cursor: Optional[str]):
+        self.records = records
+        self.total = total
+        self.limit = limit
+        self.offset = offset
+        self.next_cursor = next_cursor
+
+
+def query_hash(data_type: str, args: Mapping[str, str]) -> str:
+    """Hash the filter and sort parameters of a request, which a cursor is bound to."""
+    selection = sorted((name, args[name]) for name in query_params(data_type)
+                       if name not in PAGE_PARAMS and args.get(name))
+    raw = json.dumps(selection, separators=(',', ':')).encode('utf-8')
+    return hashlib.blake2b(raw, digest_size=8).hexdigest()
+
+
+def encode_cursor(offset: int, version: Any, selection: str = '') -> str:
+    """
+    Build an opaque cursor pointing at `offset` in data version `version`.
+
+    Args:
+        offset: Position of the next record
+        version: Data version
+        selection: `query_hash` of the request's filters and sort
+    """
+    raw = json.dumps({'o': offset, 'v': version, 'q': selection},
+                     separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str, version: Any, selection: str = '') -> int:
+    """
+    Decode a cursor, checking it belongs to the current data version and query.
+
+    Raises:
+        QueryError: If the cursor is malformed, the data has changed since, or
+            it was issued for other filters or another sort
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        offset = int(payload['o'])
+    except (ValueError, KeyError, TypeError, binascii.Error) as e:
+        raise QueryError('Invalid cursor') from e
+    if payload.get('v') != version or offset < 0:
+        raise QueryError('Cursor expired: the data has changed, restart from the first page')
+    if payload.get('q', '') != selection:
+        raise QueryError('Cursor does not match the filters and sort of this request')
+    return offset
+
+
+def _parse_int(args: Mapping[str, str], name: str, default: int) -> int:
+    value = args.get(name)
+    if value is None or value == '':
+        return default
+    try:
+        return int(value)
+    except ValueError as e:
+        raise QueryError(f'{name} must be an integer') from e
+
+
+class RecordIndex:
+    """Filter and sort indexes over the records of one data type."""
+
+    def __init__(self, data_type: str, records: List[Dict[str, Any]]):
+        """
+        Build the indexes.
+
+        Args:
+            data_type: ``quotes``, ``books`` or ``hockey_teams``
+            records: Records of that type, in stored order
+        """
+        self.data_type = data_type
+        self.records = records
+        self.equality_filters = EQUALITY_FILTERS.get(data_type, {})
+        self.range_filters = RANGE_FILTERS.get(data_type, {})
+        self.sort_keys = SORT_KEYS.get(data_type, {})
+
+        # field -> normalized value -> ascending record positions
+        self._postings: Dict[str, Dict[str, List[int]]] = {}
+        for field in self.equality_filters.values():
+            postings: Dict[str, List[int]] = {}
+            key = EQUALITY_KEYS.get(field, _to_text)
+            for position, record in enumerate(records):
+                values = record.get(field)
+                if not isinstance(values, list):
+                    values = [values]
+                for value in set(key(v) for v in values):
+                    postings.setdefault(value, []).append(position)
+            self._postings[field] = postings
+
+        # field -> record positions sorted by the field, and each position's rank
+        self._orders: Dict[str, List[int]] = {}
+        self._ranks: Dict[str, List[int]] = {}
+        self._sorted_values: Dict[str, List[Any]] = {}
+        numeric_fields = {field for field, _lower in self.range_filters.values()}
+        for field in set(self.sort_keys) | numeric_fields:
+            key = self.sort_keys.get(field, _to_number)
+            values = [key(record.get(field)) for record in records]
+            order = sorted(range(len(records)), key=values.__getitem__)
+            ranks = [0] * len(records)
+            for rank, position in enumerate(order):
+                ranks[position] = rank
+            self._orders[field] = order
+            self._ranks[field] = ranks
+            self._sorted_values[field] = [values[position] for position in order]
+
+    def supported_params(self) -> List[str]:
+        """Return every query parameter this data type accepts."""
+        return query_params(self.data_type)
+
+    def _matches(self, args: Mapping[str, str]) -> Optional[List[int]]:
+        """Return the ascending positions matching all filters, or None if unfiltered."""
+        matches: Optional[set] = None
+
+        for param, field in self.equality_filters.items():
+            if param in args:
+                key = EQUALITY_KEYS.get(field, _to_text)
+                positions = set(self._postings[field].get(key(args[param]), ()))
+                matches = positions if matches is None else matches & positions
+
+        for param, (field, lower) in self.range_filters.items():
+            if param not in args:
+                continue
+            try:
+                bound = float(args[param])
+            except ValueError as e:
+                raise QueryError(f'{param} must be a number') from e
+            values = self._sorted_values[field]
+            order = self._orders[field]
+            if lower:
+                positions = set(order[bisect.bisect_left(values, bound):])
+            else:
+                positions = set(order[:bisect.bisect_right(values, bound)])
+            matches = positions if matches is None else matches & positions
+
+        return None if matches is None else sorted(matches)
+
+    def query(self, args: Mapping[str, str], version: Any = None) -> QueryPage:
+        """
+        Filter, sort and paginate the records.
+
+        Every query is paginated: ``limit`` defaults to `DEFAULT_LIMIT`, also
+        when only filters or ``sort`` are given. A cursor is bound to the data
+        version and to the request's filters and sort. Unknown parameters are
+        ignored.
+
+        Args:
+            args: Query parameters (filters, ``sort``, ``limit``, ``offset``, ``cursor``)
+            version: Data version embedded in cursors; a cursor from another
+                version is rejected
+
+        Returns:
+            The requested page
+
+        Raises:
+            QueryError: If a parameter is invalid
+        """
+        limit = _parse_int(args, 'limit', DEFAULT_LIMIT)
+        if not 1 <= limit <= MAX_LIMIT:
+            raise QueryError(f'limit must be between 1 and {MAX_LIMIT}')
+        selection = query_hash(self.data_type, args)
+        if args.get('cursor'):
+            offset = decode_cursor(args['cursor'], version, selection)
+        else:
+            offset = _parse_int(args, 'offset', 0)
+        if offset < 0:
+            raise QueryError('offset must not be negative')
+
+        sort = args.get('sort') or None
+        descending = False
+        if sort is not None:
+            descending = sort.startswith('-')
+            sort = sort.lstrip('-')
+            if sort not in self.sort_keys:
+                raise QueryError(f"sort must be one of {', '.join(self.sort_keys)} "
+                                 "(prefix with - for descending)")
+
+        matches = self._matches(args)
+        if sort is None:
+            positions = range(len(self.records)) if matches is None else matches
+        elif matches is None:
+            positions = self._orders[sort]
+        else:
+            positions = sorted(matches, key=self._ranks[sort].__getitem__)
+
+        total = len(positions)
+        if descending:
+            start, stop = max(total - offset - limit, 0), max(total - offset, 0)
+            page = [self.records[p] for p in reversed(positions[start:stop])]
+        else:
+            page = [self.records[p] for p in positions[offset:offset + limit]]
+
+        next_offset = offset + len(page)
+        next_cursor = (encode_cursor(next_offset, version, selection)
+                       if next_offset < total else None)
+        return QueryPage(page, total, limit, offset, next_cursor)
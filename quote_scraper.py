@@ -1,59 +1,78 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator, Optional
+from bs4 import BeautifulSoup, SoupStrainer
+from http_cache import HTTPCache
+from models import Quote
 from web_scraper_base import WebScraper, logger
 
 
 class QuoteScraper(WebScraper):
     """Scraper for quotes.toscrape.com"""
 
-    def __init__(self):
-        """Initialize Quote scraper."""
-        super().__init__('http://quotes.toscrape.com', delay=1.0)
+    record_label = 'quotes'
+    record_model = Quote
+    parse_only = SoupStrainer(['div', 'li'], class_=['quote', 'next'])
 
-    def scrape_quotes(self, pages: int = 1) -> List[Dict[str, Any]]:
+    def __init__(self, delay: float = 1.0, max_concurrency: int = 4, burst: int = 1,
+                 http_cache: Optional[HTTPCache] = None, base_url: Optional[str] = None):
         """
-        Scrape quotes from the website.
+        Initialize Quote scraper.
 
         Args:
-            pages: Number of pages to scrape
-
-        Returns:
-            List of quote dictionaries
+            delay: Average delay between requests to the site in seconds
+            max_concurrency: Maximum number of pages fetched at once
+            burst: Number of requests allowed back to back
+            http_cache: Optional on-disk cache for conditional re-fetches
+            base_url: Root of a mirror of the site (e.g. a local fixture server)
+                to scrape instead of quotes.toscrape.com
         """
+        super().__init__(base_url or 'http://quotes.toscrape.com', delay=delay,
+                         max_concurrency=max_concurrency, burst=burst,
+                         http_cache=http_cache)
+
+    def page_urls(self, pages: int) -> List[str]:
+        """Build the listing page URLs (`/page/{n}/` after the first)."""
+        return [self.base_url if page == 1 else f"{self.base_url}/page/{page}/"
+                for page in range(1, pages + 1)]
+
+    def extract_records(self, soup: BeautifulSoup) -> List[Dict[str, Any]]:
+        """Extract quote dictionaries from one parsed page."""
         quotes = []
 
-        for page in range(1, pages + 1):
-            if page == 1:
-                url = self.base_url
-            else:
-                url = f"{self.base_url}/page/{page}/"
+        # Find all quote containers
+        quote_divs = soup.find_all('div', class_='quote')
 
-            logger.info(f"Scraping {url}")
-            response = self.fetch_page(url)
+        for quote_div in quote_divs:
+            try:
+                text = quote_div.find('span', class_='text').get_text()[1:-1]  # Remove quotes
+                author = quote_div.find('small', class_='author').get_text()[3:]  # Remove "by "
+                tags = [tag.get_text() for tag in quote_div.find_all('a', class_='tag')]
 
-            if not response:
-                continue
+                quotes.append(Quote(text, author, tags, self.base_url).to_dict())
+            except AttributeError as e:
+                logger.warning(f"Error parsing quote: {e}")
 
-            soup = self.parse_html(response.content)
+        return quotes
+
+    def scrape_quotes(self, pages: int = 1) -> List[Dict[str, Any]]:
+        """
+        Scrape quotes from the website.
 
-            # Find all quote containers
-            quote_divs = soup.find_all('div', class_='quote')
+        Args:
+            pages: Number of pages to scrape
 
-            for quote_div in quote_divs:
-                try:
-                    text = quote_div.find('span', class_='text').get_text()[1:-1]  # Remove quotes
-                    author = quote_div.find('small', class_='author').get_text()[3:]  # Remove "by "
-                    tags = [tag.get_text() for tag in quote_div.find_all('a', class_='tag')]
+        Returns:
+            List of quote dictionaries
+        """
+        return self.scrape(pages)
 
-                    quotes.append({
-                        'text': text,
-                        'author': author,
-                        'tags': tags,
-                        'source': self.base_url
-                    })
-                except AttributeError as e:
-                    logger.warning(f"Error parsing quote: {e}")
+    def iter_quotes(self, max_pages: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Yield quotes one at a time, following the site's "Next" links.
 
-            self.respect_rate_limit()
+        Args:
+            max_pages: Stop after this many pages (None scrapes to the end)
 
-        logger.info(f"Successfully scraped {len(quotes)} quotes")
-        return quotes
+        Yields:
+            Quote dictionaries
+        """
+        return self.iter_records(max_pages)
@@ -0,0 +1,91 @@
+"""
+Token-bucket rate limiting shared by all scrapers of a process.
+"""
+import asyncio
+import threading
+import time
+from typing import Dict
+
+
+class TokenBucket:
+    """Thread-safe token bucket allowing `rate` requests/sec with bursts of `burst`."""
+
+    def __init__(self, rate: float, burst: int = 1):
+        """
+        Initialize the bucket.
+
+        Args:
+            rate: Tokens added per second (<= 0 disables limiting)
+            burst: Maximum number of tokens that can accumulate
+        """
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        """Take one token, returning how long the caller must wait for it."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def acquire(self) -> float:
+        """
+        Block until a token is available.
+
+        Returns:
+            Seconds spent waiting
+        """
+        if self.rate <= 0:
+            return 0.0
+        wait = self._reserve()
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self) -> float:
+        """
+        Wait for a token without blocking the event loop.
+
+        Returns:
+            Seconds spent waiting
+        """
+        if self.rate <= 0:
+            return 0.0
+        wait = self._reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+
+_host_buckets: Dict[str, TokenBucket] = {}
+_host_buckets_lock = threading.Lock()
+
+
+def get_host_bucket(host: str, rate: float, burst: int = 1) -> TokenBucket:
+    """
+    Return the process-wide bucket for `host`, creating it on first use.
+
+    Scrapers for the same host share one bucket, so their combined request
+    rate stays within the budget of whichever scraper registered it first.
+
+    Args:
+        host: Network location, e.g. ``quotes.toscrape.com``
+        rate: Requests per second for a newly created bucket
+        burst: Burst size for a newly created bucket
+
+    Returns:
+        TokenBucket for the host
+    """
+    with _host_buckets_lock:
+        bucket = _host_buckets.get(host)
+        if bucket is None:
+            bucket = TokenBucket(rate, burst)
+            _host_buckets[host] = bucket
+        return bucket
@@ -0,0 +1,151 @@
+"""
+Registry of the sites the manager and the API scrape.
+
+Each site is registered under its data type (the key its records are stored
+under) either as a `WebScraper` subclass, like the three built-in scrapers,
+or as a declarative `selector_scraper.SiteConfig` run by the generic
+`SelectorScraper`. Sites can also be declared in a JSON file mapping data
+types to `SiteConfig` arguments, so adding a site needs no code:
+
+    {
+      "love_quotes": {
+        "base_url": "http://quotes.toscrape.com/tag/love",
+        "record_selector": "div.quote",
+        "fields": {"text": {"selector": "span.text", "transform": "unquote"},
+                   "author": "small.author",
+                   "tags": {"selector": "a.tag", "many": true}},
+        "delay": 2
+      }
+    }
+"""
+import json
+from typing import Any, Dict, List, Optional, Type, Union
+
+from book_scraper import BookScraper
+from quote_scraper import QuoteScraper
+from scrapethissite_scraper import ScrapesiteScraper
+from selector_scraper import SelectorScraper, SiteConfig, describe_site
+from web_scraper_base import WebScraper
+
+Site = Union[Type[WebScraper], SiteConfig]
+
+
+class ScraperRegistry:
+    """Sites by data type, in registration order."""
+
+    def __init__(self):
+        self._sites: Dict[str, Site] = {}
+
+    def register(self, key: str, site: Site):
+        """
+        Register a site, replacing any site of the same data type.
+
+        Args:
+            key: Data type the site's records are stored under
+            site: `WebScraper` subclass, or declarative `SiteConfig`
+
+        Raises:
+            TypeError: If `site` is neither
+        """
+        if not isinstance(site, SiteConfig) and not (
+                isinstance(site, type) and issubclass(site, WebScraper)):
+            raise TypeError(f"Site {key!r} must be a WebScraper subclass or a SiteConfig")
+        self._sites[key] = site
+
+    def unregister(self, key: str):
+        """Remove a site (no error if it is not registered)."""
+        self._sites.pop(key, None)
+
+    def keys(self) -> List[str]:
+        """Return the registered data types, in registration order."""
+        return list(self._sites)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._sites
+
+    def __len__(self) -> int:
+        return len(self._sites)
+
+    def create(self, key: str, **kwargs: Any) -> WebScraper:
+        """
+        Build the scraper of a site.
+
+        Args:
+            key: Data type of the site
+            **kwargs: Scraper arguments (e.g. http_cache, base_url, max_concurrency)
+
+        Returns:
+            New scraper instance
+
+        Raises:
+            KeyError: If no site is registered under `key`
+        """
+        site = self._sites[key]
+        if isinstance(site, SiteConfig):
+            return SelectorScraper(site, **kwargs)
+        return site(**kwargs)
+
+    def label(self, key: str) -> str:
+        """Noun for the records of a site, e.g. "quotes"."""
+        site = self._sites[key]
+        return site.label if isinstance(site, SiteConfig) else site.record_label
+
+    def describe(self) -> List[Dict[str, Any]]:
+        """Summarize every site for listings."""
+        sites = []
+        for key, site in self._sites.items():
+            if isinstance(site, SiteConfig):
+                sites.append({'key': key, 'scraper': SelectorScraper.__name__,
+                              **describe_site(site)})
+            else:
+                sites.append({'key': key, 'scraper': site.__name__})
+        return sites
+
+    def load(self, path: str) -> List[str]:
+        """
+        Register the sites declared in a JSON file.
+
+        Args:
+            path: File mapping data types to `SiteConfig` arguments
+
+        Returns:
+            The data types registered
+
+        Raises:
+            OSError: If the file cannot be read
+            ValueError: If it is not valid JSON or a site config is invalid
+        """
+        with open(path, 'r', encoding='utf-8') as f:
+            declared = json.load(f)
+        if not isinstance(declared, dict):
+            raise ValueError(f"{path} must map data types to site configs")
+
+        # Validate every site before registering any
+        sites = {}
+        for key, config in declared.items():
+            try:
+                sites[key] = SiteConfig.from_dict({'label': key, **config})
+            except (TypeError, ValueError) as e:
+                raise ValueError(f"Site {key!r} in {path}: {e}") from e
+        for key, site in sites.items():
+            self.register(key, site)
+        return list(sites)
+
+
+def default_registry(sites_file: Optional[str] = None) -> ScraperRegistry:
+    """
+    Build a registry of the built-in scrapers.
+
+    Args:
+        sites_file: Optional JSON file of additional declared sites (see `ScraperRegistry.load`)
+
+    Returns:
+        The registry
+    """
+    registry = ScraperRegistry()
+    registry.register('quotes', QuoteScraper)
+    registry.register('books', BookScraper)
+    registry.register('hockey_teams', ScrapesiteScraper)
+    if sites_file:
+        registry.load(sites_file)
+    return registry
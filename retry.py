@@ -0,0 +1,216 @@
+"""
+Retry policy and per-host circuit breakers used by `WebScraper.fetch_page`.
+
+A failed fetch (connection error, timeout, 429 or 5xx) is retried with
+exponential backoff and full jitter, waiting for ``Retry-After`` when the
+server sends one. Every host has a circuit breaker shared by all scrapers of
+the process: after `failure_threshold` consecutive failures it opens and
+fetches fail fast for `reset_timeout` seconds, then a single trial request
+decides whether it closes again. Each breaker also counts requests, retries
+and failures for the host, reported by `breaker_stats()` and as metrics.
+"""
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Optional
+
+from metrics import (CIRCUIT_OPEN, CIRCUIT_REJECTED_TOTAL, FETCH_FAILURES_TOTAL,
+                     FETCH_RETRIES_TOTAL)
+
+# Statuses worth retrying: rate limited, or a transient server-side failure
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+# Statuses whose Retry-After header is honored
+RETRY_AFTER_STATUSES = frozenset({429, 503})
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Parse a ``Retry-After`` header given in seconds or as an HTTP date.
+
+    Args:
+        value: Header value
+
+    Returns:
+        Seconds to wait (0 for a date in the past), or None if absent or invalid
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+class RetryPolicy:
+    """How often and how long to wait before retrying a failed fetch."""
+
+    def __init__(self, max_retries: int = 3, backoff_base: float = 0.5,
+                 backoff_max: float = 30.0, max_retry_after: float = 60.0):
+        """
+        Initialize the policy.
+
+        Args:
+            max_retries: Retries after the first attempt (0 disables retrying)
+            backoff_base: Backoff cap of the first retry in seconds, doubled per retry
+            backoff_max: Upper bound of the backoff in seconds
+            max_retry_after: Longest ``Retry-After`` honored; a longer one gives up
+        """
+        self.max_retries = max(0, max_retries)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.max_retry_after = max_retry_after
+
+    def backoff(self, retry: int) -> float:
+        """Return a random ("full jitter") wait in seconds before retry number `retry` (from 0)."""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** retry))
+
+    def delay(self, retry: int, retry_after: Optional[float] = None) -> Optional[float]:
+        """
+        Return how long to wait before retry number `retry` (from 0).
+
+        Args:
+            retry: Number of retries already made
+            retry_after: Wait requested by the server, if any
+
+        Returns:
+            Seconds to wait, or None if no retry should be made
+        """
+        if retry >= self.max_retries:
+            return None
+        if retry_after is not None:
+            return retry_after if retry_after <= self.max_retry_after else None
+        return self.backoff(retry)
+
+
+class CircuitBreaker:
+    """Thread-safe circuit breaker and fetch counters of one host."""
+
+    def __init__(self, host: str = '', failure_threshold: int = 5, reset_timeout: float = 30.0):
+        """
+        Initialize the breaker.
+
+        Args:
+            host: Host the breaker guards (metrics label)
+            failure_threshold: Consecutive failures that open the breaker
+            reset_timeout: Seconds the breaker stays open before a trial request
+        """
+        self.host = host
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+        self.counters = {'requests': 0, 'failures': 0, 'retries': 0, 'retry_after_waits': 0,
+                         'rejected': 0, 'opened': 0}
+
+    def allow(self) -> bool:
+        """
+        Check whether a request may be sent, counting it if so.
+
+        Returns:
+            False while the breaker is open (or a half-open trial is in flight)
+        """
+        with self._lock:
+            if self.state == OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self.state = HALF_OPEN
+                self._trial_in_flight = False
+            if self.state == OPEN or (self.state == HALF_OPEN and self._trial_in_flight):
+                self.counters['rejected'] += 1
+                CIRCUIT_REJECTED_TOTAL.inc(self.host)
+                return False
+            if self.state == HALF_OPEN:
+                self._trial_in_flight = True
+            self.counters['requests'] += 1
+            return True
+
+    def record_success(self):
+        """Close the breaker after a successful request."""
+        with self._lock:
+            was_open = self.state != CLOSED
+            self._failures = 0
+            self.state = CLOSED
+            self._trial_in_flight = False
+        if was_open:
+            CIRCUIT_OPEN.set(0, self.host)
+
+    def record_failure(self) -> bool:
+        """
+        Count a failed request, opening the breaker at the threshold.
+
+        Returns:
+            True if this failure opened the breaker
+        """
+        FETCH_FAILURES_TOTAL.inc(self.host)
+        with self._lock:
+            self.counters['failures'] += 1
+            self._failures += 1
+            self._trial_in_flight = False
+            if not (self.state == HALF_OPEN or (
+                    self.state == CLOSED and self._failures >= self.failure_threshold)):
+                return False
+            self.state = OPEN
+            self._opened_at = time.monotonic()
+            self.counters['opened'] += 1
+        CIRCUIT_OPEN.set(1, self.host)
+        return True
+
+    def record_retry(self, retry_after: bool = False):
+        """Count a retry, and whether it waited for the server's ``Retry-After``."""
+        FETCH_RETRIES_TOTAL.inc(self.host)
+        with self._lock:
+            self.counters['retries'] += 1
+            if retry_after:
+                self.counters['retry_after_waits'] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the breaker state, consecutive failures and fetch counters."""
+        with self._lock:
+            return {'state': self.state, 'consecutive_failures': self._failures,
+                    **self.counters}
+
+
+_host_breakers: Dict[str, CircuitBreaker] = {}
+_host_breakers_lock = threading.Lock()
+
+
+def get_host_breaker(host: str, failure_threshold: int = 5,
+                     reset_timeout: float = 30.0) -> CircuitBreaker:
+    """
+    Return the process-wide circuit breaker for `host`, creating it on first use.
+
+    Args:
+        host: Network location, e.g. ``quotes.toscrape.com``
+        failure_threshold: Consecutive failures opening a newly created breaker
+        reset_timeout: Open period in seconds of a newly created breaker
+
+    Returns:
+        CircuitBreaker for the host
+    """
+    with _host_breakers_lock:
+        breaker = _host_breakers.get(host)
+        if breaker is None:
+            breaker = CircuitBreaker(host, failure_threshold, reset_timeout)
+            _host_breakers[host] = breaker
+        return breaker
+
+
+def breaker_stats() -> Dict[str, Dict[str, Any]]:
+    """Return the state and counters of every host's breaker."""
+    with _host_breakers_lock:
+        breakers = dict(_host_breakers)
+    return {host: breaker.stats() for host, breaker in sorted(breakers.items())}
@@ -0,0 +1,260 @@
+"""
+Opt-in profiling of scrape runs, with reports saved to disk.
+
+`SamplingProfiler` snapshots the stack of every thread a few hundred times a
+second and attributes each sample to the scraper whose method is on the
+stack, which also covers the fetcher threads a scraper starts. It is used
+instead of `cProfile` because the scrapers run concurrently on threads, and
+`cProfile` profiles one thread (3.11) or allows one active profiler per
+interpreter (3.12+). Samples are grouped by stage (fetch, rate limit, cache,
+parse, extract, waiting, other) and by function.
+
+Times are estimates of wall-clock seconds per thread: concurrent threads are
+counted separately, so stage totals can exceed the run's duration. Time in C
+functions (sockets, sleeps, lxml) is counted on the Python function that
+called them. HTML parsed in parser processes (`parse_workers`) is not sampled.
+"""
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+# Seconds between stack samples
+DEFAULT_INTERVAL = 0.005
+
+# Functions listed per scraper and per report
+TOP_FUNCTIONS = 25
+
+# Innermost matching frame decides a sample's stage; files first, then functions
+# ('waiting': blocked on other threads, e.g. a scraper waiting for its fetcher threads)
+STAGE_FILES = {
+    'rate_limit.py': 'rate_limit',
+    'http_cache.py': 'cache',
+    'threading.py': 'waiting',
+}
+STAGE_FUNCTIONS = {
+    'extract_records': 'extract',
+    'parse_html': 'parse',
+    'respect_rate_limit': 'rate_limit',
+    'fetch_page': 'fetch',
+    '_fetch_once': 'fetch',
+    'fetch': 'fetch',
+}
+
+# Scraper methods whose `self` identifies the scraper a thread works for
+ENTRY_POINTS = frozenset({'scrape', 'iter_records', 'scrape_async', '_fetch_rate_limited'})
+
+# Function key: (function name, file name, first line)
+FunctionKey = Tuple[str, str, int]
+
+
+class SamplingProfiler:
+    """Samples the threads working for a set of scrapers."""
+
+    def __init__(self, targets: Dict[str, Any], interval: float = DEFAULT_INTERVAL):
+        """
+        Initialize the profiler.
+
+        Args:
+            targets: Scraper instances to profile, by data type
+            interval: Seconds between samples
+        """
+        self.targets = {id(scraper): key for key, scraper in targets.items()}
+        self.interval = interval
+        self.samples = 0
+        self._stages: Dict[str, Counter] = {key: Counter() for key in targets}
+        self._self_time: Dict[str, Counter] = {key: Counter() for key in targets}
+        self._total_time: Dict[str, Counter] = {key: Counter() for key in targets}
+        self._started = 0.0
+        self._stopped = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        """Start sampling on a background thread."""
+        self._started = time.perf_counter()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='profiler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop sampling and wait for the sampler thread."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self._stopped = time.perf_counter()
+
+    def __enter__(self) -> 'SamplingProfiler':
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def _run(self):
+        own = threading.get_ident()
+        last = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            now = time.perf_counter()
+            # Weight samples by the time since the last tick, not the nominal interval
+            elapsed, last = now - last, now
+            frames = sys._current_frames()  # pylint: disable=protected-access
+            for thread_id, frame in frames.items():
+                if thread_id != own:
+                    self._sample(frame, elapsed)
+
+    def _sample(self, frame, elapsed: float):
+        """Attribute one thread's stack to its scraper, stage and functions."""
+        stack: List[FunctionKey] = []
+        target = None
+        stage = None
+        while frame is not None:
+            code = frame.f_code
+            filename = os.path.basename(code.co_filename)
+            stack.append((code.co_name, filename, code.co_firstlineno))
+            if stage is None:
+                stage = STAGE_FILES.get(filename) or STAGE_FUNCTIONS.get(code.co_name)
+            if target is None and code.co_name in ENTRY_POINTS:
+                target = self.targets.get(id(frame.f_locals.get('self')))
+            frame = frame.f_back
+        if target is None:
+            return  # Thread not working for a profiled scraper
+
+        self.samples += 1
+        self._stages[target][stage or 'other'] += elapsed
+        self._self_time[target][stack[0]] += elapsed
+        for key in set(stack):
+            self._total_time[target][key] += elapsed
+
+    def report(self) -> Dict[str, Any]:
+        """
+        Summarize the samples.
+
+        Returns:
+            Duration, sample count and, overall and per scraper, the seconds
+            per stage and the top functions by self time
+        """
+        stages: Counter = Counter()
+        self_time: Counter = Counter()
+        total_time: Counter = Counter()
+        scrapers = {}
+        for key in self._stages:
+            stages.update(self._stages[key])
+            self_time.update(self._self_time[key])
+            total_time.update(self._total_time[key])
+            scrapers[key] = {
+                'seconds': round(sum(self._stages[key].values()), 4),
+                'stages': _rounded(self._stages[key]),
+                'top_functions': _top_functions(self._self_time[key], self._total_time[key])
+            }
+        return {
+            'duration_seconds': round((self._stopped or time.perf_counter()) - self._started, 4),
+            'interval': self.interval,
+            'samples': self.samples,
+            'stages': _rounded(stages),
+            'top_functions': _top_functions(self_time, total_time),
+            'scrapers': scrapers
+        }
+
+
+def _rounded(seconds: Counter) -> Dict[str, float]:
+    """Seconds per stage, largest first."""
+    return {stage: round(value, 4) for stage, value in seconds.most_common()}
+
+
+def _top_functions(self_time: Counter, total_time: Counter) -> List[Dict[str, Any]]:
+    """The functions with the most self time, with their cumulative time."""
+    return [{
+        'function': name,
+        'location': f"{filename}:{line}",
+        'self_seconds': round(seconds, 4),
+        'cumulative_seconds': round(total_time[(name, filename, line)], 4)
+    } for (name, filename, line), seconds in self_time.most_common(TOP_FUNCTIONS)]
+
+
+class ProfileStore:
+    """Stores profile reports as one JSON file per run, keeping the newest ones."""
+
+    def __init__(self, directory: str = '.profiles', keep: int = 50):
+        """
+        Initialize the store.
+
+        Args:
+            directory: Directory holding the report files
+            keep: Number of reports kept; older ones are deleted on save
+        """
+        self.directory = directory
+        self.keep = keep
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, profile_id: str) -> str:
+        return os.path.join(self.directory, f"{profile_id}.json")
+
+    def save(self, report: Dict[str, Any], **info: Any) -> Dict[str, Any]:
+        """
+        Store a report.
+
+        Args:
+            report: Report from `SamplingProfiler.report`
+            **info: Run details stored with it (e.g. kind, params)
+
+        Returns:
+            The stored report, with its ``id`` and ``created_at``
+        """
+        # Sortable IDs: creation time first, then a random suffix
+        profile_id = f"{datetime.now().strftime('%Y%m%d%H%M%S')}{uuid.uuid4().hex[:8]}"
+        stored = {'id': profile_id, 'created_at': datetime.now().isoformat(), **info, **report}
+        path = self._path(profile_id)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(stored, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+
+        for old_id in self.ids()[self.keep:]:
+            try:
+                os.remove(self._path(old_id))
+            except OSError:
+                pass
+        return stored
+
+    def ids(self) -> List[str]:
+        """Return the stored report IDs, newest first."""
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return []
+        return sorted((name[:-5] for name in names if name.endswith('.json')), reverse=True)
+
+    def load(self, profile_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Read a report.
+
+        Args:
+            profile_id: Report ID
+
+        Returns:
+            The report, or None if it is unknown
+        """
+        # IDs are alphanumeric; reject anything that could escape the directory
+        if not profile_id.isalnum():
+            return None
+        try:
+            with open(self._path(profile_id), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def summaries(self) -> List[Dict[str, Any]]:
+        """Return the ID, time, run details and stage totals of every report, newest first."""
+        summaries = []
+        for profile_id in self.ids():
+            report = self.load(profile_id)
+            if report is not None:
+                summaries.append({key: value for key, value in report.items()
+                                  if key not in ('top_functions', 'scrapers')})
+        return summaries
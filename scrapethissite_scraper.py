@@ -1,13 +1,61 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator, Optional
+from bs4 import BeautifulSoup, SoupStrainer
+from http_cache import HTTPCache
+from models import HockeyTeam
 from web_scraper_base import WebScraper, logger
 
 
 class ScrapesiteScraper(WebScraper):
     """Scraper for scrapethissite.com"""
 
-    def __init__(self):
-        """Initialize Scrapesite scraper."""
-        super().__init__('https://scrapethissite.com', delay=1.0)
+    record_label = 'team records'
+    record_model = HockeyTeam
+    next_page_selector = 'ul.pagination a[aria-label="Next"]'
+    parse_only = SoupStrainer(['tr', 'ul'], class_=['team', 'pagination'])
+
+    def __init__(self, delay: float = 1.0, max_concurrency: int = 4, burst: int = 1,
+                 http_cache: Optional[HTTPCache] = None, base_url: Optional[str] = None):
+        """
+        Initialize Scrapesite scraper.
+
+        Args:
+            delay: Average delay between requests to the site in seconds
+            max_concurrency: Maximum number of pages fetched at once
+            burst: Number of requests allowed back to back
+            http_cache: Optional on-disk cache for conditional re-fetches
+            base_url: Root of a mirror of the site (e.g. a local fixture server)
+                to scrape instead of scrapethissite.com
+        """
+        super().__init__(base_url or 'https://scrapethissite.com', delay=delay,
+                         max_concurrency=max_concurrency, burst=burst,
+                         http_cache=http_cache)
+
+    def page_urls(self, pages: int) -> List[str]:
+        """Build the listing page URLs (`/pages/forms/?page={n}`, zero-based)."""
+        return [f"{self.base_url}/pages/forms/?page={page}" for page in range(0, pages)]
+
+    def extract_records(self, soup: BeautifulSoup) -> List[Dict[str, Any]]:
+        """Extract hockey team dictionaries from one parsed page."""
+        teams = []
+
+        # Find all team rows
+        team_rows = soup.find_all('tr', class_='team')
+
+        for row in team_rows:
+            try:
+                cells = row.find_all('td')
+                if len(cells) >= 4:
+                    teams.append(HockeyTeam(
+                        name=cells[0].get_text().strip(),
+                        year=cells[1].get_text().strip(),
+                        wins=cells[2].get_text().strip(),
+                        losses=cells[3].get_text().strip(),
+                        source=self.base_url
+                    ).to_dict())
+            except (IndexError, AttributeError) as e:
+                logger.warning(f"Error parsing team data: {e}")
+
+        return teams
 
     def scrape_hockey_stats(self, pages: int = 1) -> List[Dict[str, Any]]:
         """
@@ -19,36 +67,16 @@ class ScrapesiteScraper(WebScraper):
         Returns:
             List of hockey team dictionaries
         """
-        teams = []
-
-        for page in range(0, pages):
-            url = f"{self.base_url}/pages/forms/?page={page}"
-            logger.info(f"Scraping {url}")
-            response = self.fetch_page(url)
-
-            if not response:
-                continue
-
-            soup = self.parse_html(response.content)
+        return self.scrape(pages)
 
-            # Find all team rows
-            team_rows = soup.find_all('tr', class_='team')
-
-            for row in team_rows:
-                try:
-                    cells = row.find_all('td')
-                    if len(cells) >= 4:
-                        teams.append({
-                            'name': cells[0].get_text().strip(),
-                            'year': cells[1].get_text().strip(),
-                            'wins': cells[2].get_text().strip(),
-                            'losses': cells[3].get_text().strip(),
-                            'source': self.base_url
-                        })
-                except (IndexError, AttributeError) as e:
-                    logger.warning(f"Error parsing team data: {e}")
+    def iter_hockey_stats(self, max_pages: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Yield hockey team records one at a time, following the pagination links.
 
-            self.respect_rate_limit()
+        Args:
+            max_pages: Stop after this many pages (None scrapes to the end)
 
-        logger.info(f"Successfully scraped {len(teams)} team records")
-        return teams
+        Yields:
+            Hockey team dictionaries
+        """
+        return self.iter_records(max_pages)
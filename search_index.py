@@ -0,0 +1,191 @@
+"""
+Inverted full-text index over quotes (text, author, tags) and book titles.
+
+The index keeps one segment per data type. A segment is rebuilt only when
+the records of its type change, so re-indexing after a scrape touches just
+the sources that were scraped. Queries intersect posting lists, rank by
+field-weighted TF-IDF and complete the last term as a prefix, so a lookup
+costs roughly the size of the matching postings, not the corpus.
+"""
+import bisect
+import hashlib
+import heapq
+import math
+import re
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+# Data type -> indexed fields and their weights
+SEARCH_FIELDS = {
+    'quotes': {'text': 1.0, 'author': 3.0, 'tags': 2.0},
+    'books': {'title': 2.0},
+}
+
+
+def tokenize(text: Any) -> List[str]:
+    """Split text (or a list of strings) into lower-case word tokens."""
+    if isinstance(text, list):
+        text = ' '.join(str(item) for item in text)
+    return TOKEN_RE.findall(str(text or '').casefold())
+
+
+def fingerprint(records: List[Dict[str, Any]], fields: Dict[str, float]) -> str:
+    """Hash the indexed fields of `records`, to detect whether a segment is stale."""
+    digest = hashlib.blake2b(digest_size=16)
+    for record in records:
+        for field in fields:
+            digest.update(repr(record.get(field)).encode('utf-8'))
+            digest.update(b'\x1f')
+        digest.update(b'\x1e')
+    return digest.hexdigest()
+
+
+class Segment:
+    """Postings and sorted vocabulary for the records of one data type."""
+
+    def __init__(self, records: List[Dict[str, Any]], fields: Dict[str, float]):
+        """
+        Index `records`.
+
+        Args:
+            records: Records to index
+            fields: Indexed fields and their weights
+        """
+        self.records = records
+        self.fingerprint = fingerprint(records, fields)
+        # token -> {record position: weighted term frequency}
+        self.postings: Dict[str, Dict[int, float]] = {}
+        for position, record in enumerate(records):
+            for field, weight in fields.items():
+                for token in tokenize(record.get(field)):
+                    docs = self.postings.setdefault(token, {})
+                    docs[position] = docs.get(position, 0.0) + weight
+        self.vocabulary = sorted(self.postings)
+
+    def expand(self, term: str, prefix: bool) -> List[str]:
+        """Return the indexed tokens matching `term` (exactly, or as a prefix)."""
+        if not prefix:
+            return [term] if term in self.postings else []
+        start = bisect.bisect_left(self.vocabulary, term)
+        stop = bisect.bisect_left(self.vocabulary, term + '\U0010ffff')
+        return self.vocabulary[start:stop]
+
+    def search(self, terms: List[Tuple[str, bool]]) -> Dict[int, float]:
+        """
+        Score the records containing every term.
+
+        Args:
+            terms: (term, prefix?) pairs
+
+        Returns:
+            Record position -> score
+        """
+        total = len(self.records) or 1
+        scores: Optional[Dict[int, float]] = None
+
+        for term, prefix in terms:
+            term_scores: Dict[int, float] = {}
+            for token in self.expand(term, prefix):
+                docs = self.postings[token]
+                idf = math.log(1 + total / len(docs))
+                for position, tf in docs.items():
+                    term_scores[position] = term_scores.get(position, 0.0) + tf * idf
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = {position: score + term_scores[position]
+                          for position, score in scores.items() if position in term_scores}
+            if not scores:
+                return {}
+
+        return scores or {}
+
+
+class SearchIndex:
+    """Per-worker search index with one segment per data type."""
+
+    def __init__(self):
+        """Initialize an empty index."""
+        self._segments: Dict[str, Segment] = {}
+        self._lock = threading.Lock()
+
+    def sync(self, data: Dict[str, Any]) -> 'SearchIndex':
+        """
+        Bring the index up to date with a data document.
+
+        Only the types whose indexed content changed are re-indexed.
+
+        Args:
+            data: Scraped data document (``{'timestamp': ..., 'data': {...}}``)
+
+        Returns:
+            The index itself
+        """
+        records_by_type = data.get('data', {})
+        for data_type in SEARCH_FIELDS:
+            self.update(data_type, list(records_by_type.get(data_type, [])))
+        return self
+
+    def update(self, data_type: str, records: List[Dict[str, Any]]) -> bool:
+        """
+        Replace the segment of one data type if its records changed.
+
+        Args:
+            data_type: ``quotes`` or ``books``
+            records: All current records of that type
+
+        Returns:
+            True if the segment was rebuilt
+        """
+        fields = SEARCH_FIELDS.get(data_type)
+        if fields is None:
+            return False
+        current = self._segments.get(data_type)
+        if current is not None and current.fingerprint == fingerprint(records, fields):
+            return False
+
+        segment = Segment(records, fields)
+        with self._lock:
+            self._segments[data_type] = segment
+        return True
+
+    def search(self, query: str, types: Optional[List[str]] = None,
+               limit: int = 20) -> List[Dict[str, Any]]:
+        """
+        Find the best matching records.
+
+        Every term must match. The last term also matches as a prefix (so
+        partial words work while typing); other terms do when they end in ``*``.
+
+        Args:
+            query: Search text
+            types: Data types to search (defaults to all)
+            limit: Maximum number of results
+
+        Returns:
+            Results ordered by descending score, each with type, score and record
+        """
+        words = [word for word in query.split() if word.strip('*')]
+        terms = []
+        for i, word in enumerate(words):
+            prefix = word.endswith('*') or i == len(words) - 1
+            for token in tokenize(word.rstrip('*')):
+                terms.append((token, prefix))
+        if not terms:
+            return []
+
+        with self._lock:
+            segments = dict(self._segments)
+
+        candidates = []
+        for data_type, segment in segments.items():
+            if types and data_type not in types:
+                continue
+            for position, score in segment.search(terms).items():
+                candidates.append((score, data_type, position, segment))
+
+        best = heapq.nlargest(limit, candidates, key=lambda item: (item[0], -item[2]))
+        return [{'type': data_type, 'score': round(score, 4), 'record': segment.records[position]}
+                for score, data_type, position, segment in best]
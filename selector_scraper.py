@@ -0,0 +1,322 @@
+"""
+Generic scraper for sites declared as configuration.
+
+A `SiteConfig` describes a site the way a `WebScraper` subclass would code it:
+base URL, pagination rule, the CSS selector of a record, one `FieldSpec` per
+record field and the site's rate limit. `SelectorScraper` runs any such
+config. Its CSS selectors are compiled once when the config is built and
+reused on every page (and in parser processes, which receive the config),
+instead of being parsed again on every `find`/`select` call. Simple
+selectors (``tag``, ``.class``, ``tag.class1.class2``) are matched by a plain
+walk over the descendants, which is faster than the CSS engine.
+"""
+import re
+from typing import Any, Callable, Dict, List, Optional, Union
+from urllib.parse import urljoin
+
+import soupsieve
+from bs4 import BeautifulSoup, SoupStrainer, Tag
+from http_cache import HTTPCache
+from models import MODELS, RATING_WORDS, intern, parse_int, parse_price, parse_rating
+from web_scraper_base import WebScraper, logger
+
+# Selectors matched without the CSS engine: an optional tag name and classes
+SIMPLE_SELECTOR_RE = re.compile(r'^(?P<name>[A-Za-z][\w-]*)?(?P<classes>(?:\.[\w-]+)*)$')
+
+# Characters stripped by the 'unquote' transform
+QUOTE_CHARS = '"\'“”‘’«»'
+
+
+def _rating(value: Any) -> Optional[int]:
+    """Parse a star rating, also from a class list such as "star-rating Three"."""
+    if isinstance(value, str):
+        for word in value.split():
+            if word in RATING_WORDS:
+                return RATING_WORDS[word]
+    return parse_rating(value)
+
+
+def _unquote(value: Any) -> Any:
+    """Strip surrounding quotation marks."""
+    return value.strip(QUOTE_CHARS) if isinstance(value, str) else value
+
+
+def _collapse(value: Any) -> Any:
+    """Collapse runs of whitespace to single spaces."""
+    return ' '.join(value.split()) if isinstance(value, str) else value
+
+
+# Transforms a field can name in its config; callables are also accepted, but
+# must be module-level functions so the config can be sent to parser processes
+TRANSFORMS: Dict[str, Callable[[Any], Any]] = {
+    'int': parse_int,
+    'price': parse_price,
+    'rating': _rating,
+    'unquote': _unquote,
+    'collapse': _collapse,
+}
+
+
+class CompiledSelector:
+    """A CSS selector compiled once, matched against the descendants of a tag."""
+
+    def __init__(self, pattern: str):
+        """
+        Compile the selector.
+
+        Args:
+            pattern: CSS selector
+
+        Raises:
+            ValueError: If the selector is invalid
+        """
+        self.pattern = pattern
+        self._compiled = None
+        match = SIMPLE_SELECTOR_RE.match(pattern.strip())
+        self.simple = bool(match and (match.group('name') or match.group('classes')))
+        if self.simple:
+            self._name = (match.group('name') or '').lower() or None
+            self._classes = frozenset(match.group('classes').split('.')[1:])
+        else:
+            try:
+                self._compiled = soupsieve.compile(pattern)
+            except soupsieve.SelectorSyntaxError as e:
+                raise ValueError(f"Invalid CSS selector {pattern!r}: {e}") from e
+
+    def _matches(self, element) -> bool:
+        return (isinstance(element, Tag)
+                and (self._name is None or element.name == self._name)
+                and self._classes.issubset(element.get('class', ())))
+
+    def select(self, tag) -> List[Any]:
+        """Return every matching descendant of `tag`, in document order."""
+        if self.simple:
+            return [element for element in tag.descendants if self._matches(element)]
+        return self._compiled.select(tag)
+
+    def select_one(self, tag) -> Optional[Any]:
+        """Return the first matching descendant of `tag`, or None."""
+        if self.simple:
+            return next((element for element in tag.descendants if self._matches(element)), None)
+        return self._compiled.select_one(tag)
+
+
+class FieldSpec:
+    """How to extract one field from a record element."""
+
+    # One argument per key of a field's JSON config, passed by name
+    def __init__(self, selector: Optional[str] = None, *,  # pylint: disable=too-many-arguments
+                 attr: Optional[str] = None, many: bool = False,
+                 transform: Union[str, Callable[[Any], Any], None] = None,
+                 required: bool = True, default: Any = None):
+        """
+        Initialize the field.
+
+        Args:
+            selector: CSS selector relative to the record (None: the record itself)
+            attr: Attribute to read (None: the element's stripped text); a
+                multi-valued attribute such as ``class`` is joined with spaces
+            many: Extract a list from every match instead of the first one
+            transform: Name in `TRANSFORMS` or a function applied to each value
+            required: Skip the record when the selector matches nothing
+            default: Value of an optional field that matched nothing
+
+        Raises:
+            ValueError: If the selector is invalid or the transform is unknown
+        """
+        if isinstance(transform, str) and transform not in TRANSFORMS:
+            raise ValueError(f"Unknown transform {transform!r}; "
+                             f"expected one of {', '.join(TRANSFORMS)}")
+        self.selector = selector
+        self.attr = attr
+        self.many = many
+        self.transform = transform
+        self.required = required
+        self.default = default
+        self.compiled = CompiledSelector(selector) if selector else None
+
+    @classmethod
+    def from_config(cls, config: Union[str, Dict[str, Any]]) -> 'FieldSpec':
+        """Build a field from its config: a selector string or a dict of `__init__` arguments."""
+        if isinstance(config, str):
+            return cls(config)
+        return cls(**config)
+
+    def _value(self, element) -> Any:
+        if self.attr is None:
+            value = element.get_text().strip()
+        else:
+            value = element.get(self.attr)
+            if isinstance(value, list):
+                value = ' '.join(value)
+        if isinstance(self.transform, str):
+            return TRANSFORMS[self.transform](value)
+        if self.transform is not None:
+            return self.transform(value)
+        return value
+
+    def extract(self, record) -> Any:
+        """
+        Extract the field from one record element.
+
+        Raises:
+            LookupError: If a required field matches nothing
+        """
+        if self.many:
+            elements = self.compiled.select(record) if self.compiled else [record]
+            return [self._value(element) for element in elements]
+        element = self.compiled.select_one(record) if self.compiled else record
+        if element is None:
+            if self.required:
+                raise LookupError(f"no match for {self.selector!r}")
+            return self.default
+        return self._value(element)
+
+
+# A plain holder of settings, read by `SelectorScraper` and `describe_site`
+class SiteConfig:  # pylint: disable=too-many-instance-attributes,too-few-public-methods
+    """Declarative description of a site scraped by `SelectorScraper`."""
+
+    # The arguments are the flat keys of a site's JSON config, passed by name
+    def __init__(self, base_url: str, record_selector: str,  # pylint: disable=too-many-arguments
+                 fields: Dict[str, Union[FieldSpec, str, Dict[str, Any]]], *,
+                 page_url: str = '{base_url}/page/{page}/', first_page: int = 1,
+                 first_page_url: Optional[str] = None,
+                 next_page_selector: str = WebScraper.next_page_selector,
+                 parse_only: Optional[Dict[str, Any]] = None, label: str = 'records',
+                 model: Optional[str] = None, delay: float = 1.0, burst: int = 1,
+                 max_concurrency: int = 4):
+        """
+        Initialize the config; every CSS selector is compiled here, once.
+
+        Args:
+            base_url: Root URL of the site (also stored in each record's source)
+            record_selector: CSS selector matching one element per record
+            fields: Field name -> `FieldSpec`, selector string or `FieldSpec` arguments
+            page_url: Listing page URL template with ``{base_url}`` and ``{page}``
+            first_page: Number of the first listing page (e.g. 0 for zero-based)
+            first_page_url: Template of the first page's URL, if it differs
+                (e.g. ``'{base_url}'``)
+            next_page_selector: CSS selector of the "next page" link
+            parse_only: `SoupStrainer` arguments (e.g. ``{'name': ['div', 'li'],
+                'class_': ['quote', 'next']}``) restricting parsing to those subtrees
+            label: Noun used in log messages
+            model: Data type in `models.MODELS` whose typed model builds the records
+            delay: Average delay between requests to the site in seconds
+            burst: Number of requests allowed back to back
+            max_concurrency: Maximum number of pages fetched at once
+
+        Raises:
+            ValueError: If a selector, transform or model is invalid
+        """
+        if not fields:
+            raise ValueError("A site needs at least one field")
+        if model is not None and model not in MODELS:
+            raise ValueError(f"Unknown model {model!r}; expected one of {', '.join(MODELS)}")
+        self.base_url = base_url.rstrip('/')
+        self.record_selector = CompiledSelector(record_selector)
+        self.fields = {name: spec if isinstance(spec, FieldSpec) else FieldSpec.from_config(spec)
+                       for name, spec in fields.items()}
+        self.page_url = page_url
+        self.first_page = first_page
+        self.first_page_url = first_page_url
+        self.next_page_selector = CompiledSelector(next_page_selector)
+        self.parse_only = parse_only
+        self.label = label
+        self.model = model
+        self.delay = delay
+        self.burst = burst
+        self.max_concurrency = max_concurrency
+
+    @classmethod
+    def from_dict(cls, config: Dict[str, Any]) -> 'SiteConfig':
+        """
+        Build a config from a JSON-compatible dict of `__init__` arguments.
+
+        Raises:
+            ValueError: If an argument is missing, unknown or invalid
+        """
+        try:
+            return cls(**config)
+        except TypeError as e:
+            raise ValueError(f"Invalid site config: {e}") from e
+
+
+class SelectorScraper(WebScraper):
+    """Scraper running a declarative `SiteConfig`."""
+
+    # Same keyword overrides as the site scrapers, for `ScraperRegistry.create`
+    def __init__(self, site: SiteConfig, *,  # pylint: disable=too-many-arguments
+                 delay: Optional[float] = None, max_concurrency: Optional[int] = None,
+                 burst: Optional[int] = None, http_cache: Optional[HTTPCache] = None,
+                 base_url: Optional[str] = None):
+        """
+        Initialize the scraper.
+
+        Args:
+            site: Site to scrape
+            delay: Average delay between requests in seconds (default: the site's)
+            max_concurrency: Maximum number of pages fetched at once (default: the site's)
+            burst: Number of requests allowed back to back (default: the site's)
+            http_cache: Optional on-disk cache for conditional re-fetches
+            base_url: Root of a mirror of the site to scrape instead of its base URL
+        """
+        self.use_site(site)
+        super().__init__(base_url or site.base_url,
+                         delay=site.delay if delay is None else delay,
+                         max_concurrency=site.max_concurrency if max_concurrency is None
+                         else max_concurrency,
+                         burst=site.burst if burst is None else burst,
+                         http_cache=http_cache)
+
+    def use_site(self, site: SiteConfig):
+        """Take the extraction settings of `site` (also used by parser processes)."""
+        self.site = site
+        self.record_label = site.label
+        self.record_model = MODELS.get(site.model) if site.model else None
+        self.parse_only = SoupStrainer(**site.parse_only) if site.parse_only else None
+
+    def page_urls(self, pages: int) -> List[str]:
+        """Build the listing page URLs from the site's pagination rule."""
+        site = self.site
+        urls = []
+        for page in range(site.first_page, site.first_page + pages):
+            template = site.page_url
+            if page == site.first_page and site.first_page_url:
+                template = site.first_page_url
+            urls.append(template.format(base_url=self.base_url, page=page))
+        return urls
+
+    def extract_records(self, soup: BeautifulSoup) -> List[Dict[str, Any]]:
+        """Extract one record per element matching the site's record selector."""
+        records = []
+        source = intern(self.base_url)
+        for element in self.site.record_selector.select(soup):
+            try:
+                record = {name: spec.extract(element) for name, spec in self.site.fields.items()}
+            except (LookupError, AttributeError, TypeError, ValueError) as e:
+                logger.warning(f"Error parsing {self.record_label}: {e}")
+                continue
+            record['source'] = source
+            if self.record_model is not None:
+                record = self.record_model.from_dict(record).to_dict()
+            records.append(record)
+        return records
+
+    def next_page_url(self, soup: BeautifulSoup, url: str) -> Optional[str]:
+        """Find the next page with the site's compiled next-page selector."""
+        link = self.site.next_page_selector.select_one(soup)
+        if link is None or not link.get('href'):
+            return None
+        return urljoin(url, link['href'])
+
+
+def describe_site(site: SiteConfig) -> Dict[str, Any]:
+    """Summarize a site for listings (base URL, selectors and fields)."""
+    return {
+        'base_url': site.base_url,
+        'record_selector': site.record_selector.pattern,
+        'fields': list(site.fields),
+        'page_url': site.page_url,
+        'delay': site.delay,
+    }
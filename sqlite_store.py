@@ -0,0 +1,558 @@
+"""
+SQLite-backed record store, an alternative to the single JSON data file.
+
+Quotes, books and hockey teams are stored as rows of an embedded database
+in WAL mode, indexed by run. Every save appends a row to ``scrape_runs`` and
+inserts that run's records; the ``current_runs`` table points each data type
+at its latest run, so readers load only the type they need. The records of
+the last `KEEP_RUNS` runs of each type stay available as history; older
+ones are deleted by the save that replaces them. Every change between runs
+is also recorded in ``record_changes``.
+
+Filtering and sorting happen in the API's in-memory `query.RecordIndex`,
+built once per run, so the tables carry no indexes on record fields.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections.abc import Mapping
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+from data_cache import DataSnapshot
+from delta import RecordDelta, diff_records, record_keys
+from models import MODELS, normalize_records
+from web_scraper_base import logger
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scrape_runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS current_runs (
+    data_type TEXT PRIMARY KEY,
+    run_id INTEGER NOT NULL REFERENCES scrape_runs(id)
+);
+CREATE TABLE IF NOT EXISTS quotes (
+    id INTEGER PRIMARY KEY,
+    run_id INTEGER NOT NULL REFERENCES scrape_runs(id),
+    text TEXT,
+    author TEXT,
+    tags TEXT,
+    source TEXT
+);
+CREATE TABLE IF NOT EXISTS quote_tags (
+    quote_id INTEGER NOT NULL REFERENCES quotes(id),
+    tag TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS books (
+    id INTEGER PRIMARY KEY,
+    run_id INTEGER NOT NULL REFERENCES scrape_runs(id),
+    title TEXT,
+    price REAL,
+    availability TEXT,
+    rating INTEGER,
+    source TEXT
+);
+CREATE TABLE IF NOT EXISTS hockey_teams (
+    id INTEGER PRIMARY KEY,
+    run_id INTEGER NOT NULL REFERENCES scrape_runs(id),
+    name TEXT,
+    year INTEGER,
+    wins INTEGER,
+    losses INTEGER,
+    source TEXT
+);
+CREATE TABLE IF NOT EXISTS record_changes (
+    id INTEGER PRIMARY KEY,
+    run_id INTEGER NOT NULL REFERENCES scrape_runs(id),
+    timestamp TEXT NOT NULL,
+    data_type TEXT NOT NULL,
+    op TEXT NOT NULL,
+    record_key TEXT NOT NULL,
+    record TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_quotes_run ON quotes(run_id);
+CREATE INDEX IF NOT EXISTS idx_quote_tags_quote ON quote_tags(quote_id);
+CREATE INDEX IF NOT EXISTS idx_books_run ON books(run_id);
+CREATE INDEX IF NOT EXISTS idx_hockey_run ON hockey_teams(run_id);
+CREATE INDEX IF NOT EXISTS idx_changes_type ON record_changes(data_type, timestamp);
+CREATE INDEX IF NOT EXISTS idx_changes_seq ON record_changes(data_type, id);
+DROP INDEX IF EXISTS idx_quotes_author;
+DROP INDEX IF EXISTS idx_quote_tags_tag;
+DROP INDEX IF EXISTS idx_books_rating;
+DROP INDEX IF EXISTS idx_hockey_year;
+DROP INDEX IF EXISTS idx_hockey_name;
+"""
+
+# Runs of each data type whose records are kept
+KEEP_RUNS = 10
+
+# Data type -> (table, record fields in column order)
+TABLES = {
+    'quotes': ('quotes', ('text', 'author', 'tags', 'source')),
+    'books': ('books', ('title', 'price', 'availability', 'rating', 'source')),
+    'hockey_teams': ('hockey_teams', ('name', 'year', 'wins', 'losses', 'source')),
+}
+
+
+class SQLiteStore:
+    """Record store in one SQLite database file (WAL mode)."""
+
+    def __init__(self, path: str = 'scraped_data.db', keep_runs: int = KEEP_RUNS):
+        """
+        Initialize the store, creating the schema if needed.
+
+        Args:
+            path: Path of the SQLite database file
+            keep_runs: Runs of each data type whose records are kept
+        """
+        self.path = path
+        self.keep_runs = max(1, keep_runs)
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        """Return this thread's connection, opening it on first use."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def save_run(self, timestamp: str, data: Dict[str, List[Dict[str, Any]]],
+                 only_if_empty: bool = False) -> Optional[int]:
+        """
+        Append one scrape run and make it current for the types it contains.
+
+        Records of runs beyond the last `keep_runs` of each type are deleted
+        in the same transaction.
+
+        Args:
+            timestamp: Scrape timestamp (ISO format)
+            data: Records by data type, e.g. ``{'quotes': [...]}``
+            only_if_empty: Skip the save if the store already holds a run
+
+        Returns:
+            The new run ID, or None if skipped
+        """
+        conn = self._connection()
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            if only_if_empty and self.latest_run_id() is not None:
+                return None
+
+            run_id = conn.execute(
+                'INSERT INTO scrape_runs (timestamp, created_at) VALUES (?, ?)',
+                (timestamp, time.time())
+            ).lastrowid
+
+            for data_type, records in data.items():
+                if data_type not in TABLES:
+                    logger.warning(f"Skipping unknown data type {data_type}")
+                    continue
+                self._insert_records(conn, run_id, data_type, records)
+                conn.execute(
+                    'INSERT OR REPLACE INTO current_runs (data_type, run_id) VALUES (?, ?)',
+                    (data_type, run_id)
+                )
+                self._prune(conn, data_type)
+        return run_id
+
+    def save_changes(self, timestamp: str, data: Dict[str, List[Dict[str, Any]]],
+                     delta: bool = False) -> Dict[str, RecordDelta]:
+        """
+        Save one scrape, diffing it against the current records and logging the changes.
+
+        A full save appends a run holding every record, like `save_run`. A
+        delta save serializes only inserted and updated records: unchanged
+        rows are copied into the new run inside SQLite (``INSERT ...
+        SELECT``), in scrape order, so rows of earlier runs are never
+        modified and every kept run holds its full records. Nothing is
+        written when no record changed. Changes are logged with the time of
+        the save, taken inside the write transaction, so their IDs and
+        timestamps both follow commit order. Records of runs beyond the last
+        `keep_runs` of each type are deleted in the same transaction.
+
+        Args:
+            timestamp: Scrape timestamp (ISO format)
+            data: Records by data type, e.g. ``{'quotes': [...]}``
+            delta: Write only the changes
+
+        Returns:
+            Changes by data type
+        """
+        conn = self._connection()
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            deltas, stored_ids = self._diff_current(data)
+            if delta and not any(deltas.values()):
+                return deltas
+
+            saved_at = datetime.now().isoformat()
+            run_id = conn.execute(
+                'INSERT INTO scrape_runs (timestamp, created_at) VALUES (?, ?)',
+                (timestamp, time.time())
+            ).lastrowid
+
+            for data_type, changes in deltas.items():
+                if delta:
+                    rows = self._delta_rows(data_type, data[data_type], changes,
+                                            stored_ids[data_type])
+                    for row in rows:
+                        if isinstance(row, dict):
+                            self._insert_records(conn, run_id, data_type, [row])
+                        else:
+                            self._copy_row(conn, run_id, data_type, row)
+                else:
+                    self._insert_records(conn, run_id, data_type, data[data_type])
+                conn.execute(
+                    'INSERT OR REPLACE INTO current_runs (data_type, run_id) VALUES (?, ?)',
+                    (data_type, run_id)
+                )
+                conn.executemany(
+                    'INSERT INTO record_changes '
+                    '(run_id, timestamp, data_type, op, record_key, record) '
+                    'VALUES (?, ?, ?, ?, ?, ?)',
+                    [(run_id, saved_at, data_type, op, key, json.dumps(record, ensure_ascii=False))
+                     for op, key, record in changes.entries()]
+                )
+                self._prune(conn, data_type)
+        return deltas
+
+    def _diff_current(self, data: Dict[str, List[Dict[str, Any]]]
+                      ) -> Tuple[Dict[str, RecordDelta], Dict[str, Dict[str, int]]]:
+        """
+        Diff scraped records against the current runs; caller holds the write lock.
+
+        Returns:
+            Changes by data type, and the row ID of every current record by
+            data type and record key
+        """
+        runs = self.current_runs()
+        deltas: Dict[str, RecordDelta] = {}
+        stored_ids: Dict[str, Dict[str, int]] = {}
+        for data_type, records in data.items():
+            if data_type not in TABLES:
+                logger.warning(f"Skipping unknown data type {data_type}")
+                continue
+            row_ids, previous = self._load_rows(data_type, runs.get(data_type))
+            deltas[data_type] = diff_records(data_type, previous, records)
+            stored_ids[data_type] = dict(zip(record_keys(data_type, previous), row_ids))
+        return deltas, stored_ids
+
+    @staticmethod
+    def _delta_rows(data_type: str, records: List[Dict[str, Any]], changes: RecordDelta,
+                    row_ids: Dict[str, int]) -> List[Union[Dict[str, Any], int]]:
+        """
+        Plan the rows of a delta run, in scrape order.
+
+        Returns:
+            The record to insert for each inserted or updated record, and the
+            stored row ID to copy for each unchanged one
+        """
+        changed = {key for key, _record in changes.inserted + changes.updated}
+        return [record if key in changed else row_ids[key]
+                for key, record in zip(record_keys(data_type, records), records)]
+
+    def _prune(self, conn: sqlite3.Connection, data_type: str):
+        """Delete the records of runs older than the last `keep_runs` of a type."""
+        table, _fields = TABLES[data_type]
+        cutoff = conn.execute(
+            f"SELECT run_id FROM (SELECT DISTINCT run_id FROM {table} ORDER BY run_id DESC) "
+            "LIMIT 1 OFFSET ?",
+            (self.keep_runs - 1,)
+        ).fetchone()
+        if cutoff is None:
+            return
+        if data_type == 'quotes':
+            conn.execute('DELETE FROM quote_tags WHERE quote_id IN '
+                         '(SELECT id FROM quotes WHERE run_id < ?)', cutoff)
+        conn.execute(f"DELETE FROM {table} WHERE run_id < ?", cutoff)
+
+    def changes_since(self, data_type: str, since: Optional[str] = None,
+                      after: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Read the logged changes of one data type, oldest first.
+
+        Args:
+            data_type: Data type to read
+            since: Only return changes saved after this timestamp (ISO format)
+            after: Only return changes with a higher sequence number (row ID)
+
+        Returns:
+            Change entries with seq, timestamp, op, key and record
+        """
+        rows = self._connection().execute(
+            'SELECT id, timestamp, op, record_key, record FROM record_changes '
+            'WHERE data_type = ? AND id > ? AND timestamp > ? ORDER BY id',
+            (data_type, after or 0, since or '')
+        )
+        return [{'seq': seq, 'timestamp': timestamp, 'op': op, 'key': key,
+                 'record': json.loads(record)}
+                for seq, timestamp, op, key, record in rows]
+
+    def last_seq(self) -> int:
+        """Return the sequence number of the newest logged change (0 if none)."""
+        row = self._connection().execute('SELECT MAX(id) FROM record_changes').fetchone()
+        return row[0] or 0
+
+    def oldest_seq(self) -> int:
+        """Return the sequence number of the oldest logged change (0 if none)."""
+        row = self._connection().execute('SELECT MIN(id) FROM record_changes').fetchone()
+        return row[0] or 0
+
+    @staticmethod
+    def _insert_records(conn: sqlite3.Connection, run_id: int, data_type: str,
+                        records: List[Dict[str, Any]]):
+        table, fields = TABLES[data_type]
+        placeholders = ', '.join('?' * (len(fields) + 1))
+        sql = f"INSERT INTO {table} (run_id, {', '.join(fields)}) VALUES ({placeholders})"
+
+        for record in records:
+            values = [record.get(field) for field in fields]
+            if data_type == 'quotes':
+                values[fields.index('tags')] = json.dumps(record.get('tags', []),
+                                                          ensure_ascii=False)
+            row_id = conn.execute(sql, [run_id] + values).lastrowid
+            if data_type == 'quotes':
+                conn.executemany('INSERT INTO quote_tags (quote_id, tag) VALUES (?, ?)',
+                                 [(row_id, tag) for tag in record.get('tags', [])])
+
+    @staticmethod
+    def _copy_row(conn: sqlite3.Connection, run_id: int, data_type: str, row_id: int):
+        """Copy a stored row (and its tags) into another run, leaving the original untouched."""
+        table, fields = TABLES[data_type]
+        columns = ', '.join(fields)
+        new_id = conn.execute(
+            f"INSERT INTO {table} (run_id, {columns}) "
+            f"SELECT ?, {columns} FROM {table} WHERE id = ?",
+            (run_id, row_id)
+        ).lastrowid
+        if data_type == 'quotes':
+            conn.execute('INSERT INTO quote_tags (quote_id, tag) '
+                         'SELECT ?, tag FROM quote_tags WHERE quote_id = ?', (new_id, row_id))
+
+    def import_json(self, path: str) -> Optional[int]:
+        """
+        Seed an empty store from a scraped_data.json file.
+
+        Args:
+            path: Path of the JSON data file
+
+        Returns:
+            The imported run ID, or None if the store already had data
+        """
+        with open(path, 'r', encoding='utf-8') as f:
+            document = json.load(f)
+        return self.save_run(document.get('timestamp') or datetime.now().isoformat(),
+                             document.get('data', {}), only_if_empty=True)
+
+    def latest_run_id(self) -> Optional[int]:
+        """Return the ID of the most recent run, or None if the store is empty."""
+        row = self._connection().execute('SELECT MAX(id) FROM scrape_runs').fetchone()
+        return row[0]
+
+    def latest_run(self) -> Optional[Tuple[int, str, float]]:
+        """Return ``(id, timestamp, created_at)`` of the most recent run."""
+        return self._connection().execute(
+            'SELECT id, timestamp, created_at FROM scrape_runs ORDER BY id DESC LIMIT 1'
+        ).fetchone()
+
+    def current_runs(self) -> Dict[str, int]:
+        """Return the current run ID of every stored data type."""
+        rows = self._connection().execute('SELECT data_type, run_id FROM current_runs')
+        return dict(rows.fetchall())
+
+    def count(self, data_type: str) -> int:
+        """Return the number of current records of `data_type`."""
+        table, _fields = TABLES[data_type]
+        row = self._connection().execute(
+            f"SELECT COUNT(*) FROM {table} WHERE run_id = "
+            "(SELECT run_id FROM current_runs WHERE data_type = ?)",
+            (data_type,)
+        ).fetchone()
+        return row[0]
+
+    def load_records(self, data_type: str, run_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Load the records of one data type.
+
+        Args:
+            data_type: ``quotes``, ``books`` or ``hockey_teams``
+            run_id: Run to load (defaults to the type's current run)
+
+        Returns:
+            Records in scrape order
+        """
+        if run_id is None:
+            run_id = self.current_runs().get(data_type)
+        return self._load_rows(data_type, run_id)[1]
+
+    def iter_records(self, data_type: str, run_id: Optional[int] = None,
+                     batch_size: int = 500) -> Iterator[Dict[str, Any]]:
+        """
+        Yield the records of one data type without loading them all at once.
+
+        Args:
+            data_type: ``quotes``, ``books`` or ``hockey_teams``
+            run_id: Run to read (defaults to the type's current run)
+            batch_size: Rows fetched from SQLite at a time
+
+        Yields:
+            Records in scrape order
+        """
+        if run_id is None:
+            run_id = self.current_runs().get(data_type)
+            if run_id is None:
+                return
+        table, fields = TABLES[data_type]
+        cursor = self._connection().execute(
+            f"SELECT {', '.join(fields)} FROM {table} WHERE run_id = ? ORDER BY id",
+            (run_id,)
+        )
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            model = MODELS[data_type]
+            for row in rows:
+                record = dict(zip(fields, row))
+                if data_type == 'quotes':
+                    record['tags'] = json.loads(record['tags'] or '[]')
+                yield model.from_dict(record).to_dict()
+
+    def _load_rows(self, data_type: str,
+                   run_id: Optional[int]) -> Tuple[List[int], List[Dict[str, Any]]]:
+        """Return the row IDs and records of one run (empty if `run_id` is None)."""
+        if run_id is None:
+            return [], []
+        table, fields = TABLES[data_type]
+        rows = self._connection().execute(
+            f"SELECT id, {', '.join(fields)} FROM {table} WHERE run_id = ? ORDER BY id",
+            (run_id,)
+        ).fetchall()
+        records = [dict(zip(fields, row[1:])) for row in rows]
+        if data_type == 'quotes':
+            for record in records:
+                record['tags'] = json.loads(record['tags'] or '[]')
+        # Databases created before the typed models hold numbers as text
+        return [row[0] for row in rows], normalize_records(data_type, records)
+
+
+class LazyRecords(Mapping):
+    """Read-only mapping of data type -> records, loading each type on first access."""
+
+    def __init__(self, store: SQLiteStore, runs: Dict[str, int]):
+        """
+        Initialize the mapping.
+
+        Args:
+            store: Store to load records from
+            runs: Run ID of each available data type
+        """
+        self._store = store
+        self._runs = runs
+        self._loaded: Dict[str, List[Dict[str, Any]]] = {}
+
+    def __getitem__(self, data_type: str) -> List[Dict[str, Any]]:
+        if data_type not in self._runs:
+            raise KeyError(data_type)
+        if data_type not in self._loaded:
+            self._loaded[data_type] = self._store.load_records(data_type, self._runs[data_type])
+        return self._loaded[data_type]
+
+    def run_id(self, data_type: str) -> int:
+        """Return the run the records of `data_type` are read from."""
+        return self._runs[data_type]
+
+    def __contains__(self, data_type: object) -> bool:
+        return data_type in self._runs
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._runs)
+
+    def __len__(self) -> int:
+        return len(self._runs)
+
+
+class SQLiteDataCache:
+    """`ScrapedDataCache` counterpart that serves snapshots from a `SQLiteStore`."""
+
+    def __init__(self, store: SQLiteStore):
+        """
+        Initialize the cache.
+
+        Args:
+            store: Store to read from
+        """
+        self.store = store
+        self.generation = 0
+        self._lock = threading.Lock()
+        self._run_id: Optional[int] = None
+        self._snapshot: Optional[DataSnapshot] = None
+
+    def snapshot(self) -> Union[DataSnapshot, Tuple[Dict[str, Any], int]]:
+        """
+        Return the current snapshot, rebuilt only after a new run is saved.
+
+        Records are loaded per data type on first access, so a request for
+        one type never reads the others.
+
+        Returns:
+            DataSnapshot, or an ``(error, status_code)`` tuple if the store is empty
+        """
+        try:
+            latest = self.store.latest_run()
+        except sqlite3.Error as e:
+            return {'error': f'Error reading data: {str(e)}'}, 500
+        if latest is None:
+            return {'error': 'No scraped data available'}, 404
+
+        run_id, timestamp, created_at = latest
+        with self._lock:
+            if self._snapshot is not None and run_id == self._run_id:
+                return self._snapshot
+
+            data = {
+                'timestamp': timestamp,
+                'data': LazyRecords(self.store, self.store.current_runs())
+            }
+            self.generation += 1
+            self._run_id = run_id
+            self._snapshot = DataSnapshot(data, self.generation, created_at)
+            return self._snapshot
+
+    def invalidate(self):
+        """Drop the cached snapshot so the next access re-reads the store."""
+        with self._lock:
+            self._run_id = None
+            self._snapshot = None
+
+
+def open_default_store(path: str, json_path: Optional[str] = None,
+                       keep_runs: int = KEEP_RUNS) -> SQLiteStore:
+    """
+    Open a store, seeding it from the JSON data file if it is empty.
+
+    Args:
+        path: Path of the SQLite database file
+        json_path: Optional scraped_data.json to import into an empty store
+        keep_runs: Runs of each data type whose records are kept
+
+    Returns:
+        The opened store
+    """
+    store = SQLiteStore(path, keep_runs)
+    if json_path and os.path.exists(json_path) and store.latest_run_id() is None:
+        try:
+            store.import_json(json_path)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not import {json_path} into {path}: {e}")
+    return store
@@ -0,0 +1,165 @@
+"""
+Aggregates over the scraped data for dashboards.
+
+Each statistic depends on one data type and is computed in a single pass
+over its records. The API materializes them once per data generation, when
+a scrape finishes or on first use, so dashboard requests are cached lookups
+instead of full downloads and client-side scans. They are saved next to
+the data file, tagged with the generation they were computed from, so the
+other API workers load them instead of computing them again.
+"""
+import json
+import os
+import statistics
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from models import parse_int, parse_price, parse_rating
+from storage import atomic_write_bytes
+
+# Width of the price histogram buckets, in pounds
+PRICE_BUCKET = 10
+
+
+def author_stats(quotes: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Count quotes per author, most quoted first."""
+    counts = Counter(quote.get('author') for quote in quotes if quote.get('author'))
+    return {
+        'total_quotes': len(quotes),
+        'count': len(counts),
+        'authors': [{'author': author, 'quotes': n}
+                    for author, n in sorted(counts.items(), key=lambda item: (-item[1], item[0]))]
+    }
+
+
+def tag_stats(quotes: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Count how many quotes carry each tag, most frequent first."""
+    counts = Counter(tag for quote in quotes for tag in set(quote.get('tags') or []))
+    return {
+        'total_quotes': len(quotes),
+        'count': len(counts),
+        'tags': [{'tag': tag, 'quotes': n}
+                 for tag, n in sorted(counts.items(), key=lambda item: (-item[1], item[0]))]
+    }
+
+
+def rating_stats(books: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Summarize the price distribution of the books of each star rating."""
+    prices: Dict[Any, List[float]] = {}
+    for book in books:
+        price = parse_price(book.get('price'))
+        if price is not None:
+            prices.setdefault(parse_rating(book.get('rating')), []).append(price)
+
+    ratings = []
+    for rating in sorted(prices, key=lambda value: (value is None, value)):
+        values = sorted(prices[rating])
+        buckets = Counter(int(price // PRICE_BUCKET) * PRICE_BUCKET for price in values)
+        ratings.append({
+            'rating': rating,
+            'books': len(values),
+            'min_price': values[0],
+            'max_price': values[-1],
+            'mean_price': round(statistics.fmean(values), 2),
+            'median_price': round(statistics.median(values), 2),
+            'price_histogram': [{'from': start, 'to': start + PRICE_BUCKET, 'books': n}
+                                for start, n in sorted(buckets.items())]
+        })
+    return {'total_books': len(books), 'bucket_width': PRICE_BUCKET, 'ratings': ratings}
+
+
+def team_stats(teams: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Total wins and losses and the win percentage of each team, best first."""
+    totals: Dict[str, Dict[str, Any]] = {}
+    for season in teams:
+        name = season.get('name')
+        if not name:
+            continue
+        team = totals.setdefault(name, {'name': name, 'seasons': 0, 'wins': 0, 'losses': 0,
+                                        'first_year': None, 'last_year': None})
+        team['seasons'] += 1
+        team['wins'] += parse_int(season.get('wins')) or 0
+        team['losses'] += parse_int(season.get('losses')) or 0
+        year = parse_int(season.get('year'))
+        if year is not None:
+            team['first_year'] = min(year, team['first_year'] or year)
+            team['last_year'] = max(year, team['last_year'] or year)
+
+    for team in totals.values():
+        games = team['wins'] + team['losses']
+        team['win_pct'] = round(team['wins'] / games, 4) if games else None
+        team['loss_pct'] = round(team['losses'] / games, 4) if games else None
+
+    ranked = sorted(totals.values(), key=lambda team: (-(team['win_pct'] or 0), team['name']))
+    return {'total_seasons': len(teams), 'count': len(ranked), 'teams': ranked}
+
+
+# Statistic name -> (data type it is computed from, aggregate function)
+STATS: Dict[str, Tuple[str, Callable[[List[Dict[str, Any]]], Dict[str, Any]]]] = {
+    'authors': ('quotes', author_stats),
+    'tags': ('quotes', tag_stats),
+    'ratings': ('books', rating_stats),
+    'teams': ('hockey_teams', team_stats),
+}
+
+
+def compute_stat(name: str, records_by_type: Dict[str, List[Dict[str, Any]]]) -> Dict[str, Any]:
+    """
+    Compute one statistic.
+
+    Args:
+        name: Key of `STATS`
+        records_by_type: Records by data type
+
+    Returns:
+        The aggregate, with the data type it was computed from
+    """
+    data_type, aggregate = STATS[name]
+    records = list(records_by_type.get(data_type, []))
+    return {'stat': name, 'type': data_type, **aggregate(records)}
+
+
+def compute_all(records_by_type: Dict[str, List[Dict[str, Any]]]) -> Dict[str, Dict[str, Any]]:
+    """Compute every statistic."""
+    return {name: compute_stat(name, records_by_type) for name in STATS}
+
+
+def stats_path(data_path: str) -> str:
+    """Return the statistics file belonging to a JSON data file."""
+    return f"{os.path.splitext(data_path)[0]}.stats.json"
+
+
+def write_stats(path: str, stats: Dict[str, Dict[str, Any]], generation: Any = None):
+    """
+    Save computed statistics atomically.
+
+    Args:
+        path: Output file
+        stats: Statistics by name, as returned by `compute_all`
+        generation: Identifies the data they were computed from (None if unknown)
+    """
+    content = json.dumps({'generation': generation, 'stats': stats}, indent=2, ensure_ascii=False)
+    atomic_write_bytes(path, content.encode('utf-8'))
+
+
+def read_stats(path: str, generation: Any) -> Optional[Dict[str, Dict[str, Any]]]:
+    """
+    Load saved statistics if they were computed from data generation `generation`.
+
+    Args:
+        path: File written by `write_stats`
+        generation: Generation of the current data
+
+    Returns:
+        Statistics by name, or None if missing, unreadable, incomplete or stale
+    """
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            saved = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if (not isinstance(saved, dict) or generation is None
+            or saved.get('generation') != generation
+            or not isinstance(saved.get('stats'), dict) or set(STATS) - set(saved['stats'])):
+        return None
+    return saved['stats']
@@ -0,0 +1,172 @@
+"""
+Crash- and concurrency-safe storage of the scraped data JSON file.
+
+Writers serialize to a temporary file in the same directory and swap it in
+with `os.replace`, so readers always see either the old or the new document
+and never block. Read-modify-write merges hold an inter-process file lock,
+so concurrent scrapes in different gunicorn workers don't lose each other's
+updates. Every write also bumps a small ``<file>.version`` marker that
+other processes can poll cheaply.
+"""
+import json
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, Optional
+
+try:
+    import fcntl
+
+    def _lock_file(lock_file):
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+
+    def _unlock_file(lock_file):
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+except ImportError:  # Windows
+    import msvcrt
+
+    def _lock_file(lock_file):
+        lock_file.seek(0)
+        msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+
+    def _unlock_file(lock_file):
+        lock_file.seek(0)
+        msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def atomic_write_bytes(path: str, content: bytes):
+    """
+    Write `content` to `path` atomically.
+
+    Args:
+        path: Destination file
+        content: Bytes to write
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", suffix='.tmp',
+                                    dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def pid_alive(pid: int) -> bool:
+    """
+    Whether a process with this ID exists on this host.
+
+    Used to find files left by exited workers. Always True on Windows, where
+    `os.kill` would terminate the process instead of probing it.
+    """
+    if os.name == 'nt':
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:  # e.g. EPERM: exists, owned by another user
+        return True
+    return True
+
+
+class DataFileStore:
+    """Atomic, lock-protected access to one JSON data file."""
+
+    def __init__(self, path: str):
+        """
+        Initialize the store.
+
+        Args:
+            path: Path of the JSON data file
+        """
+        self.path = path
+        self.lock_path = f"{path}.lock"
+        self.version_path = f"{path}.version"
+        self._thread_lock = threading.Lock()
+
+    @contextmanager
+    def lock(self) -> Iterator[None]:
+        """Hold the store's exclusive lock across threads and processes."""
+        with self._thread_lock:
+            with open(self.lock_path, 'a+b') as lock_file:
+                _lock_file(lock_file)
+                try:
+                    yield
+                finally:
+                    _unlock_file(lock_file)
+
+    def read(self) -> Optional[Dict[str, Any]]:
+        """
+        Read the current document without locking.
+
+        Returns:
+            Parsed document, or None if the file does not exist
+
+        Raises:
+            ValueError: If the file is not valid JSON
+        """
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def version(self) -> int:
+        """Return the write counter from the version marker (0 if never written)."""
+        try:
+            with open(self.version_path, 'r', encoding='utf-8') as f:
+                return int(f.read().strip() or 0)
+        except (OSError, ValueError):
+            return 0
+
+    def _write_locked(self, data: Dict[str, Any]):
+        """Write the document and bump the version marker; caller holds the lock."""
+        content = json.dumps(data, indent=2, ensure_ascii=False).encode('utf-8')
+        atomic_write_bytes(self.path, content)
+        atomic_write_bytes(self.version_path, str(self.version() + 1).encode('ascii'))
+
+    def write(self, data: Dict[str, Any]):
+        """
+        Replace the whole document atomically.
+
+        Args:
+            data: New document
+        """
+        with self.lock():
+            self._write_locked(data)
+
+    def update(self, mutate: Callable[[Dict[str, Any]], None]) -> Dict[str, Any]:
+        """
+        Read-modify-write the document under the lock.
+
+        A missing file starts from an empty document. An unreadable file is
+        left untouched and the error is raised, rather than overwritten.
+
+        Args:
+            mutate: Callable modifying the document in place; if it returns
+                False the file is not rewritten
+
+        Returns:
+            The document as written
+
+        Raises:
+            ValueError: If the existing file is not valid JSON
+        """
+        with self.lock():
+            data = self.read()
+            if data is None:
+                data = {'timestamp': datetime.now().isoformat(), 'data': {}}
+            data.setdefault('data', {})
+            if mutate(data) is not False:
+                self._write_locked(data)
+            return data
@@ -0,0 +1,104 @@
+"""Tests of the asyncio scrape path against the local fixture server."""
+import asyncio
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+import requests
+
+from async_engine import AsyncFetchEngine
+from benchmarks.scrape_benchmark import FixtureServer
+from manager import MultiSiteScraperManager
+from rate_limit import get_host_bucket
+from registry import default_registry
+
+PAGES = 10
+LATENCY = 0.3
+
+
+def scrape_async(base_urls, per_host_limit):
+    """Run the async manager over the quotes site; return (seconds, pages, records)."""
+    # Quotes pages parse fastest, so run times are dominated by the server's latency
+    registry = default_registry()
+    for key in registry.keys():
+        if key != 'quotes':
+            registry.unregister(key)
+    pages = []
+    manager = MultiSiteScraperManager(base_urls=base_urls, registry=registry,
+                                      page_callback=lambda _url, _records, ok: pages.append(ok))
+    start = time.perf_counter()
+    results = asyncio.run(manager.run_all_scrapers_async(num_pages=PAGES,
+                                                         per_host_limit=per_host_limit))
+    return time.perf_counter() - start, sum(pages), results['data']['quotes']
+
+
+def test_throughput_scales_with_connections_per_host():
+    with FixtureServer(latency=LATENCY) as server:
+        for url in server.base_urls.values():
+            get_host_bucket(urlparse(url).netloc, rate=0)
+
+        serial_seconds, serial_pages, serial_quotes = scrape_async(server.base_urls, 1)
+        parallel_seconds, parallel_pages, parallel_quotes = scrape_async(server.base_urls, PAGES)
+
+    assert serial_pages == parallel_pages == PAGES
+    assert serial_quotes and serial_quotes == parallel_quotes
+    # One connection per host fetches the pages one after another
+    assert serial_seconds >= PAGES * LATENCY
+    assert parallel_seconds * 3 < serial_seconds
+
+
+class SlowHandler(BaseHTTPRequestHandler):
+    """Stalls before answering (/stall) or sends the body a byte at a time (/trickle)."""
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        if self.path == '/stall':
+            time.sleep(1.0)
+        body = b'x' * 8
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        for byte in range(len(body)):
+            if self.path == '/trickle':
+                time.sleep(0.15)
+            self.wfile.write(body[byte:byte + 1])
+            self.wfile.flush()
+
+    def log_message(self, *args):
+        pass
+
+
+async def fetch_async(url, timeout):
+    async with AsyncFetchEngine() as engine:
+        return await engine.fetch(url, timeout=timeout)
+
+
+def fetch_sync(url, timeout):
+    try:
+        return requests.get(url, timeout=timeout).content
+    except requests.RequestException:
+        return None
+
+
+def test_timeouts_match_the_threaded_path():
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), SlowHandler)
+    httpd.daemon_threads = True
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{httpd.server_address[1]}"
+    timeout = (1.0, 0.5)
+    try:
+        # A server silent for longer than the read timeout fails both engines
+        assert fetch_sync(f"{base}/stall", timeout) is None
+        stalled = asyncio.run(fetch_async(f"{base}/stall", timeout))
+        assert not stalled and stalled.error
+
+        # A response trickling in over longer than the read timeout, but never
+        # pausing that long, succeeds on both
+        assert fetch_sync(f"{base}/trickle", timeout) == b'x' * 8
+        trickled = asyncio.run(fetch_async(f"{base}/trickle", timeout))
+        assert trickled and trickled.content == b'x' * 8
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
@@ -0,0 +1,67 @@
+"""Tests of delta saves and the change log."""
+import json
+import threading
+import time
+
+from delta import ChangeLog, save_json_changes
+from storage import DataFileStore
+
+
+class SlowChangeLog(ChangeLog):
+    """Change log that stalls the first append, widening any race with a second save."""
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.appending = threading.Event()
+
+    def append(self, deltas):
+        if not self.appending.is_set():
+            self.appending.set()
+            time.sleep(0.3)
+        super().append(deltas)
+
+
+def test_concurrent_saves_log_changes_in_file_order(tmp_path):
+    data_path = str(tmp_path / 'scraped_data.json')
+    store = DataFileStore(data_path)
+    change_log = SlowChangeLog(str(tmp_path / 'scraped_data.changes.jsonl'))
+
+    written = []
+    write_locked = store._write_locked  # pylint: disable=protected-access
+
+    def record_write(document):
+        written.append(document['timestamp'])
+        write_locked(document)
+
+    store._write_locked = record_write  # pylint: disable=protected-access
+
+    def save(timestamp, author):
+        quote = {'text': f"Quote by {author}", 'author': author, 'tags': []}
+        save_json_changes(store, change_log, timestamp, {'quotes': [quote]}, delta=True)
+
+    first = threading.Thread(target=save, args=('2026-01-01T00:00:00', 'First'))
+    second = threading.Thread(target=save, args=('2026-01-02T00:00:00', 'Second'))
+    first.start()
+    assert change_log.appending.wait(5)
+    second.start()
+    first.join()
+    second.join()
+
+    with open(change_log.path, 'r', encoding='utf-8') as f:
+        entries = [json.loads(line) for line in f]
+    logged = [entry for entry in sorted(entries, key=lambda entry: entry['seq'])
+              if entry['op'] == 'insert']
+    authors_in_log_order = [entry['record']['author'] for entry in logged]
+    authors_in_file_order = ['First' if timestamp.startswith('2026-01-01') else 'Second'
+                             for timestamp in written]
+    assert authors_in_log_order == authors_in_file_order
+
+    # Replaying the log in seq order ends with the records in the file
+    replayed = {}
+    for entry in sorted(entries, key=lambda entry: entry['seq']):
+        if entry['op'] == 'delete':
+            replayed.pop(entry['key'], None)
+        else:
+            replayed[entry['key']] = entry['record']
+    with open(data_path, 'r', encoding='utf-8') as f:
+        assert list(replayed.values()) == json.load(f)['data']['quotes']
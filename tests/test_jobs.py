@@ -0,0 +1,45 @@
+"""Tests of background scrape jobs."""
+import time
+
+import pytest
+
+from jobs import JobQueueFull, JobRunner, JobStore
+
+
+class FailingStore(JobStore):
+    """Job store whose disk is full."""
+
+    def save(self, job):
+        raise OSError(28, 'No space left on device')
+
+
+def test_failed_save_releases_the_slot(tmp_path):
+    runner = JobRunner(FailingStore(str(tmp_path)), max_pending=2)
+    for _ in range(5):
+        with pytest.raises(OSError):
+            runner.submit('scrape', {'pages': 1}, 1, lambda progress: {})
+
+    # The slots are free again once the disk is
+    runner.store = JobStore(str(tmp_path))
+    runner.submit('scrape', {'pages': 1}, 1, lambda progress: {})
+
+
+def test_full_queue_is_rejected(tmp_path):
+    runner = JobRunner(JobStore(str(tmp_path)), max_workers=1, max_pending=1)
+    with pytest.raises(JobQueueFull):
+        for _ in range(3):
+            runner.submit('scrape', {'pages': 1}, 1, lambda progress: time.sleep(1))
+
+
+def test_submit_prunes_at_most_once_per_interval(tmp_path, monkeypatch):
+    store = JobStore(str(tmp_path))
+    runner = JobRunner(store)
+    prunes = []
+    monkeypatch.setattr(store, 'prune', lambda *args: prunes.append(args))
+    for _ in range(10):
+        runner.submit('scrape', {'pages': 1}, 1, lambda progress: {})
+    assert not prunes
+
+    monkeypatch.setattr('jobs.PRUNE_INTERVAL', 0.0)
+    runner.submit('scrape', {'pages': 1}, 1, lambda progress: {})
+    assert len(prunes) == 1
@@ -0,0 +1,44 @@
+"""Tests of server-side filtering, sorting and pagination."""
+import pytest
+
+from query import DEFAULT_LIMIT, QueryError, RecordIndex
+
+
+def make_index(count):
+    books = [{'title': f"Book {number:04d}", 'price': float(number), 'rating': number % 5 + 1,
+              'availability': 'In stock'} for number in range(count)]
+    return RecordIndex('books', books)
+
+
+def test_sort_alone_is_paginated():
+    page = make_index(DEFAULT_LIMIT * 3).query({'sort': '-price'}, version=1)
+    assert len(page.records) == DEFAULT_LIMIT
+    assert page.limit == DEFAULT_LIMIT
+    assert page.total == DEFAULT_LIMIT * 3
+    assert page.records[0]['price'] == DEFAULT_LIMIT * 3 - 1
+    assert page.next_cursor is not None
+
+
+def test_cursor_continues_the_same_query():
+    index = make_index(50)
+    args = {'rating': '3', 'sort': 'price', 'limit': '4'}
+    first = index.query(args, version=1)
+    second = index.query({**args, 'cursor': first.next_cursor}, version=1)
+    assert [book['price'] for book in first.records + second.records] == \
+        [2.0, 7.0, 12.0, 17.0, 22.0, 27.0, 32.0, 37.0]
+
+
+@pytest.mark.parametrize('changed', [{'sort': '-price'}, {'rating': '4'}, {'max_price': '10'}])
+def test_cursor_rejected_with_other_filters_or_sort(changed):
+    index = make_index(50)
+    args = {'rating': '3', 'sort': 'price', 'limit': '4'}
+    cursor = index.query(args, version=1).next_cursor
+    with pytest.raises(QueryError):
+        index.query({**args, **changed, 'cursor': cursor}, version=1)
+
+
+def test_cursor_rejected_after_data_change():
+    index = make_index(50)
+    cursor = index.query({'limit': '4'}, version=1).next_cursor
+    with pytest.raises(QueryError):
+        index.query({'limit': '4', 'cursor': cursor}, version=2)
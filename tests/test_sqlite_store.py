@@ -0,0 +1,48 @@
+"""Tests of the SQLite record store."""
+from sqlite_store import SQLiteStore
+
+
+def quotes(count, edition):
+    return [{'text': f"Quote {number}", 'author': 'Author', 'tags': [f"tag{edition}"],
+             'source': 'page-1'} for number in range(count)]
+
+
+def new_quote(number):
+    return {'text': f"New quote {number}", 'author': 'Author', 'tags': [], 'source': 'page-2'}
+
+
+def table_runs(store, table):
+    rows = store._connection().execute(  # pylint: disable=protected-access
+        f"SELECT DISTINCT run_id FROM {table} ORDER BY run_id")
+    return [row[0] for row in rows]
+
+
+def test_full_saves_keep_only_the_last_runs(tmp_path):
+    store = SQLiteStore(str(tmp_path / 'data.db'), keep_runs=3)
+    run_ids = [store.save_run(f"2026-01-0{number + 1}T00:00:00",
+                              {'quotes': quotes(5, number)}) for number in range(6)]
+
+    assert table_runs(store, 'quotes') == run_ids[-3:]
+    conn = store._connection()  # pylint: disable=protected-access
+    orphan_tags = conn.execute('SELECT COUNT(*) FROM quote_tags WHERE quote_id NOT IN '
+                               '(SELECT id FROM quotes)').fetchone()[0]
+    assert orphan_tags == 0
+    assert store.load_records('quotes') == quotes(5, 5)
+    assert store.load_records('quotes', run_ids[-3]) == quotes(5, 3)
+
+
+def test_delta_saves_prune_per_type(tmp_path):
+    store = SQLiteStore(str(tmp_path / 'data.db'), keep_runs=2)
+    books = [{'title': 'Book', 'price': 10.0, 'availability': 'In stock', 'rating': 3,
+              'source': 'page-1'}]
+    store.save_changes('2026-01-01T00:00:00', {'quotes': quotes(3, 0), 'books': books})
+    for number in range(1, 4):
+        store.save_changes(f"2026-01-0{number + 1}T00:00:00",
+                           {'quotes': quotes(3, 0) + [new_quote(number)]}, delta=True)
+
+    assert len(table_runs(store, 'quotes')) == 2
+    # Books were only saved once: their run is still current and kept
+    assert len(table_runs(store, 'books')) == 1
+    assert store.load_records('books') == books
+    assert len(store.load_records('quotes')) == 4
+    assert store.changes_since('quotes')[0]['op'] == 'insert'
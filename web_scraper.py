@@ -3,23 +3,60 @@
 Top-level runner for the scraping package. Imports split classes from modules
 and provides the `main()` entrypoint.
 """
+import argparse
+import asyncio
 
 from manager import MultiSiteScraperManager
+from scrape_profiler import ProfileStore
+from registry import default_registry
 
 
 def main():
     """Main function to run the web scraper."""
-    manager = MultiSiteScraperManager()
+    parser = argparse.ArgumentParser(description='Scrape the public test sites.')
+    parser.add_argument('--profile', action='store_true',
+                        help='Profile the scrapers and save a report to .profiles/')
+    parser.add_argument('--sites', metavar='FILE',
+                        help='JSON file of additional sites to scrape (see registry.py)')
+    parser.add_argument('--parse-workers', type=int, default=0, metavar='N',
+                        help='Parse pages in N processes, separate from fetching (default: 0, '
+                             'parse in the fetcher threads)')
+    parser.add_argument('--engine', choices=('threads', 'async'), default='threads',
+                        help='Fetch with one thread per site, or all sites on one asyncio '
+                             'event loop (default: threads)')
+    args = parser.parse_args()
+    if args.profile and args.engine != 'threads':
+        parser.error('--profile is only supported with --engine threads')
+
+    manager = MultiSiteScraperManager(registry=default_registry(args.sites))
 
     # Run scrapers (1 page each as default)
-    results = manager.run_all_scrapers(num_pages=1)
+    if args.engine == 'async':
+        asyncio.run(manager.run_all_scrapers_async(num_pages=1,
+                                                   parse_workers=args.parse_workers))
+    else:
+        manager.run_all_scrapers(num_pages=1, parse_workers=args.parse_workers,
+                                 profile=args.profile)
 
     # Save results
     manager.save_results('scraped_data.json')
+    manager.save_stats('scraped_data.stats.json')
 
     # Print summary
     manager.print_summary()
 
+    if manager.profile is not None:
+        report = ProfileStore('.profiles').save(manager.profile, kind='cli',
+                                                params={'pages': 1})
+        print(f"\nProfile {report['id']} ({report['duration_seconds']}s, "
+              f"{report['samples']} samples) saved to .profiles/")
+        for stage, seconds in report['stages'].items():
+            print(f"  {stage:<12} {seconds:>8.3f}s")
+        print("Top functions (self seconds):")
+        for function in report['top_functions'][:10]:
+            print(f"  {function['self_seconds']:>8.3f}s  {function['function']} "
+                  f"({function['location']})")
+
 
 if __name__ == '__main__':
     main()
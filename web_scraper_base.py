@@ -2,11 +2,26 @@
 """
 Base web scraper utilities and `WebScraper` class.
 """
-import requests
+import asyncio
 import logging
 import time
-from bs4 import BeautifulSoup
-from typing import Optional
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from typing import (TYPE_CHECKING, Any, Callable, Dict, Iterable, Iterator, List, Mapping,
+                    Optional, Tuple, Union)
+from urllib.parse import urljoin, urlparse
+
+import requests
+from bs4 import BeautifulSoup, SoupStrainer
+from requests.adapters import HTTPAdapter
+
+from metrics import (EXTRACT_SECONDS, FETCH_BYTES, FETCH_SECONDS, HTTP_CACHE_TOTAL, PARSE_SECONDS,
+                     RATE_LIMIT_WAIT_SECONDS)
+from rate_limit import get_host_bucket
+from retry import (RETRY_AFTER_STATUSES, RETRY_STATUSES, RetryPolicy, get_host_breaker,
+                   parse_retry_after)
+
+if TYPE_CHECKING:
+    from http_cache import HTTPCache
 
 # Configure logging for package
 logging.basicConfig(
@@ -18,51 +33,571 @@ logger = logging.getLogger(__name__)
 # User agent to identify the scraper
 USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
 
+# Prefer the C-based lxml tree builder when it is installed
+try:
+    import lxml  # noqa: F401  pylint: disable=unused-import
+    DEFAULT_PARSER = 'lxml'
+except ImportError:
+    DEFAULT_PARSER = 'html.parser'
+
 
 class WebScraper:
     """Base web scraper class with common functionality."""
 
-    def __init__(self, base_url: str, delay: float = 1.0):
+    # Noun used in log messages, e.g. "Successfully scraped 10 quotes"
+    record_label = 'records'
+
+    # CSS selector of the "next page" link on a listing page
+    next_page_selector = 'li.next > a'
+
+    # BeautifulSoup tree builder used by parse_html
+    parser = DEFAULT_PARSER
+
+    # Restricts parsing to the subtrees the scraper reads (None parses everything)
+    parse_only: Optional[SoupStrainer] = None
+
+    # Typed record class (see `models`) the records are built from, if any
+    record_model = None
+
+    # Declarative config run by `selector_scraper.SelectorScraper` (None for coded scrapers)
+    site = None
+
+    # Seconds to wait for a connection, and for each read from the server
+    connect_timeout = 3.05
+    read_timeout = 10.0
+
+    # Retries of fetches failing with a connection error, timeout, 429 or 5xx
+    retry_policy = RetryPolicy()
+
+    def __init__(self, base_url: str, delay: float = 1.0,
+                 max_concurrency: int = 1, burst: int = 1,
+                 http_cache: Optional['HTTPCache'] = None):
         """
         Initialize the scraper.
 
         Args:
             base_url: Base URL to scrape
             delay: Delay between requests in seconds (respect rate limiting)
+            max_concurrency: Maximum number of pages in flight at once
+            burst: Number of requests allowed back to back before pacing kicks in
+            http_cache: Optional on-disk cache for conditional re-fetches
         """
         self.base_url = base_url
+        self.http_cache = http_cache
+        # Called as page_callback(url, records_extracted, ok) after each page
+        self.page_callback: Optional[Callable[[str, int, bool], None]] = None
         self.delay = delay
+        self.max_concurrency = max(1, max_concurrency)
+        self.host = urlparse(base_url).netloc
+        self.rate_limiter = get_host_bucket(
+            self.host,
+            rate=1.0 / delay if delay > 0 else 0,
+            burst=burst
+        )
+        # Fails fetches fast while the host keeps erroring (shared per host)
+        self.circuit_breaker = get_host_breaker(self.host)
         self.session = self._create_session()
 
     def _create_session(self) -> requests.Session:
         """Create a requests session with proper headers."""
         session = requests.Session()
         session.headers.update({'User-Agent': USER_AGENT})
+        adapter = HTTPAdapter(pool_maxsize=max(10, self.max_concurrency))
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
         return session
 
-    def fetch_page(self, url: str, timeout: int = 10) -> Optional[requests.Response]:
+    def fetch_page(self, url: str, timeout: Optional[Union[float, Tuple[float, float]]] = None
+                   ) -> Optional[requests.Response]:
         """
-        Fetch a page with error handling.
+        Fetch a page with retries and error handling.
+
+        Connection errors, timeouts, 429 and 5xx responses are retried per
+        `retry_policy` (exponential backoff with jitter, or the server's
+        ``Retry-After``). While the host's circuit breaker is open the page
+        fails at once without a request.
 
         Args:
             url: URL to fetch
-            timeout: Request timeout in seconds
+            timeout: Request timeout in seconds, or a (connect, read) tuple;
+                defaults to (`connect_timeout`, `read_timeout`)
+
+        Returns:
+            Response object or None on error. When the HTTP cache revalidates
+            the page (304), the cached body is returned with ``from_cache`` set.
+        """
+        if timeout is None:
+            timeout = (self.connect_timeout, self.read_timeout)
+        breaker = self.circuit_breaker
+        retry = 0
+        while True:
+            if not breaker.allow():
+                logger.warning(f"Circuit open for {urlparse(url).netloc}, skipping {url}")
+                return None
+            try:
+                response = self._fetch_once(url, timeout)
+                breaker.record_success()
+                return response
+            except requests.RequestException as e:
+                failed = e.response
+                wait = self._retry_wait(url, e, retry,
+                                        failed.status_code if failed is not None else None,
+                                        failed.headers if failed is not None else None)
+                if wait is None:
+                    return None
+                retry += 1
+                time.sleep(wait)
+                self.respect_rate_limit()
+
+    def _retry_wait(self, url: str, error: Any, retry: int, status: Optional[int] = None,
+                    headers: Optional[Mapping[str, str]] = None) -> Optional[float]:
+        """
+        Record a failed attempt with the host's circuit breaker and decide whether to retry.
+
+        Shared by the threaded and the asyncio fetch paths.
+
+        Args:
+            url: URL that failed
+            error: The error, for log messages
+            retry: Number of retries already made
+            status: HTTP status of the failed response (None on a connection error or timeout)
+            headers: Headers of the failed response
 
         Returns:
-            Response object or None on error
-        """
-        try:
-            response = self.session.get(url, timeout=timeout)
-            response.raise_for_status()
-            return response
-        except requests.RequestException as e:
-            logger.error(f"Error fetching {url}: {e}")
+            Seconds to wait before retrying, or None to give up
+        """
+        breaker = self.circuit_breaker
+        if status is not None and status not in RETRY_STATUSES:
+            # The host answered; asking again will not change a 404
+            breaker.record_success()
+            logger.error(f"Error fetching {url}: {error}")
+            return None
+        if breaker.record_failure():
+            logger.error(f"Error fetching {url}: {error}; circuit opened for "
+                         f"{urlparse(url).netloc} after {breaker.failure_threshold} "
+                         f"consecutive failures")
             return None
 
+        retry_after = None
+        if status in RETRY_AFTER_STATUSES and headers is not None:
+            retry_after = parse_retry_after(headers.get('Retry-After'))
+        wait = self.retry_policy.delay(retry, retry_after)
+        if wait is None:
+            logger.error(f"Error fetching {url}: {error}")
+            return None
+        logger.warning(f"Error fetching {url}: {error}; "
+                       f"retry {retry + 1}/{self.retry_policy.max_retries} in {wait:.2f}s")
+        breaker.record_retry(retry_after=retry_after is not None)
+        return wait
+
+    def _fetch_once(self, url: str,
+                    timeout: Union[float, Tuple[float, float]]) -> requests.Response:
+        """
+        Make one (conditional) request for `url`.
+
+        Raises:
+            requests.RequestException: On a connection error, timeout or error status
+        """
+        host = urlparse(url).netloc
+        headers = self.http_cache.conditional_headers(url) if self.http_cache else {}
+        response = self._get(url, timeout, headers)
+        if response.status_code == 304 and self.http_cache:
+            body = self.http_cache.load_body(url)
+            if body is not None:
+                self.http_cache.record_hit()
+                HTTP_CACHE_TOTAL.inc(host, 'hit')
+                response._content = body  # pylint: disable=protected-access
+                response.from_cache = True
+                return response
+            # Cache entry vanished since the headers were built; fetch in full
+            response = self._get(url, timeout)
+        response.raise_for_status()
+        if self.http_cache:
+            self.http_cache.record_miss()
+            HTTP_CACHE_TOTAL.inc(host, 'miss')
+            self.http_cache.store(url, response)
+        return response
+
+    def _get(self, url: str, timeout: Union[float, Tuple[float, float]],
+             headers: Optional[Dict[str, str]] = None) -> requests.Response:
+        """Send one GET request, recording its latency and body size."""
+        host = urlparse(url).netloc
+        with FETCH_SECONDS.time(host):
+            response = self.session.get(url, timeout=timeout, headers=headers)
+        if response.status_code == 200:
+            FETCH_BYTES.observe(len(response.content), host)
+        return response
+
+    def _fetch_rate_limited(self, url: str) -> Optional[requests.Response]:
+        """Wait for a token from the host's bucket, then fetch `url`."""
+        self.respect_rate_limit()
+        logger.info(f"Scraping {url}")
+        return self.fetch_page(url)
+
+    async def fetch_page_async(self, url: str, engine) -> Optional[Any]:
+        """
+        Asyncio variant of `_fetch_rate_limited` on an `AsyncFetchEngine`.
+
+        Takes a token from the host's bucket, then fetches through the HTTP
+        cache with the same retry policy and circuit breaker as `fetch_page`.
+
+        Args:
+            url: URL to fetch
+            engine: Open `async_engine.AsyncFetchEngine`
+
+        Returns:
+            `async_engine.AsyncResponse`, or None on error. When the HTTP cache
+            revalidates the page (304), the cached body is returned with
+            ``from_cache`` set.
+        """
+        RATE_LIMIT_WAIT_SECONDS.observe(await self.rate_limiter.acquire_async(), self.host)
+        logger.info(f"Scraping {url}")
+        breaker = self.circuit_breaker
+        retry = 0
+        while True:
+            if not breaker.allow():
+                logger.warning(f"Circuit open for {urlparse(url).netloc}, skipping {url}")
+                return None
+            response = await self._fetch_once_async(url, engine)
+            if response:
+                breaker.record_success()
+                return response
+            wait = self._retry_wait(url, response.error, retry, response.status_code,
+                                    response.headers)
+            if wait is None:
+                return None
+            retry += 1
+            await asyncio.sleep(wait)
+            RATE_LIMIT_WAIT_SECONDS.observe(await self.rate_limiter.acquire_async(), self.host)
+
+    async def _fetch_once_async(self, url: str, engine):
+        """Make one (conditional) request for `url`, like `_fetch_once`."""
+        host = urlparse(url).netloc
+        headers = self.http_cache.conditional_headers(url) if self.http_cache else {}
+        timeout = (self.connect_timeout, self.read_timeout)
+        response = await engine.fetch(url, headers, timeout)
+        if response and response.status_code == 304 and self.http_cache:
+            body = self.http_cache.load_body(url)
+            if body is not None:
+                self.http_cache.record_hit()
+                HTTP_CACHE_TOTAL.inc(host, 'hit')
+                response.content = body
+                response.from_cache = True
+                return response
+            # Cache entry vanished since the headers were built; fetch in full
+            response = await engine.fetch(url, timeout=timeout)
+        if response and self.http_cache:
+            self.http_cache.record_miss()
+            HTTP_CACHE_TOTAL.inc(host, 'miss')
+            await asyncio.to_thread(self.http_cache.store, url, response)
+        return response
+
+    def fetch_pages(self, urls: Iterable[str]) -> Iterator[Tuple[str, Optional[requests.Response]]]:
+        """
+        Fetch several pages concurrently within the host's rate limit.
+
+        Up to `max_concurrency` requests are in flight at once, each started
+        only after taking a token from the per-host bucket.
+
+        Args:
+            urls: URLs to fetch
+
+        Yields:
+            (url, response) pairs in the order of `urls`; response is None on error
+        """
+        urls = list(urls)
+        if self.max_concurrency == 1 or len(urls) <= 1:
+            for url in urls:
+                yield url, self._fetch_rate_limited(url)
+            return
+
+        with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(urls))) as ex:
+            yield from zip(urls, ex.map(self._fetch_rate_limited, urls))
+
     def parse_html(self, html_content: str) -> BeautifulSoup:
-        """Parse HTML content with BeautifulSoup."""
-        return BeautifulSoup(html_content, 'html.parser')
+        """
+        Parse HTML content with BeautifulSoup.
+
+        Uses the `parser` backend and, when `parse_only` is set, builds only
+        the matching subtrees instead of the whole document.
+        """
+        with PARSE_SECONDS.time(self.record_label):
+            return BeautifulSoup(html_content, self.parser, parse_only=self.parse_only)
+
+    def page_urls(self, pages: int) -> List[str]:
+        """
+        Build the URLs of the first `pages` listing pages.
+
+        Args:
+            pages: Number of pages to scrape
+
+        Returns:
+            List of page URLs
+        """
+        raise NotImplementedError
+
+    def extract_records(self, soup: BeautifulSoup) -> List[Dict[str, Any]]:
+        """
+        Extract records from one parsed listing page.
+
+        Args:
+            soup: Parsed page
+
+        Returns:
+            List of record dictionaries
+        """
+        raise NotImplementedError
+
+    def next_page_url(self, soup: BeautifulSoup, url: str) -> Optional[str]:
+        """
+        Find the URL of the page following `url`.
+
+        Args:
+            soup: Parsed listing page
+            url: URL the page was fetched from (for resolving relative links)
+
+        Returns:
+            Absolute URL of the next page, or None on the last page
+        """
+        link = soup.select_one(self.next_page_selector)
+        if link is None or not link.get('href'):
+            return None
+        return urljoin(url, link['href'])
+
+    def _report_page(self, url: str, records: int, ok: bool):
+        """Notify `page_callback`, if set, that a page has been processed."""
+        if self.page_callback is not None:
+            self.page_callback(url, records, ok)
+
+    def extract_page(self, content: bytes,
+                     page_url: str) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Parse one page and extract its records and next-page link.
+
+        Args:
+            content: Raw page body
+            page_url: URL the page was fetched from
+
+        Returns:
+            Tuple of the page's records and the next page URL (or None)
+        """
+        soup = self.parse_html(content)
+        with EXTRACT_SECONDS.time(self.record_label):
+            records = self.extract_records(soup)
+        return records, self.next_page_url(soup, page_url)
+
+    def _cached_page_records(self, url: str, response: requests.Response):
+        """Return the stored (records, next_url) of a page the HTTP cache revalidated."""
+        if self.http_cache is not None and getattr(response, 'from_cache', False):
+            cached = self.http_cache.load_records(url)
+            if cached is not None:
+                records = cached['records']
+                if self.record_model is not None:
+                    # Records cached by older versions may hold unparsed strings
+                    records = [self.record_model.from_dict(record).to_dict()
+                               for record in records]
+                return records, cached['next']
+        return None
+
+    def _store_page_records(self, url: str, page: Tuple[List[Dict[str, Any]], Optional[str]]):
+        """Remember a freshly extracted page in the HTTP cache, if any."""
+        if self.http_cache is not None:
+            self.http_cache.store_records(url, page[0], page[1])
+        return page
+
+    def _page_records(self, url: str,
+                      response: requests.Response) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Extract a page's records and next-page link.
+
+        A page the HTTP cache revalidated reuses the records stored on the
+        previous run instead of being parsed again.
+        """
+        cached = self._cached_page_records(url, response)
+        if cached is not None:
+            return cached
+        return self._store_page_records(url, self.extract_page(response.content, response.url))
+
+    def iter_records(self, max_pages: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Yield records page by page, following "next" links until the last page.
+
+        Only one page is held in memory at a time, so the caller can consume
+        arbitrarily long listings with constant memory.
+
+        Args:
+            max_pages: Stop after this many pages (None follows every link)
+
+        Yields:
+            Record dictionaries in page order
+        """
+        url = self.page_urls(1)[0]
+        visited = set()
+        count = 0
+
+        while url and url not in visited and (max_pages is None or len(visited) < max_pages):
+            visited.add(url)
+            response = self._fetch_rate_limited(url)
+            if not response:
+                self._report_page(url, 0, False)
+                break
+
+            records, next_url = self._page_records(url, response)
+            self._report_page(url, len(records), True)
+            for record in records:
+                count += 1
+                yield record
+            url = next_url
+
+        logger.info(f"Successfully scraped {count} {self.record_label} from {len(visited)} page(s)")
+
+    def scrape(self, pages: int = 1, parse_pool: Optional[Executor] = None) -> List[Dict[str, Any]]:
+        """
+        Fetch the first `pages` listing pages and extract their records.
+
+        Args:
+            pages: Number of pages to scrape
+            parse_pool: Optional process pool; when given, fetcher threads only
+                download pages and parsing runs in the pool's worker processes
+
+        Returns:
+            List of record dictionaries in page order
+        """
+        if parse_pool is None:
+            records = []
+            for url, response in self.fetch_pages(self.page_urls(pages)):
+                if not response:
+                    self._report_page(url, 0, False)
+                    continue
+                page_records = self._page_records(url, response)[0]
+                self._report_page(url, len(page_records), True)
+                records.extend(page_records)
+        else:
+            records = self._scrape_with_pool(pages, parse_pool)
+
+        logger.info(f"Successfully scraped {len(records)} {self.record_label}")
+        return records
+
+    def scrape_models(self, pages: int = 1) -> List[Any]:
+        """
+        Scrape like `scrape`, returning compact `record_model` instances.
+
+        Args:
+            pages: Number of pages to scrape
+
+        Returns:
+            List of record objects in page order
+        """
+        if self.record_model is None:
+            raise NotImplementedError(f"{type(self).__name__} has no record_model")
+        return [self.record_model.from_dict(record) for record in self.scrape(pages)]
+
+    def _scrape_with_pool(self, pages: int, parse_pool: Executor) -> List[Dict[str, Any]]:
+        """Hand each downloaded page to `parse_pool` and collect records in page order."""
+        pending = []
+        for url, response in self.fetch_pages(self.page_urls(pages)):
+            if not response:
+                self._report_page(url, 0, False)
+                continue
+            cached = self._cached_page_records(url, response)
+            if cached is not None:
+                pending.append((url, cached))
+            else:
+                pending.append((url, parse_pool.submit(
+                    extract_page_in_worker, type(self), self.base_url, self.parser,
+                    response.content, response.url, self.site
+                )))
+
+        records = []
+        for url, page in pending:
+            if isinstance(page, Future):
+                page = self._store_page_records(url, page.result())
+            self._report_page(url, len(page[0]), True)
+            records.extend(page[0])
+        return records
+
+    async def scrape_async(self, pages: int, engine,
+                           parse_pool: Optional[Executor] = None) -> List[Dict[str, Any]]:
+        """
+        Asyncio variant of `scrape` running on an `AsyncFetchEngine`.
+
+        All pages are requested concurrently; the engine bounds connections
+        per host and the host's token bucket paces request starts. Pages are
+        parsed off the event loop (in `parse_pool`, or the loop's default
+        thread pool), so parsing one page does not stall the other fetches.
+
+        Args:
+            pages: Number of pages to scrape
+            engine: Open `async_engine.AsyncFetchEngine`
+            parse_pool: Optional process pool to parse pages in
+
+        Returns:
+            List of record dictionaries in page order
+        """
+        urls = self.page_urls(pages)
+        pages_records = await asyncio.gather(*(self._scrape_page_async(url, engine, parse_pool)
+                                               for url in urls))
+        records = [record for page_records in pages_records for record in page_records]
+
+        logger.info(f"Successfully scraped {len(records)} {self.record_label}")
+        return records
+
+    async def _scrape_page_async(self, url: str, engine,
+                                 parse_pool: Optional[Executor]) -> List[Dict[str, Any]]:
+        """Fetch one page and extract its records off the event loop."""
+        response = await self.fetch_page_async(url, engine)
+        if not response:
+            self._report_page(url, 0, False)
+            return []
+        page = self._cached_page_records(url, response)
+        if page is None:
+            loop = asyncio.get_running_loop()
+            if parse_pool is not None:
+                page = await loop.run_in_executor(
+                    parse_pool, extract_page_in_worker, type(self), self.base_url, self.parser,
+                    response.content, response.url, self.site)
+            else:
+                page = await loop.run_in_executor(None, self.extract_page, response.content,
+                                                  response.url)
+            self._store_page_records(url, page)
+        self._report_page(url, len(page[0]), True)
+        return page[0]
 
     def respect_rate_limit(self):
-        """Add delay between requests to respect rate limiting."""
-        time.sleep(self.delay)
+        """Wait for the next request slot of this scraper's host."""
+        RATE_LIMIT_WAIT_SECONDS.observe(self.rate_limiter.acquire(), self.host)
+
+
+# Scrapers rebuilt inside parser worker processes, keyed by class, base URL and backend
+_worker_scrapers: Dict[Tuple[type, str, str], WebScraper] = {}
+
+
+def extract_page_in_worker(scraper_cls: type, base_url: str, parser: str, content: bytes,
+                           page_url: str, site=None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Process-pool entry point running a scraper's extraction on one page.
+
+    Args:
+        scraper_cls: WebScraper subclass whose extraction logic to run
+        base_url: Base URL of the scraper (stored in each record's source)
+        parser: BeautifulSoup backend to use
+        content: Raw page body
+        page_url: URL the page was fetched from
+        site: Declarative config of a `SelectorScraper` (sent with every page,
+            so those scrapers are not kept)
+
+    Returns:
+        Tuple of the page's records and the next page URL (or None)
+    """
+    key = (scraper_cls, base_url, parser)
+    scraper = _worker_scrapers.get(key) if site is None else None
+    if scraper is None:
+        # Skip __init__: extraction needs no session, rate limiter or cache
+        scraper = scraper_cls.__new__(scraper_cls)
+        scraper.base_url = base_url
+        scraper.parser = parser
+        if site is not None:
+            scraper.use_site(site)
+        else:
+            _worker_scrapers[key] = scraper
+    return scraper.extract_page(content, page_url)